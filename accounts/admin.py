@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _, ngettext
 
 from .models import User
 from .sites import admin_site
+from .tokens import invalidate_token_users
 
 
 class CustomUserAdmin(UserAdmin):
@@ -32,7 +33,11 @@ class CustomUserAdmin(UserAdmin):
         return self.inlines
 
     def deactivate_users(self, request, queryset):
-        updated = queryset.filter(is_active=True).update(is_active=False)
+        queryset = queryset.filter(is_active=True)
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(is_active=False)
+        # Bulk updates send no signals
+        invalidate_token_users(pks)
         self.message_user(
             request,
             _(
@@ -48,7 +53,11 @@ class CustomUserAdmin(UserAdmin):
     deactivate_users.short_description = _('Deactivate selected Users')
 
     def activate_users(self, request, queryset):
-        updated = queryset.filter(is_active=False).update(is_active=True)
+        queryset = queryset.filter(is_active=False)
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(is_active=True)
+        # Bulk updates send no signals
+        invalidate_token_users(pks)
         self.message_user(
             request,
             _(
@@ -0,0 +1,27 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from accounts.tokens import ROLE_CLAIM, USER_PK_CLAIM, CustomTokenUser, get_token_user_state
+
+
+class CustomJWTAuthentication(JWTAuthentication):
+    """
+    Authenticate the tokens carrying the claims of the account by a lazy token user, checked against the cached state
+    of the user without loading it, while the tokens issued before the claims are authenticated by the loaded user.
+    """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token or USER_PK_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        state = get_token_user_state(validated_token[USER_PK_CLAIM])
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        is_active, role = state
+        if not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        # Tokens issued before a change of the role have to be refreshed, to be issued the claims of the new one
+        if role != validated_token[ROLE_CLAIM]:
+            raise InvalidToken(_('Token role is outdated'))
+        return CustomTokenUser(validated_token)
@@ -1,9 +1,16 @@
-from typing import List, Tuple
+from typing import List, Set, Tuple
 
 from django.utils.decorators import classonlymethod
 
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.exceptions import MethodNotAllowed
 from rest_framework.permissions import AllowAny, SAFE_METHODS
+from drf_spectacular.utils import extend_schema
+
+from .permissions import IsDirectorUser, IsModelUser
+from .serializers import FollowIdsSerializer, FollowStatusSerializer
 
 
 class RetrieveMethodNotAllowedMixin:
@@ -127,3 +134,65 @@ class ProhibitedActionsMixin:
         if cls.prohibited_actions is not None:
             actions = dict(filter(lambda item: item not in cls.prohibited_actions, actions.items()))
         return super().as_view(actions, **initkwargs)
+
+
+class BulkFollowMixin:
+    """
+    Mixin to follow, unfollow & look up the follow status of many objects of the viewset at once by their IDs, for
+    the profile or agency of the user, EG.: to follow the suggested profiles while onboarding.
+
+    Objects are added & removed by the following many to many field, `follow_field_name`, of the profile or agency,
+    in a single insert or delete, sending the signals keeping the followers counts & the feeds in sync.
+    """
+    follow_field_name = None
+
+    def get_follow_ids(self, data, account) -> Set[int]:
+        serializer = FollowIdsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['ids'])
+        # Following oneself is not allowed
+        if isinstance(account, self.get_queryset().model):
+            ids.discard(account.pk)
+        return ids
+
+    @extend_schema(request=FollowIdsSerializer, responses={status.HTTP_200_OK: FollowIdsSerializer,
+                                                           status.HTTP_403_FORBIDDEN: None},
+                   description="Follow many targets at once\n"
+                               "\t-200: The followed targets, missing ones are skipped.\n")
+    @action(detail=False, methods=['POST'], name='Bulk Follow', url_path='bulk-follow',
+            permission_classes=[IsModelUser | IsDirectorUser])
+    def bulk_follow(self, request, *args, **kwargs):
+        account = self.get_user_associated_model_or_403()
+        ids = self.get_follow_ids(request.data, account)
+        ids = list(self.get_queryset().filter(pk__in=ids).values_list('pk', flat=True))
+        getattr(account, self.follow_field_name).add(*ids)
+        return Response({'ids': sorted(ids)}, status=status.HTTP_200_OK)
+
+    @extend_schema(request=FollowIdsSerializer, responses={status.HTTP_204_NO_CONTENT: None,
+                                                           status.HTTP_403_FORBIDDEN: None},
+                   description="Unfollow many targets at once\n"
+                               "\t-204: The followings are deleted successfully.\n")
+    @action(detail=False, methods=['POST'], name='Bulk Unfollow', url_path='bulk-unfollow',
+            permission_classes=[IsModelUser | IsDirectorUser])
+    def bulk_unfollow(self, request, *args, **kwargs):
+        account = self.get_user_associated_model_or_403()
+        getattr(account, self.follow_field_name).remove(*self.get_follow_ids(request.data, account))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @extend_schema(parameters=[FollowIdsSerializer], responses={status.HTTP_200_OK: FollowStatusSerializer(many=True),
+                                                                status.HTTP_403_FORBIDDEN: None},
+                   description="Whether each of the targets is followed, in the order of their IDs")
+    @action(detail=False, methods=['GET'], name='Get Follow Status', url_path='follow-status',
+            permission_classes=[IsModelUser | IsDirectorUser], pagination_class=None, filter_backends=[])
+    def follow_status(self, request, *args, **kwargs):
+        account = self.get_user_associated_model_or_403()
+        serializer = FollowIdsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        # Looked up in the relation rows of the account alone, rather than the targets
+        field = getattr(type(account), self.follow_field_name).field
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        rows = field.remote_field.through.objects.filter(**{source: account, f'{target}__in': ids})
+        following = set(rows.values_list(f'{target}_id', flat=True))
+        serializer = FollowStatusSerializer([{'id': pk, 'is_following': pk in following} for pk in ids], many=True)
+        return Response(serializer.data)
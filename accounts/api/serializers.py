@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.contrib.auth.backends import get_user_model
+from django.utils.translation import gettext_lazy as _
 
+from rest_framework import serializers
 from rest_flex_fields.serializers import FlexFieldsSerializerMixin
 from djoser.serializers import UserSerializer, UserCreateSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from accounts.tokens import CustomRefreshToken
 
 
 User = get_user_model()
@@ -21,3 +29,41 @@ class CustomUserSerializer(FlexFieldsSerializerMixin, UserSerializer):
         expandable_fields = {
             'reports': ('reports.api.serializers.ReportSerializer', {'many': True, 'read_only': True}),
         }
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CustomRefreshToken
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh the tokens of the active users only, issuing them the claims of their current account."""
+    token_class = CustomRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User._default_manager.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('No active account found for the given token'), code='no_active_account')
+        refresh.set_account_claims(user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class FollowIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1,
+                                max_length=settings.FOLLOW_BATCH_MAX_SIZE, help_text='IDs of the targets')
+
+
+class FollowStatusSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    is_following = serializers.BooleanField(help_text='Whether the target is followed by the user profile or agency')
@@ -6,3 +6,7 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
     verbose_name = _('Accounts')
+
+    def ready(self):
+        # Connect the signals invalidating the cached state of the token users
+        from . import tokens  # noqa: F401
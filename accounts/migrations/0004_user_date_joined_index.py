@@ -0,0 +1,19 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='date_joined',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Date Joined'),
+        ),
+    ]
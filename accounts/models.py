@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .enums import RoleChoices
@@ -32,6 +33,7 @@ class User(AbstractUser):
     email = models.EmailField(blank=False, unique=True, verbose_name=_('Email Address'))
     role = models.PositiveSmallIntegerField(choices=RoleChoices.choices, default=base_role, null=True,
                                             blank=True, verbose_name=_('Role'))
+    date_joined = models.DateTimeField(default=timezone.now, db_index=True, verbose_name=_('Date Joined'))
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'role']
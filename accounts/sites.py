@@ -2,9 +2,9 @@ from django.urls import path
 from django.contrib.admin import AdminSite
 from django.utils.functional import LazyObject
 from django.template.response import TemplateResponse
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from .views import SendEmailView
+from .tokens import CustomRefreshToken
 
 
 class CustomAdminSite(AdminSite):
@@ -13,7 +13,7 @@ class CustomAdminSite(AdminSite):
     def charts_view(self, request, extra_context=None):
         app_list = self.get_app_list(request)
 
-        refresh = RefreshToken.for_user(request.user)
+        refresh = CustomRefreshToken.for_user(request.user)
 
         context = {
             **self.each_context(request),
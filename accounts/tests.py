@@ -1,3 +1,132 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .admin import CustomUserAdmin
+from .api.authentication import CustomJWTAuthentication
+from .enums import RoleChoices
+from .models import User
+from .sites import admin_site
+from .tokens import CustomRefreshToken, CustomTokenUser
+from .utils import is_director_user, is_model_user, is_owner
+
+
+class TokenTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.model_user = User.objects.create_user('model', 'model@example.com', 'password', role=RoleChoices.MODEL)
+        cls.director_user = User.objects.create_user('director', 'director@example.com', 'password',
+                                                     role=RoleChoices.DIRECTOR)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def authenticate(token):
+        return CustomJWTAuthentication().get_user(AccessToken(str(token)))
+
+
+class TokenClaimsTests(TokenTestCase):
+
+    def test_claims(self):
+        token = CustomRefreshToken.for_user(self.model_user).access_token
+        self.assertEqual(token['user_id'], 'model@example.com')
+        self.assertEqual(
+            (token['user_pk'], token['role'], token['profile_id'], token['agency_id']),
+            (self.model_user.pk, RoleChoices.MODEL, self.model_user.profile.pk, None)
+        )
+        token = CustomRefreshToken.for_user(self.director_user).access_token
+        self.assertEqual((token['profile_id'], token['agency_id']), (None, self.director_user.agency.pk))
+
+    def test_token_user(self):
+        token = CustomRefreshToken.for_user(self.model_user).access_token
+        self.authenticate(token)
+        # The permissions & the ownership are checked out of the claims, once the state of the user is cached
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertIsInstance(user, CustomTokenUser)
+            self.assertEqual((user.pk, user.id, user.role), (self.model_user.pk, self.model_user.pk, RoleChoices.MODEL))
+            self.assertTrue(is_model_user(user))
+            self.assertFalse(is_director_user(user))
+            self.assertTrue(is_owner(user, self.model_user.profile))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.profile, self.model_user.profile)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'model@example.com')
+            self.assertEqual(user.username, 'model')
+
+    def test_missing_account(self):
+        user = self.authenticate(CustomRefreshToken.for_user(self.model_user).access_token)
+        with self.assertRaises(User.agency.RelatedObjectDoesNotExist):
+            user.agency
+
+    def test_tokens_without_claims(self):
+        # Tokens issued before the claims are authenticated by the loaded user
+        user = self.authenticate(AccessToken.for_user(self.model_user))
+        self.assertEqual(type(user), User)
+        self.assertEqual(user, self.model_user)
+
+
+class TokenRevalidationTests(TokenTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        tokens = self.client.post(reverse('accounts:jwt-create'), {'email': 'model@example.com',
+                                                                   'password': 'password'}).json()
+        self.refresh = tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {tokens["access"]}')
+
+    def get_status_code(self):
+        return self.client.get(reverse('profiles:profile-follow-status'), {'ids': [1]}).status_code
+
+    def refresh_tokens(self):
+        return APIClient().post(reverse('accounts:jwt-refresh'), {'refresh': self.refresh})
+
+    def test_deactivated(self):
+        self.assertEqual(self.get_status_code(), 200)
+        self.model_user.is_active = False
+        self.model_user.save()
+        self.assertEqual(self.get_status_code(), 401)
+        self.assertEqual(self.refresh_tokens().status_code, 401)
+        self.model_user.is_active = True
+        self.model_user.save(update_fields=['is_active'])
+        self.assertEqual(self.get_status_code(), 200)
+
+    def test_bulk_deactivated(self):
+        self.assertEqual(self.get_status_code(), 200)
+        admin = CustomUserAdmin(User, admin_site)
+        with mock.patch.object(admin, 'message_user'):
+            admin.deactivate_users(None, User.objects.filter(pk=self.model_user.pk))
+            self.assertEqual(self.get_status_code(), 401)
+            admin.activate_users(None, User.objects.filter(pk=self.model_user.pk))
+            self.assertEqual(self.get_status_code(), 200)
+
+    def test_role_changed(self):
+        self.assertEqual(self.get_status_code(), 200)
+        self.model_user.role = RoleChoices.DIRECTOR
+        self.model_user.save()
+        self.assertEqual(self.get_status_code(), 401)
+        # Refreshed tokens carry the new role
+        response = self.refresh_tokens()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['role'], RoleChoices.DIRECTOR)
+
+    def test_deleted(self):
+        self.assertEqual(self.get_status_code(), 200)
+        self.model_user.delete()
+        self.assertEqual(self.get_status_code(), 401)
+        self.assertEqual(self.refresh_tokens().status_code, 401)
 
-# Create your tests here.
+    def test_refresh_rotated(self):
+        response = self.refresh_tokens()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['profile_id'], self.model_user.profile.pk)
+        # Rotated refresh tokens are blacklisted
+        self.assertEqual(self.refresh_tokens().status_code, 401)
@@ -0,0 +1,160 @@
+import copy
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.utils.functional import SimpleLazyObject, cached_property, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from agencies.models import Agency, DirectorUser
+from profiles.models import ModelUser, Profile
+
+
+# Claims of the account of the user, carried by the tokens so that the permissions are checked out of them
+USER_PK_CLAIM = 'user_pk'
+ROLE_CLAIM = 'role'
+PROFILE_ID_CLAIM = 'profile_id'
+AGENCY_ID_CLAIM = 'agency_id'
+
+
+def get_token_user_state_key(pk) -> str:
+    return f'accounts:token_user:{pk}'
+
+
+def get_token_user_state(pk) -> Optional[Tuple[bool, int]]:
+    """
+    Get the (active, role) state of the user, or None if it's missing, cached for `TOKEN_USER_CACHE_TIMEOUT` seconds
+    so that the token users are checked against their current account without loading it on every request.
+    """
+    key = get_token_user_state_key(pk)
+    state = cache.get(key)
+    if state is None:
+        state = get_user_model()._default_manager.filter(pk=pk).values_list('is_active', 'role').first()
+        # Missing users are cached as well, as their tokens may keep being sent
+        state = tuple(state or ())
+        cache.set(key, state, timeout=settings.TOKEN_USER_CACHE_TIMEOUT)
+    return state or None
+
+
+def invalidate_token_users(pks: Iterable[int]) -> None:
+    """Invalidate the cached state of the users, whose activation, role or existence changed."""
+    cache.delete_many([get_token_user_state_key(pk) for pk in pks])
+
+
+class CustomRefreshToken(RefreshToken):
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_account_claims(user)
+        return token
+
+    def set_account_claims(self, user) -> None:
+        """Set the claims of the account of the user, once issued & again on every refresh."""
+        self[USER_PK_CLAIM] = user.pk
+        self[ROLE_CLAIM] = user.role
+        self[PROFILE_ID_CLAIM] = Profile.objects.filter(user=user).values_list('pk', flat=True).first()
+        self[AGENCY_ID_CLAIM] = Agency.objects.filter(user=user).values_list('pk', flat=True).first()
+
+
+class CustomTokenUser(SimpleLazyObject):
+    """
+    User authenticated by a token carrying the claims of its account, whose pk, role, profile id & agency id are read
+    out of the token, so that the requests checking only them run no query. The profile & the agency are loaded on
+    their first access, and the user itself on the access of any other attribute. Queries should be given its pk, as
+    using it as a model instance loads the user.
+
+    Claims are the ones of the time the token was issued or refreshed, the authentication checks that the user is
+    still active & has the same role, see `get_token_user_state`.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.__dict__['token'] = token
+        super().__init__(self.get_user)
+
+    def get_user(self):
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{api_settings.USER_ID_FIELD: self.token[api_settings.USER_ID_CLAIM]})
+        except user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    def __copy__(self):
+        return type(self)(self.token) if self._wrapped is empty else copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        return type(self)(self.token) if self._wrapped is empty else copy.deepcopy(self._wrapped, memo)
+
+    def __repr__(self):
+        return f'<{type(self).__name__}: {self.token[api_settings.USER_ID_CLAIM]}>'
+
+    @property
+    def pk(self):
+        return self.token[USER_PK_CLAIM]
+
+    @property
+    def id(self):
+        return self.token[USER_PK_CLAIM]
+
+    @property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @property
+    def profile_id(self):
+        return self.token[PROFILE_ID_CLAIM]
+
+    @property
+    def agency_id(self):
+        return self.token[AGENCY_ID_CLAIM]
+
+    @cached_property
+    def profile(self):
+        if self.profile_id is None:
+            raise get_user_model().profile.RelatedObjectDoesNotExist(_('User has no profile.'))
+        return Profile.objects.get(pk=self.profile_id)
+
+    @cached_property
+    def agency(self):
+        if self.agency_id is None:
+            raise get_user_model().agency.RelatedObjectDoesNotExist(_('User has no agency.'))
+        return Agency.objects.get(pk=self.agency_id)
+
+
+class CustomTokenStrategy:
+    """Social authentication strategy, issuing the tokens carrying the claims of the account."""
+
+    @classmethod
+    def obtain(cls, user):
+        refresh = CustomRefreshToken.for_user(user)
+        return {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+            'user': user,
+        }
+
+
+def invalidate_saved_token_user(sender, instance, created, update_fields=None, *args, **kwargs):
+    if not created and (update_fields is None or {'is_active', 'role'} & set(update_fields)):
+        invalidate_token_users([instance.pk])
+
+
+def invalidate_deleted_token_user(sender, instance, *args, **kwargs):
+    invalidate_token_users([instance.pk])
+
+
+# Users are saved through their proxies as well
+for user_model in (get_user_model(), ModelUser, DirectorUser):
+    label = user_model._meta.label_lower
+    post_save.connect(invalidate_saved_token_user, sender=user_model, dispatch_uid=f'token_user_save_{label}')
+    post_delete.connect(invalidate_deleted_token_user, sender=user_model, dispatch_uid=f'token_user_delete_{label}')
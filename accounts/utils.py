@@ -16,7 +16,11 @@ def _is_user_with_role(user: User, role: int) -> bool:
 
 def _is_instance_user(user: User, model: models.Model) -> bool:
     """Check whether the user has the target type of profile."""
-    return isinstance(getattr(user, model.__name__.lower(), None), model)
+    name = model.__name__.lower()
+    # Token users carry the id of their profile, so that it's checked without being loaded
+    if hasattr(type(user), f'{name}_id'):
+        return getattr(user, f'{name}_id') is not None
+    return isinstance(getattr(user, name, None), model)
 
 
 def is_admin_user(user: User) -> bool:
@@ -41,7 +45,11 @@ def is_director_user(user: User) -> bool:
 
 def is_owner(user: User, obj: Type[models.Model]) -> bool:
     """Check whether the user is the owner of the object"""
-    if hasattr(obj, 'user'):
+    # Compared by their ids, so that neither the user of the object nor the token user is loaded
+    if getattr(obj, 'user_id', None) is not None:
+        if obj.user_id == user.pk:
+            return True
+    elif hasattr(obj, 'user'):
         if getattr(obj, 'user') == user:
             return True
     if is_model_user(user) and hasattr(obj, 'profile'):
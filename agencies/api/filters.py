@@ -7,15 +7,31 @@ from agencies.models import Agency, PreviousWork
 
 class AgencyFilter(filters.FilterSet):
     search = filters.CharFilter(method='custom_search', label="Search names, and about")
+    since_years_min = filters.NumberFilter(method='filter_since_years', label="Minimum years since establishment")
+    since_years_max = filters.NumberFilter(method='filter_since_years', label="Maximum years since establishment")
+    followers_min = filters.NumberFilter(field_name='followers_count', lookup_expr='gte',
+                                         label="Minimum number of followers")
+    followers_max = filters.NumberFilter(field_name='followers_count', lookup_expr='lte',
+                                         label="Maximum number of followers")
+    following_min = filters.NumberFilter(field_name='following_count', lookup_expr='gte',
+                                         label="Minimum number of followed profiles & agencies")
+    following_max = filters.NumberFilter(field_name='following_count', lookup_expr='lte',
+                                         label="Maximum number of followed profiles & agencies")
 
     def custom_search(self, queryset, name, value):
         return queryset.filter(
             models.Q(name__icontains=value) | models.Q(about__icontains=value)
         )
 
+    def filter_since_years(self, queryset, name, value):
+        if name == 'since_years_min':
+            return queryset.since_years_range(start=value)
+        return queryset.since_years_range(end=value)
+
     class Meta:
         model = Agency
-        fields = ('is_authorized', 'service', 'industry',  'search')
+        fields = ('is_authorized', 'service', 'industry', 'since_years_min', 'since_years_max', 'followers_min',
+                  'followers_max', 'following_min', 'following_max', 'search')
 
 
 class PreviousWorkFilter(filters.FilterSet):
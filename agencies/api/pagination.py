@@ -0,0 +1,8 @@
+from rest_framework.pagination import CursorPagination
+
+
+class NearbyCursorPagination(CursorPagination):
+    # Agencies at the same distance are kept in a stable order by their primary keys
+    ordering = ('distance', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
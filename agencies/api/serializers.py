@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth.backends import get_user_model
 from django.utils.translation import gettext_lazy as _
 
@@ -22,7 +23,7 @@ class AgencySerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Agency
-        exclude = ('following_models', 'following_agencies')
+        exclude = ('following_models', 'following_agencies', 'geohash')
         read_only_fields = ('id', 'user', 'is_authorized', 'create_at', 'update_at')
         expandable_fields = {
             'user': ('accounts.api.serializers.CustomUserSerializer', {'many': False, 'read_only': True,
@@ -35,6 +36,19 @@ class AgencySerializer(FlexFieldsModelSerializer):
         }
 
 
+class NearbyAgencySerializer(AgencySerializer):
+    distance = serializers.FloatField(read_only=True)
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0, default=settings.NEARBY_AGENCIES_RADIUS_KM)
+
+    def validate_radius_km(self, value):
+        return min(value, settings.NEARBY_AGENCIES_MAX_RADIUS_KM)
+
+
 class AgencyImageSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -11,14 +11,18 @@ from rest_framework.mixins import RetrieveModelMixin, UpdateModelMixin, ListMode
 
 from rest_flex_fields import is_expanded
 from rest_flex_fields.filter_backends import FlexFieldsDocsFilterBackend
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 
 from agencies.models import Agency, PreviousWork, AgencyImage
 from accounts.api.permissions import IsDirectorUser, IsModelUser
 from accounts.utils import is_director_user, is_owner, get_user_associated_model
-from accounts.api.mixins import AllowAnyInSafeMethodOrCustomPermissionMixin, ProhibitedActionsMixin
+from accounts.api.mixins import (AllowAnyInSafeMethodOrCustomPermissionMixin, ProhibitedActionsMixin,
+                                 BulkFollowMixin)
 from .filters import AgencyFilter, PreviousWorkFilter
-from .serializers import AgencySerializer, PreviousWorkSerializer, AgencyImageSerializer
+from .pagination import NearbyCursorPagination
+from .serializers import (AgencySerializer, PreviousWorkSerializer, AgencyImageSerializer, NearbyAgencySerializer,
+                          NearbyQuerySerializer)
 
 
 class PreviousWorkViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, ModelViewSet):
@@ -44,8 +48,8 @@ class PreviousWorkViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, ModelView
         return self.list(request, *args, **kwargs)
 
 
-class AgencyViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissionMixin, RetrieveModelMixin,
-                    UpdateModelMixin, ListModelMixin, GenericViewSet):
+class AgencyViewSet(BulkFollowMixin, ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissionMixin,
+                    RetrieveModelMixin, UpdateModelMixin, ListModelMixin, GenericViewSet):
     queryset = Agency.objects.all()
     serializer_class = AgencySerializer
     filterset_class = AgencyFilter
@@ -53,6 +57,7 @@ class AgencyViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissi
     filter_backends = GenericViewSet.filter_backends + [FlexFieldsDocsFilterBackend]
     save_method_permission_classes = [IsAuthenticated]
     follow_permission_classes = [IsModelUser | IsDirectorUser]
+    follow_field_name = 'following_agencies'
     prohibited_actions = [
         ('put', 'update'),
         ('patch', 'partial_update'),
@@ -96,6 +101,25 @@ class AgencyViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissi
             return self.partial_update(request, *args, **kwargs)
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @extend_schema(parameters=[NearbyQuerySerializer], responses={200: NearbyAgencySerializer(many=True)})
+    # The ordering filter is left out, as the agencies are paginated by their distance
+    @action(detail=False, methods=["GET"], name='Get Nearby Agencies', serializer_class=NearbyAgencySerializer,
+            pagination_class=NearbyCursorPagination, filter_backends=[DjangoFilterBackend, FlexFieldsDocsFilterBackend])
+    def nearby(self, request, *args, **kwargs):
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        agencies = self.filter_queryset(self.get_queryset()).nearby(
+            query.validated_data['lat'], query.validated_data['lng'], query.validated_data['radius_km']
+        )
+
+        page = self.paginate_queryset(agencies)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(agencies.order_by('distance', 'id'), many=True)
+        return Response(serializer.data)
+
     @extend_schema(request=None, responses={status.HTTP_200_OK: None, status.HTTP_400_BAD_REQUEST: None},
                    description="Follow Agency\n"
                                "\t-200: The following is added successfully.\n"
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0008_alter_agencyimage_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agency',
+            name='since',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='Since'),
+        ),
+    ]
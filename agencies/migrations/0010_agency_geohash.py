@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+from agencies.utils import encode_geohash
+
+
+def fill_geohashes(apps, schema_editor):
+    model = apps.get_model('agencies', 'Agency')
+    agencies = list(model.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for agency in agencies:
+        agency.geohash = encode_geohash(agency.latitude, agency.longitude)
+    model.objects.bulk_update(agencies, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0009_agency_since_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agency',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True, verbose_name='Geohash'),
+        ),
+        migrations.RunPython(fill_geohashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0010_agency_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agency',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Followers Count'),
+        ),
+        migrations.AddField(
+            model_name='agency',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Following Count'),
+        ),
+    ]
@@ -1,4 +1,10 @@
+from datetime import date
+from functools import reduce
+from math import cos, radians
+from operator import or_
+
 from django.db import models
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
@@ -12,6 +18,8 @@ from accounts.enums import RoleChoices
 from accounts.models import CustomUserManager
 from profiles.validators import FileSizeValidator
 from .enums import ServiceChoices, IndustryChoices
+from .utils import (EARTH_RADIUS_KM, GEOHASH_PRECISION, clamp_year, encode_geohash, get_bounding_box,
+                    get_geohash_prefixes)
 
 
 User = get_user_model()
@@ -42,8 +50,49 @@ class AgencyQuerySet(models.QuerySet):
             since_years=current_date.year - models.F('since__year')
         )
 
-    def since_years_range(self, start, end):
-        return self.with_since_years().filter(since_years__gte=start, since_years__lte=end)
+    def since_years_range(self, start=None, end=None):
+        # Filter on the since date itself rather than the computed years, so that its index is used
+        current_year = localdate().year
+        lookups = {}
+        if end is not None:
+            lookups['since__gte'] = date(clamp_year(current_year - int(end)), 1, 1)
+        if start is not None:
+            lookups['since__lte'] = date(clamp_year(current_year - int(start)), 12, 31)
+        # Years out of the range of the dates are clamped to bounds matching every date, unless no date is within them
+        if (end is not None and current_year - int(end) > date.max.year) or \
+                (start is not None and current_year - int(start) < date.min.year):
+            return self.none()
+        return self.filter(**lookups)
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float):
+        """
+        Filter the agencies within the radius around the coordinates, annotated with their `distance` in kilometers.
+
+        Candidates are looked up by the geohash cells & the box bounding the circle, so that the geohash index is
+        used, then refined by their exact haversine distance.
+        """
+        bounding_box = south, west, north, east = get_bounding_box(latitude, longitude, radius_km)
+        lookups = models.Q(latitude__range=(south, north))
+        if west <= east:
+            lookups &= models.Q(longitude__range=(west, east))
+        else:
+            lookups &= models.Q(longitude__gte=west) | models.Q(longitude__lte=east)
+        prefixes = get_geohash_prefixes(bounding_box)
+        if prefixes:
+            # Geohashes of a cell are the ones within the range of its prefix padded by the first & last characters
+            lookups &= reduce(or_, (
+                models.Q(geohash__range=(
+                    prefix.ljust(GEOHASH_PRECISION, '0'), prefix.ljust(GEOHASH_PRECISION, 'z')
+                ))
+                for prefix in prefixes
+            ))
+        latitude, longitude = radians(latitude), radians(longitude)
+        haversine = Power(Sin((Radians('latitude') - latitude) / 2), 2) + \
+            cos(latitude) * Cos(Radians('latitude')) * Power(Sin((Radians('longitude') - longitude) / 2), 2)
+        return self.filter(lookups).annotate(
+            # The square root is capped, as rounding errors may push it past the domain of the arc sine
+            distance=2 * EARTH_RADIUS_KM * ASin(Least(Sqrt(haversine), models.Value(1.0)))
+        ).filter(distance__lte=radius_km)
 
 
 class AgencyManager(models.Manager):
@@ -54,15 +103,18 @@ class AgencyManager(models.Manager):
     def active(self):
         return self.get_queryset().filter(user__is_active=True)
 
-    def since_years_range(self, start, end):
+    def since_years_range(self, start=None, end=None):
         return self.get_queryset().since_years_range(start, end)
 
+    def nearby(self, latitude: float, longitude: float, radius_km: float):
+        return self.get_queryset().nearby(latitude, longitude, radius_km)
+
 
 class Agency(models.Model):
     user = models.OneToOneField(DirectorUser, on_delete=models.CASCADE, related_name='agency', verbose_name=_('User'))
     name = models.CharField(max_length=255, null=True, blank=True, verbose_name=_('Name'))
     about = models.TextField(null=True, blank=True, verbose_name=_('About'))
-    since = models.DateField(null=True, blank=True, verbose_name=_('Since'))
+    since = models.DateField(null=True, blank=True, db_index=True, verbose_name=_('Since'))
     is_authorized = models.BooleanField(null=True, blank=True, default=False, verbose_name=_('Is Authorized'))
 
     # Following
@@ -70,6 +122,9 @@ class Agency(models.Model):
                                               verbose_name=_('Following Models'))
     following_agencies = models.ManyToManyField('self', blank=True, related_name='follower_agencies',
                                                 verbose_name=_('Following Agencies'))
+    followers_count = models.PositiveIntegerField(default=0, editable=False, db_index=True,
+                                                  verbose_name=_('Followers Count'))
+    following_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Following Count'))
 
     # Contact Information
     email = models.EmailField(null=True, blank=True, verbose_name=_('Email Address'))
@@ -84,6 +139,8 @@ class Agency(models.Model):
                                  verbose_name=_('Latitude'))
     longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)],
                                   verbose_name=_('Longitude'))
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False, db_index=True,
+                               verbose_name=_('Geohash'))
 
     # Services Offered
     service = models.PositiveSmallIntegerField(null=True, blank=True, choices=ServiceChoices.choices,
@@ -102,6 +159,16 @@ class Agency(models.Model):
         verbose_name_plural = _('Agencies')
         ordering = ['-create_at', '-update_at']
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        return super().save(*args, **kwargs)
+
 
 class PreviousWork(models.Model):
     agency = models.ForeignKey(Agency, on_delete=models.CASCADE, related_name='works', verbose_name=_('Agency'))
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import math
+from datetime import date
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import localdate
+
+from accounts.models import User
+from accounts.enums import RoleChoices
+from .models import Agency
+from .utils import EARTH_RADIUS_KM, clamp_year, encode_geohash, get_bounding_box, get_geohash_prefixes
+
+
+def haversine(latitude, longitude, other_latitude, other_longitude):
+    latitude, longitude, other_latitude, other_longitude = map(
+        math.radians, (latitude, longitude, other_latitude, other_longitude)
+    )
+    value = math.sin((other_latitude - latitude) / 2) ** 2 + \
+        math.cos(latitude) * math.cos(other_latitude) * math.sin((other_longitude - longitude) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(value))
+
+
+def create_agency(username, **fields):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password', role=RoleChoices.DIRECTOR)
+    agency = Agency.objects.get(user=user)
+    for field, value in fields.items():
+        setattr(agency, field, value)
+    # Saved rather than updated, so that the geohash is encoded
+    agency.save()
+    return agency
+
+
+class ClampYearTests(SimpleTestCase):
+
+    def test_clamp(self):
+        self.assertEqual(clamp_year(2024), 2024)
+        self.assertEqual(clamp_year(-10 ** 5), date.min.year)
+        self.assertEqual(clamp_year(10 ** 5), date.max.year)
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_encode(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(encode_geohash(-90, -180, 3), '000')
+        self.assertEqual(encode_geohash(90, 180, 3), 'zzz')
+
+    def test_bounding_box(self):
+        south, west, north, east = get_bounding_box(0, 0, 111.19)
+        for value in (south, west, -north, -east):
+            self.assertAlmostEqual(value, -1, places=3)
+        # Boxes crossing the antimeridian are wrapped, the ones containing a pole span all the longitudes
+        self.assertGreater(get_bounding_box(0, 179.9, 50)[1], get_bounding_box(0, 179.9, 50)[3])
+        self.assertEqual(get_bounding_box(89.9, 0, 50)[1::2], (-180.0, 180.0))
+
+    def test_prefixes(self):
+        box = get_bounding_box(48.8566, 2.3522, 10)
+        prefixes = get_geohash_prefixes(box)
+        self.assertLessEqual(len(prefixes), 16)
+        self.assertTrue(any(encode_geohash(48.8566, 2.3522).startswith(prefix) for prefix in prefixes))
+        self.assertIsNone(get_geohash_prefixes((-90, -180, 90, 180), max_cells=16))
+
+
+class NearbyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.paris = create_agency('paris', latitude=48.8566, longitude=2.3522)
+        cls.versailles = create_agency('versailles', latitude=48.8049, longitude=2.1204)
+        cls.london = create_agency('london', latitude=51.5074, longitude=-0.1278)
+        cls.east = create_agency('east', latitude=-17.0, longitude=179.95)
+        cls.west = create_agency('west', latitude=-17.0, longitude=-179.95)
+        cls.pole = create_agency('pole', latitude=89.95, longitude=180.0)
+        create_agency('nowhere')
+
+    def nearby(self, latitude, longitude, radius_km):
+        return list(Agency.objects.nearby(latitude, longitude, radius_km).order_by('distance'))
+
+    def test_geohash_kept_in_sync(self):
+        agency = Agency.objects.get(pk=self.paris.pk)
+        self.assertEqual(agency.geohash, encode_geohash(48.8566, 2.3522))
+        agency.latitude = agency.longitude = None
+        agency.save(update_fields=['latitude', 'longitude'])
+        self.assertIsNone(Agency.objects.get(pk=agency.pk).geohash)
+
+    def test_radius(self):
+        self.assertEqual(self.nearby(48.8566, 2.3522, 10), [self.paris])
+        agencies = self.nearby(48.8566, 2.3522, 20)
+        self.assertEqual(agencies, [self.paris, self.versailles])
+        self.assertAlmostEqual(agencies[0].distance, 0)
+        self.assertAlmostEqual(agencies[1].distance, haversine(48.8566, 2.3522, 48.8049, 2.1204))
+        self.assertEqual(self.nearby(48.8566, 2.3522, 400), [self.paris, self.versailles, self.london])
+
+    def test_antimeridian(self):
+        self.assertEqual(set(self.nearby(-17.0, 179.99, 20)), {self.east, self.west})
+
+    def test_pole(self):
+        self.assertEqual(self.nearby(89.99, 0, 20), [self.pole])
+
+
+class SinceYearsRangeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        year = localdate().year
+        cls.agencies = [
+            create_agency(f'director-{index}', since=since)
+            for index, since in enumerate((
+                date(year, 1, 1), date(year, 12, 31), date(year - 1, 1, 1), date(year - 1, 12, 31),
+                date(year - 10, 6, 15), date(year - 11, 12, 31), date(1, 1, 1), None
+            ))
+        ]
+
+    def assertMatchesComputedYears(self, start, end):
+        lookups = {'since_years__gte': start, 'since_years__lte': end}
+        computed = Agency.objects.get_queryset().with_since_years().filter(
+            **{lookup: value for lookup, value in lookups.items() if value is not None}
+        )
+        self.assertEqual(
+            set(Agency.objects.since_years_range(start, end).values_list('pk', flat=True)),
+            set(computed.values_list('pk', flat=True)),
+            f'Years from {start} to {end}'
+        )
+
+    def test_calendar_years(self):
+        # Years are counted between the calendar years, whatever the days within them
+        agencies = Agency.objects.since_years_range(1, 1)
+        self.assertEqual(set(agencies), set(self.agencies[2:4]))
+
+    def test_matches_computed_years(self):
+        for start, end in ((0, 0), (1, 1), (0, 10), (None, 10), (10, None), (11, 11), (2, 9)):
+            self.assertMatchesComputedYears(start, end)
+
+    def test_out_of_range_years(self):
+        for start, end in ((-10 ** 5, None), (None, -10 ** 5), (10 ** 5, None), (None, 10 ** 5)):
+            self.assertMatchesComputedYears(start, end)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class AgencyQueryPlanTests(TestCase):
+
+    def test_searches_geohash_index(self):
+        plan = Agency.objects.nearby(48.8566, 2.3522, 10).explain()
+        self.assertRegex(plan, r'SEARCH \S+ USING (COVERING )?INDEX \S*geohash\S* \(geohash>\? AND geohash<\?\)')
+
+    def test_searches_since_index(self):
+        plan = Agency.objects.since_years_range(1, 10).explain()
+        self.assertRegex(plan, r'SEARCH \S+ USING (COVERING )?INDEX \S*since\S* \(since>\? AND since<\?\)')
+        self.assertNotIn('SCAN', plan)
@@ -0,0 +1,98 @@
+import math
+from datetime import date
+from typing import List, Optional, Tuple
+
+
+# Mean radius of the earth
+EARTH_RADIUS_KM = 6371.0088
+
+# Base 32 alphabet of the geohashes, sorted as its characters are
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision of the stored geohashes, cells of about 4.8m x 4.8m
+GEOHASH_PRECISION = 9
+
+
+def clamp_year(year: int) -> int:
+    """Clamp the year into the range of the years of the dates."""
+    return min(max(year, date.min.year), date.max.year)
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode the coordinates into a geohash, whose prefixes are the cells containing them."""
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, is_longitude = [], 0, 0, True
+    while len(geohash) < precision:
+        # Bits alternate between halving the longitude & the latitude ranges, starting with the longitude
+        value, value_range = (longitude, longitude_range) if is_longitude else (latitude, latitude_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        is_longitude = not is_longitude
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def get_geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Get the height & the width of the geohash cells of the precision, in degrees."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** (bits - bits // 2)
+
+
+def get_bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Get the (south, west, north, east) box bounding the circle of the radius around the coordinates, the west is
+    greater than the east when the box crosses the antimeridian.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angular_radius)
+    north = latitude + math.degrees(angular_radius)
+    # Circles containing a pole span all the longitudes
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    delta = math.degrees(math.asin(min(math.sin(angular_radius) / math.cos(math.radians(latitude)), 1.0)))
+    west, east = longitude - delta, longitude + delta
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def get_geohash_prefixes(bounding_box: Tuple[float, float, float, float],
+                         max_cells: int = 16) -> Optional[List[str]]:
+    """
+    Get the geohash cells covering the bounding box, at the finest precision needing no more than `max_cells`
+    cells. Returns None when the box is too large to be covered, even by the coarsest cells.
+    """
+    south, west, north, east = bounding_box
+    # Boxes crossing the antimeridian are unwrapped past 180, their longitudes are wrapped back when encoded
+    if west > east:
+        east += 360
+    prefixes = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = get_geohash_cell_size(precision)
+        # The north pole belongs to the last row of cells
+        last_row = min(math.floor((north + 90) / height), round(180 / height) - 1)
+        rows = range(math.floor((south + 90) / height), last_row + 1)
+        columns = range(math.floor((west + 180) / width), math.floor((east + 180) / width) + 1)
+        if len(rows) * len(columns) > max_cells:
+            break
+        prefixes = sorted({
+            encode_geohash(
+                (row + 0.5) * height - 90,
+                ((column + 0.5) * width) % 360 - 180,
+                precision
+            )
+            for row in rows
+            for column in columns
+        })
+    return prefixes
+
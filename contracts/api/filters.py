@@ -1,6 +1,8 @@
-from django.db import models
 from django_filters import rest_framework as filters
 
+from profiles.models import Skill, Language
+from profiles.utils import filter_bitset
+from search.documents import search_index
 from contracts.utils import get_model_field_names
 from contracts.models import Contract, ContractRequest, SoloContract
 
@@ -8,36 +10,45 @@ from contracts.models import Contract, ContractRequest, SoloContract
 class CustomSearchFilter(filters.FilterSet):
     search = filters.CharFilter(method='custom_search', label="Search in title & description & guidelines & restrictions")
     location = filters.CharFilter(method='custom_location', label="Search in city & country & address")
+    # Foreign key to the searched contracts, searching the filtered objects themselves when not set
+    search_field_name = None
 
     def custom_search(self, queryset, name, value):
         """Search in title & description & guidelines & restrictions"""
-        return queryset.filter(
-            models.Q(title__icontains=value) | models.Q(description__icontains=value) |
-            models.Q(guidelines__icontains=value) | models.Q(restrictions__icontains=value)
-        )
+        # Both searches are served by a single full text query, the best matching contracts come first
+        return search_index.search(queryset, value, self.form.cleaned_data.get('location'), self.search_field_name)
 
     def custom_location(self, queryset, name, value):
         """Search in city & country & address"""
-        return queryset.filter(
-            models.Q(city__icontains=value) | models.Q(country__icontains=value) | models.Q(address__icontains=value)
-        )
+        if self.form.cleaned_data.get('search'):
+            return queryset
+        return search_index.search(queryset, location=value, field_name=self.search_field_name)
 
 
 class ContractFilter(CustomSearchFilter):
+    skills = filters.ModelMultipleChoiceFilter(queryset=Skill.objects.all(), method='filter_bitset')
+    languages = filters.ModelMultipleChoiceFilter(queryset=Language.objects.all(), method='filter_bitset')
+
+    def filter_bitset(self, queryset, name, value):
+        return filter_bitset(queryset, name, value)
 
     class Meta:
         model = Contract
         fields = (
-            *get_model_field_names(Contract, ['id', 'is_active', 'create_at', 'update_at']),
+            *get_model_field_names(Contract, ['id', 'is_active', 'skills_bitset', 'languages_bitset', 'create_at',
+                                              'update_at']),
             'search', 'location'
         )
 
 
 class ContractRequestFilter(CustomSearchFilter):
+    matching_score__gte = filters.NumberFilter(field_name='matching_score', lookup_expr='gte')
+    matching_score__lte = filters.NumberFilter(field_name='matching_score', lookup_expr='lte')
+    search_field_name = 'contract'
 
     class Meta:
         model = ContractRequest
-        exclude = ('create_at', 'update_at')
+        exclude = ('matching_breakdown', 'create_at', 'update_at')
 
 
 class SoloContractFilter(CustomSearchFilter):
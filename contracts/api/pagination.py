@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Keyset pagination of the contracts feeds, positioned at the creation date & ID of the last contract of the page,
+    so that any page is read by a range of the feed index, however deep it is. Feeds are paginated forwards only.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def decode_position(self, position):
+        try:
+            create_at, contract_id = position.split('|')
+            return datetime.fromisoformat(create_at), int(contract_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, feed, request, view=None):
+        """Paginate the feed, a callable getting its contracts before a position, up to a limit."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        before = self.decode_position(cursor.position) if cursor is not None and cursor.position else None
+
+        # One more contract is fetched to tell whether there is a next page
+        self.page = feed(before, self.page_size + 1)
+        self.has_next = len(self.page) > self.page_size
+        self.has_previous = False
+        self.page = self.page[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=f'{last.create_at.isoformat()}|{last.pk}'))
+
+    def get_previous_link(self):
+        return None
@@ -1,5 +1,7 @@
+from rest_framework import serializers
 from rest_flex_fields import FlexFieldsModelSerializer
 
+from profiles.api.serializers import ProfileSerializer
 from contracts.models import Contract, ContractRequest, SoloContract
 
 
@@ -7,7 +9,7 @@ class ContractSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Contract
-        exclude = ()
+        exclude = ('skills_bitset', 'languages_bitset', 'is_fanned_out')
         read_only_fields = ('id', 'agency', 'create_at', 'update_at')
         expandable_fields = {
             'agency': ('agencies.api.serializers.AgencySerializer', {'many': False, 'read_only': True}),
@@ -15,12 +17,21 @@ class ContractSerializer(FlexFieldsModelSerializer):
         }
 
 
+class RecommendedContractSerializer(ContractSerializer):
+    matching_score = serializers.FloatField(read_only=True)
+
+
+class CandidateProfileSerializer(ProfileSerializer):
+    matching_score = serializers.FloatField(read_only=True)
+
+
 class ContractRequestSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = ContractRequest
         exclude = ()
-        read_only_fields = ('id', 'profile', 'contract', 'create_at', 'update_at')
+        read_only_fields = ('id', 'profile', 'contract', 'matching_score', 'matching_breakdown', 'create_at',
+                            'update_at')
         expandable_fields = {
             'profile': ('profiles.api.serializers.ProfileSerializer', {'many': False, 'read_only': True}),
             'contract': ('contracts.api.serializers.ContractSerializer', {'many': False, 'read_only': True}),
@@ -1,18 +1,27 @@
+from functools import partial
+
+from django.db import models
+from django.conf import settings
+
+from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework.mixins import (CreateModelMixin, RetrieveModelMixin, UpdateModelMixin, ListModelMixin,
                                    DestroyModelMixin)
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from accounts.utils import is_model_user, is_director_user
 from accounts.api.permissions import IsModelUser, IsDirectorUser
 from accounts.api.mixins import AllowAnyInSafeMethodOrCustomPermissionMixin
-from contracts.models import Contract, ContractRequest, SoloContract
+from contracts.models import Contract, ContractRequest, SoloContract, ContractFeedItem
 from .filters import ContractFilter, ContractRequestFilter, SoloContractFilter
-from .serializers import (ContractSerializer, ContractRequestSerializer, ProfileContractRequestSerializer,
-                          AgencyContractRequestSerializer, ProfileSoloContractSerializer, AgencySoloContractSerializer)
+from .pagination import FeedCursorPagination
+from .serializers import (ContractSerializer, RecommendedContractSerializer, CandidateProfileSerializer,
+                          ContractRequestSerializer,
+                          ProfileContractRequestSerializer, AgencyContractRequestSerializer,
+                          ProfileSoloContractSerializer, AgencySoloContractSerializer)
 
 
 class ContractViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, CreateModelMixin, RetrieveModelMixin,
@@ -24,9 +33,6 @@ class ContractViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, CreateModelMi
     contract_request_permission_classes = [IsModelUser]
     save_method_permission_classes = [IsAuthenticated]
 
-    def get_requests_queryset(self):
-        return self.get_object().requests.all()
-
     def get_queryset(self):
         queryset = super().get_queryset()
         user = self.request.user
@@ -44,6 +50,10 @@ class ContractViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, CreateModelMi
             return ContractRequestSerializer
         if self.action == 'contract_request':
             return ProfileSoloContractSerializer
+        if self.action == 'recommended':
+            return RecommendedContractSerializer
+        if self.action == 'candidates':
+            return CandidateProfileSerializer
         return super(ContractViewSet, self).get_serializer_class()
 
     def perform_create(self, serializer):
@@ -57,11 +67,59 @@ class ContractViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, CreateModelMi
     def me(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
+    @extend_schema(parameters=[OpenApiParameter('limit', int, description='Number of contracts to be returned')],
+                   responses={200: RecommendedContractSerializer(many=True)})
+    @action(detail=False, methods=["GET"], name='Get Recommended Contracts', permission_classes=[IsModelUser])
+    def recommended(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get('limit', settings.RECOMMENDED_CONTRACTS_LIMIT))
+        except ValueError:
+            limit = settings.RECOMMENDED_CONTRACTS_LIMIT
+        # Clamped, as negative limits would drop the last items off the ranking
+        limit = min(max(limit, 1), settings.RECOMMENDED_CONTRACTS_LIMIT)
+        contracts = Contract.objects.recommended(request.user.profile, limit)
+        serializer = self.get_serializer(contracts, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(description='Active contracts of the agencies the model follows, latest first.',
+                   responses={200: ContractSerializer(many=True)})
+    # The filters are left out, as the feed is read by its own index
+    @action(detail=False, methods=["GET"], name='Get Contracts Feed', permission_classes=[IsModelUser],
+            pagination_class=FeedCursorPagination, filter_backends=[])
+    def feed(self, request, *args, **kwargs):
+        page = self.paginate_queryset(partial(ContractFeedItem.objects.feed, request.user.profile))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @extend_schema(responses={200: ContractRequestSerializer(many=True)})
     @action(detail=True, methods=["GET"], name='Get Contract Requests')
     def requests(self, request, *args, **kwargs):
-        self.get_queryset = self.get_requests_queryset
-        return self.list(request, *args, **kwargs)
+        # The best matching applicants come first, served by the stored matching scores
+        contract_requests = self.get_object().requests.order_by(
+            models.F('matching_score').desc(nulls_last=True), '-create_at'
+        )
+
+        page = self.paginate_queryset(contract_requests)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(contract_requests, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(responses={200: CandidateProfileSerializer(many=True)})
+    @action(detail=True, methods=["GET"], name='Get Contract Candidates', permission_classes=[IsDirectorUser])
+    def candidates(self, request, *args, **kwargs):
+        # All the public profiles are ranked in memory, only the profiles of the page are loaded
+        candidates = self.get_object().rank_candidates()
+
+        page = self.paginate_queryset(candidates)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(candidates, many=True)
+        return Response(serializer.data)
 
     @extend_schema(responses={200: ProfileSoloContractSerializer})
     @action(detail=True, methods=["POST"], name='Request Contract', url_path='request')
@@ -0,0 +1,11 @@
+from search.documents import Document, search_index
+from .models import Contract, SoloContract
+
+
+class ContractDocument(Document):
+    fields = ('title', 'description', 'guidelines', 'restrictions')
+    location_fields = ('city', 'country', 'address')
+
+
+search_index.register(Contract, ContractDocument)
+search_index.register(SoloContract, ContractDocument)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from contracts.models import Contract
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored matching scores of contract requests, e.g. to backfill them or to catch up ' \
+           'with the ages of the applicants changing over time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contract', type=int, nargs='*', help='IDs of the contracts to be refreshed')
+
+    def handle(self, *args, **options):
+        contracts = Contract.objects.filter(requests__isnull=False).distinct()
+        if options['contract']:
+            contracts = contracts.filter(id__in=options['contract'])
+
+        count = 0
+        for contract in contracts.iterator():
+            count += len(contract.refresh_matching_scores())
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed matching scores of {count} contract requests'))
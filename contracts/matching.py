@@ -0,0 +1,433 @@
+import threading
+from datetime import timedelta
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from profiles.models import Profile
+
+
+# Order of the criteria that form the matching score, every criterion scores between 0 and 1
+MATCHING_CRITERIA = (
+    'inboard', 'outboard', 'days', 'skills', 'languages', 'gender', 'race', 'hair', 'eye', 'age', 'height', 'weight'
+)
+
+# Marker used for missing values at the integer columns
+NULL = -1
+
+# Profile fields loaded into columns, date of birth is encoded as YYYYMMDD integer
+PROFILE_FIELDS = (
+    'travel_inboard', 'travel_outboard', 'days_away', 'gender', 'race', 'hair', 'eye', 'height', 'weight',
+    'date_of_birth'
+)
+
+# Bitset fields of the skills & languages, shared by both profiles & contracts
+BITSET_FIELDS = ('skills_bitset', 'languages_bitset')
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Contract fields holding the requirements, besides the skills & languages
+CONTRACT_FIELDS = (
+    'require_travel_inboard', 'require_travel_outboard', 'num_of_days', 'gender', 'race', 'hair', 'eye', 'age_min',
+    'age_max', 'height_min', 'height_max', 'weight_min', 'weight_max'
+)
+
+
+def encode_date(date) -> int:
+    """Encode a date as YYYYMMDD integer, so that the difference between two of them floored by 10000 is an age."""
+    if date is None:
+        return NULL
+    return date.year * 10000 + date.month * 100 + date.day
+
+
+def calculate_age(date_of_birth) -> Optional[int]:
+    """Calculate the age in full years of a date of birth."""
+    if date_of_birth is None:
+        return None
+    return (encode_date(localdate()) - encode_date(date_of_birth)) // 10000
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Count the set bits of every row of a bytes matrix, or of a bytes vector."""
+    return POPCOUNT[bits].sum(axis=-1, dtype=np.int64)
+
+
+def stack_bitsets(bitsets: List[bytes]) -> np.ndarray:
+    """Stack bitsets into a bytes matrix with one row per bitset, padded with zeros to the widest one."""
+    bits = np.zeros((len(bitsets), max(map(len, bitsets), default=0)), dtype=np.uint8)
+    for row, bitset in enumerate(bitsets):
+        bits[row, :len(bitset)] = np.frombuffer(bitset, dtype=np.uint8)
+    return bits
+
+
+def encode_value(value) -> int:
+    """Encode nullable booleans & small integers into a single integer column value."""
+    if value is None:
+        return NULL
+    return int(value)
+
+
+class ContractRequirements:
+    """Plain snapshot of the contract requirements used in matching."""
+
+    def __init__(self, contract):
+        self.require_travel_inboard = contract.require_travel_inboard
+        self.require_travel_outboard = contract.require_travel_outboard
+        self.num_of_days = contract.num_of_days
+        self.gender = contract.gender
+        self.race = contract.race
+        self.hair = contract.hair
+        self.eye = contract.eye
+        self.age_min, self.age_max = contract.age_min, contract.age_max
+        self.height_min, self.height_max = contract.height_min, contract.height_max
+        self.weight_min, self.weight_max = contract.weight_min, contract.weight_max
+        self.skills = np.frombuffer(bytes(contract.skills_bitset), dtype=np.uint8)
+        self.languages = np.frombuffer(bytes(contract.languages_bitset), dtype=np.uint8)
+
+    @classmethod
+    def from_contract(cls, contract) -> 'ContractRequirements':
+        return cls(contract)
+
+
+class ProfileColumns:
+    """
+    Column oriented snapshot of the profile attributes used in matching.
+
+    Every attribute is held as a numpy array with one row per profile, while skills & languages are held as bytes
+    matrices of their bitsets. Loading costs a single query regardless of the number of profiles, and scoring works
+    on whole columns at once instead of instantiating a model per profile.
+    """
+
+    def __init__(self, ids: np.ndarray, columns: Dict[str, np.ndarray], skills: np.ndarray, languages: np.ndarray,
+                 rows: Dict[int, int] = None):
+        self.ids = ids
+        self.columns = columns
+        self.skills = skills
+        self.languages = languages
+        self.rows = rows if rows is not None else {profile_id: row for row, profile_id in enumerate(ids.tolist())}
+        # Rows of removed profiles are kept as holes, instead of shifting the rows after them
+        self.alive = np.ones(len(ids), dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_queryset(cls, queryset=None) -> 'ProfileColumns':
+        queryset = (queryset if queryset is not None else Profile.objects.all()).order_by()
+        records = list(queryset.values_list('id', *PROFILE_FIELDS, *BITSET_FIELDS))
+        ids = np.array([record[0] for record in records], dtype=np.int64)
+        columns = {
+            field: np.array([encode_value(record[index]) for record in records], dtype=np.int32)
+            for index, field in enumerate(PROFILE_FIELDS[:-1], start=1)
+        }
+        dob_index = len(PROFILE_FIELDS)
+        columns['date_of_birth'] = np.array([encode_date(record[dob_index]) for record in records], dtype=np.int32)
+        return cls(
+            ids,
+            columns,
+            stack_bitsets([bytes(record[-2]) for record in records]),
+            stack_bitsets([bytes(record[-1]) for record in records])
+        )
+
+    @staticmethod
+    def _merge_bits(bits: np.ndarray, other: np.ndarray, target: np.ndarray, appended: int) -> np.ndarray:
+        merged = np.zeros((len(bits) + appended, max(bits.shape[1], other.shape[1])), dtype=np.uint8)
+        merged[:len(bits), :bits.shape[1]] = bits
+        merged[target] = 0
+        merged[target, :other.shape[1]] = other
+        return merged
+
+    def discard(self, ids: Iterable[int]) -> None:
+        """Mark the rows of the profiles as removed."""
+        rows = [self.rows[profile_id] for profile_id in ids if profile_id in self.rows]
+        self.alive[rows] = False
+
+    def merge(self, other: 'ProfileColumns') -> None:
+        """Overwrite the rows of the profiles loaded at the other columns, appending the ones not existing yet."""
+        other_ids = other.ids.tolist()
+        new_ids = [profile_id for profile_id in other_ids if profile_id not in self.rows]
+        for row, profile_id in enumerate(new_ids, start=len(self.ids)):
+            self.rows[profile_id] = row
+        target = np.array([self.rows[profile_id] for profile_id in other_ids], dtype=np.int64)
+
+        # Arrays are replaced rather than resized, so the ones handed out before stay untouched
+        appended = len(new_ids)
+        self.ids = np.concatenate([self.ids, np.array(new_ids, dtype=np.int64)])
+        for field, values in self.columns.items():
+            column = np.concatenate([values, np.full(appended, NULL, dtype=values.dtype)])
+            column[target] = other.columns[field]
+            self.columns[field] = column
+        self.alive = np.concatenate([self.alive, np.zeros(appended, dtype=bool)])
+        self.alive[target] = True
+        self.skills = self._merge_bits(self.skills, other.skills, target, appended)
+        self.languages = self._merge_bits(self.languages, other.languages, target, appended)
+
+    def _ones(self) -> np.ndarray:
+        return np.ones(len(self), dtype=np.float64)
+
+    def _equals(self, field: str, value) -> np.ndarray:
+        # Unconstrained requirements are satisfied by every profile
+        if value is None:
+            return self._ones()
+        return (self.columns[field] == int(value)).astype(np.float64)
+
+    def _within(self, values: np.ndarray, low: Optional[int], high: Optional[int]) -> np.ndarray:
+        if low is None and high is None:
+            return self._ones()
+        result = values != NULL
+        if low is not None:
+            result &= values >= low
+        if high is not None:
+            result &= values <= high
+        return result.astype(np.float64)
+
+    def _overlap(self, bits: np.ndarray, required: np.ndarray) -> np.ndarray:
+        required_count = popcount(required)
+        if not required_count:
+            return self._ones()
+        # Bits beyond the width of either side can't be shared by both
+        width = min(bits.shape[1], len(required))
+        return popcount(bits[:, :width] & required[:width]) / required_count
+
+    def ages(self) -> np.ndarray:
+        dates_of_birth = self.columns['date_of_birth']
+        ages = (encode_date(localdate()) - dates_of_birth) // 10000
+        return np.where(dates_of_birth == NULL, NULL, ages)
+
+    def score(self, requirements: ContractRequirements) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Score every profile against the requirements, return the matching scores and the per criterion ones."""
+        days_away = self.columns['days_away']
+        breakdown = {
+            'inboard': self._equals('travel_inboard', requirements.require_travel_inboard),
+            'outboard': self._equals('travel_outboard', requirements.require_travel_outboard),
+            'days': self._within(days_away, requirements.num_of_days, None),
+            'skills': self._overlap(self.skills, requirements.skills),
+            'languages': self._overlap(self.languages, requirements.languages),
+            'gender': self._equals('gender', requirements.gender),
+            'race': self._equals('race', requirements.race),
+            'hair': self._equals('hair', requirements.hair),
+            'eye': self._equals('eye', requirements.eye),
+            'age': self._within(self.ages(), requirements.age_min, requirements.age_max),
+            'height': self._within(self.columns['height'], requirements.height_min, requirements.height_max),
+            'weight': self._within(self.columns['weight'], requirements.weight_min, requirements.weight_max),
+        }
+        scores = np.vstack([breakdown[criterion] for criterion in MATCHING_CRITERIA]).mean(axis=0)
+        return scores, breakdown
+
+
+class ContractColumns:
+    """
+    Column oriented snapshot of the contract requirements used in matching, the counterpart of the profile columns.
+
+    Every requirement is held as a numpy array with one row per contract, missing ones being `NULL`, so that a profile
+    is scored against all the contracts at once.
+    """
+
+    def __init__(self, ids: np.ndarray, columns: Dict[str, np.ndarray], skills: np.ndarray, languages: np.ndarray):
+        self.ids = ids
+        self.columns = columns
+        self.skills = skills
+        self.languages = languages
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_queryset(cls, queryset) -> 'ContractColumns':
+        records = list(queryset.order_by().values_list('id', *CONTRACT_FIELDS, *BITSET_FIELDS))
+        return cls(
+            np.array([record[0] for record in records], dtype=np.int64),
+            {
+                field: np.array([encode_value(record[index]) for record in records], dtype=np.int32)
+                for index, field in enumerate(CONTRACT_FIELDS, start=1)
+            },
+            stack_bitsets([bytes(record[-2]) for record in records]),
+            stack_bitsets([bytes(record[-1]) for record in records])
+        )
+
+    @staticmethod
+    def _equals(value: int, required: np.ndarray) -> np.ndarray:
+        # Unconstrained requirements are satisfied by every profile
+        return ((required == NULL) | (required == value)).astype(np.float64)
+
+    @staticmethod
+    def _within(value: int, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        unconstrained = (low == NULL) & (high == NULL)
+        within = (value != NULL) & ((low == NULL) | (value >= low)) & ((high == NULL) | (value <= high))
+        return (unconstrained | within).astype(np.float64)
+
+    @staticmethod
+    def _overlap(bits: np.ndarray, required: np.ndarray) -> np.ndarray:
+        required_counts = popcount(required)
+        # Bits beyond the width of either side can't be shared by both
+        width = min(len(bits), required.shape[1])
+        shared = popcount(required[:, :width] & bits[:width])
+        return np.where(required_counts > 0, shared / np.maximum(required_counts, 1), 1.0)
+
+    def score(self, profiles: ProfileColumns, row: int = 0) -> np.ndarray:
+        """Score the profile at the row of the profile columns against every contract, return the matching scores."""
+        values = {field: int(column[row]) for field, column in profiles.columns.items()}
+        unbounded = np.full(len(self), NULL, dtype=np.int32)
+        columns = self.columns
+        breakdown = {
+            'inboard': self._equals(values['travel_inboard'], columns['require_travel_inboard']),
+            'outboard': self._equals(values['travel_outboard'], columns['require_travel_outboard']),
+            'days': self._within(values['days_away'], columns['num_of_days'], unbounded),
+            'skills': self._overlap(profiles.skills[row], self.skills),
+            'languages': self._overlap(profiles.languages[row], self.languages),
+            'gender': self._equals(values['gender'], columns['gender']),
+            'race': self._equals(values['race'], columns['race']),
+            'hair': self._equals(values['hair'], columns['hair']),
+            'eye': self._equals(values['eye'], columns['eye']),
+            'age': self._within(int(profiles.ages()[row]), columns['age_min'], columns['age_max']),
+            'height': self._within(values['height'], columns['height_min'], columns['height_max']),
+            'weight': self._within(values['weight'], columns['weight_min'], columns['weight_max']),
+        }
+        return np.vstack([breakdown[criterion] for criterion in MATCHING_CRITERIA]).mean(axis=0)
+
+
+class RankedProfiles(Sequence):
+    """
+    Profiles sorted by matching score in a descending order, ties are broken by the profile ID.
+
+    Only the sliced profiles are loaded from the database, which makes the sequence usable by the paginators.
+    """
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, queryset):
+        self.ids = ids
+        self.scores = scores
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self))
+        if start >= stop:
+            return []
+        return self.load(self.top(stop)[start:stop])
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def top(self, count: int) -> np.ndarray:
+        """Get the positions of the best `count` profiles, without sorting the whole scores."""
+        if count < len(self):
+            # Keep every profile tied with the last one, so that the order is the same on every page
+            threshold = np.partition(-self.scores, count - 1)[count - 1]
+            candidates = np.flatnonzero(-self.scores <= threshold)
+        else:
+            candidates = np.arange(len(self))
+        order = np.lexsort((self.ids[candidates], -self.scores[candidates]))
+        return candidates[order][:count]
+
+    def load(self, positions: np.ndarray) -> list:
+        profiles = self.queryset.in_bulk(self.ids[positions].tolist())
+        ranked = []
+        for position in positions.tolist():
+            profile = profiles.get(int(self.ids[position]))
+            # Profiles removed since the last refresh of the index are skipped
+            if profile is not None:
+                profile.matching_score = float(self.scores[position])
+                ranked.append(profile)
+        return ranked
+
+
+class ProfileIndex:
+    """
+    In memory columnar index of the public profiles of active users, used to rank all of them against a contract.
+
+    On every access, the profiles updated since the previous access are reloaded into the index, and the indexed ones
+    are reconciled with the queryset whenever their counts differ. The index is rebuilt from scratch once every
+    `PROFILE_INDEX_REBUILD_INTERVAL` seconds, dropping the holes of removed profiles.
+    """
+
+    # Margin for the clocks of the workers that update the profiles
+    refresh_margin = timedelta(seconds=5)
+
+    def __init__(self):
+        self.columns: Optional[ProfileColumns] = None
+        self.built_at = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_queryset():
+        return Profile.objects.active().filter(is_public=True)
+
+    def build(self) -> None:
+        now = timezone.now()
+        self.columns = ProfileColumns.from_queryset(self.get_queryset())
+        self.built_at = self.refreshed_at = now
+
+    def refresh(self) -> None:
+        now = timezone.now()
+        changes = Profile.objects.filter(update_at__gte=self.refreshed_at - self.refresh_margin).values_list(
+            'id', 'is_public', 'user__is_active'
+        )
+        kept, removed = [], []
+        for profile_id, is_public, is_active in changes:
+            (kept if is_public and is_active else removed).append(profile_id)
+        self.columns.discard(removed)
+        if kept:
+            self.columns.merge(ProfileColumns.from_queryset(Profile.objects.filter(id__in=kept)))
+        # Deleted profiles & users (de)activated in bulk leave the updated profiles as they are, they're caught by the
+        # count of the indexed profiles drifting from the one of the queryset instead
+        if self.get_queryset().count() != np.count_nonzero(self.columns.alive):
+            self.reconcile()
+        self.refreshed_at = now
+
+    def reconcile(self) -> None:
+        """Discard the indexed profiles missing from the queryset, and load the ones missing from the index."""
+        ids = set(self.get_queryset().values_list('id', flat=True))
+        indexed = set(self.columns.ids[self.columns.alive].tolist())
+        self.columns.discard(indexed - ids)
+        if ids - indexed:
+            self.columns.merge(ProfileColumns.from_queryset(Profile.objects.filter(id__in=ids - indexed)))
+
+    def rank(self, requirements: ContractRequirements) -> RankedProfiles:
+        """Rank all the indexed profiles against the requirements."""
+        with self.lock:
+            interval = timedelta(seconds=settings.PROFILE_INDEX_REBUILD_INTERVAL)
+            if self.columns is None or timezone.now() - self.built_at > interval:
+                self.build()
+            else:
+                self.refresh()
+            scores, _ = self.columns.score(requirements)
+            # Taken within the lock, as the columns are discarded & merged into by the concurrent refreshes
+            alive = self.columns.alive
+            ids, scores = self.columns.ids[alive], scores[alive]
+        queryset = self.get_queryset().prefetch_related('skills', 'languages')
+        return RankedProfiles(ids, scores, queryset)
+
+
+profile_index = ProfileIndex()
+
+
+def get_row_breakdown(breakdown: Dict[str, np.ndarray], row: int) -> Dict[str, float]:
+    """Get the per criterion scores of a single row."""
+    return {criterion: float(breakdown[criterion][row]) for criterion in MATCHING_CRITERIA}
+
+
+def rank_contracts(profiles: ProfileColumns, contracts: ContractColumns, limit: int) -> List[Tuple[int, float]]:
+    """
+    Rank the contracts for the first profile of the columns, return the top (contract id, score) pairs.
+
+    All the contracts are scored in one pass, and only the best `limit` ones are sorted, ties broken by the contract ID.
+    """
+    scores = contracts.score(profiles)
+    if limit < len(scores):
+        # Keep every contract tied with the last one, so that the ties are broken by the ID rather than arbitrarily
+        threshold = np.partition(-scores, limit - 1)[limit - 1]
+        positions = np.flatnonzero(-scores <= threshold)
+    else:
+        positions = np.arange(len(scores))
+    positions = positions[np.lexsort((contracts.ids[positions], -scores[positions]))][:limit]
+    return [(int(contracts.ids[position]), float(scores[position])) for position in positions.tolist()]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractrequest',
+            name='matching_breakdown',
+            field=models.JSONField(blank=True, help_text='Score of every matching criterion', null=True, verbose_name='Matching Breakdown'),
+        ),
+        migrations.AddField(
+            model_name='contractrequest',
+            name='matching_score',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Matching Score'),
+        ),
+        migrations.AddIndex(
+            model_name='contractrequest',
+            index=models.Index(fields=['contract', '-matching_score'], name='contracts_c_contrac_888679_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+from profiles.utils import refresh_bitsets
+
+
+def fill_bitsets(apps, schema_editor):
+    model = apps.get_model('contracts', 'Contract')
+    ids = list(model.objects.values_list('pk', flat=True))
+    for field_name in ('skills', 'languages'):
+        refresh_bitsets(model, field_name, ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0002_contractrequest_matching_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='languages_bitset',
+            field=models.BinaryField(default=b'', verbose_name='Languages Bitset'),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='skills_bitset',
+            field=models.BinaryField(default=b'', verbose_name='Skills Bitset'),
+        ),
+        migrations.RunPython(fill_bitsets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0003_contract_bitsets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='create_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation Date'),
+        ),
+        migrations.AlterField(
+            model_name='solocontract',
+            name='create_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation Date'),
+        ),
+    ]
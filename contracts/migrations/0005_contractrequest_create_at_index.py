@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0004_create_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contractrequest',
+            name='create_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation Date'),
+        ),
+    ]
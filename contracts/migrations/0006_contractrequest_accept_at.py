@@ -0,0 +1,27 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:18
+
+from django.db import migrations, models
+
+from contracts.enums import StatusChoices
+
+
+def fill_accept_dates(apps, schema_editor):
+    # The last update of the accepted requests is the closest to their acceptance
+    model = apps.get_model('contracts', 'ContractRequest')
+    model.objects.filter(status=StatusChoices.ACCEPTED).update(accept_at=models.F('update_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0005_contractrequest_create_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractrequest',
+            name='accept_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Acceptance Date'),
+        ),
+        migrations.RunPython(fill_accept_dates, migrations.RunPython.noop),
+    ]
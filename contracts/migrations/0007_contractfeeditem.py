@@ -0,0 +1,55 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0016_profile_followers_count_profile_following_count'),
+        ('contracts', '0006_contractrequest_accept_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractFeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_at', models.DateTimeField(verbose_name='Creation Date')),
+            ],
+            options={
+                'verbose_name': 'Contract Feed Item',
+                'verbose_name_plural': 'Contract Feed Items',
+                'ordering': ('-create_at', '-contract_id'),
+            },
+        ),
+        # Existing contracts aren't fanned out, the feeds read them from the agencies instead
+        migrations.AddField(
+            model_name='contract',
+            name='is_fanned_out',
+            field=models.BooleanField(default=False, editable=False, help_text='Designates whether contract is pushed to the feeds of the agency followers, otherwise the feeds read it from the agency contracts', verbose_name='Is Fanned Out'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(condition=models.Q(('is_fanned_out', False)), fields=['agency', '-create_at'], name='contract_feed_read_idx'),
+        ),
+        migrations.AddField(
+            model_name='contractfeeditem',
+            name='contract',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='contracts.contract', verbose_name='Contract'),
+        ),
+        migrations.AddField(
+            model_name='contractfeeditem',
+            name='profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='profiles.profile', verbose_name='Profile'),
+        ),
+        migrations.AddIndex(
+            model_name='contractfeeditem',
+            index=models.Index(fields=['profile', '-create_at', '-contract'], name='contracts_c_profile_85210a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='contractfeeditem',
+            unique_together={('profile', 'contract')},
+        ),
+    ]
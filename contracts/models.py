@@ -1,7 +1,13 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import ValidationError, MinValueValidator, MaxValueValidator
@@ -14,7 +20,15 @@ from agencies.models import Agency
 from agencies.enums import IndustryChoices
 from profiles.models import Language, Skill, Profile
 from profiles.enums import GenderChoices, HairColorChoices, EyeColorChoices, RaceChoices
+from profiles.utils import get_related_ids, refresh_bitsets, stash_related_ids
 from .enums import StatusChoices
+from .matching import (MATCHING_CRITERIA, CONTRACT_FIELDS, PROFILE_FIELDS, ContractColumns, ContractRequirements,
+                       ProfileColumns, RankedProfiles, calculate_age, get_row_breakdown, profile_index, rank_contracts)
+from .utils import get_recommendations_cache_key, invalidate_profile_recommendations, invalidate_recommendations
+
+
+# Fields of the contracts altering their recommendations, the matched ones & the ones telling whether they're open
+RECOMMENDED_FIELDS = (*CONTRACT_FIELDS, 'is_active', 'start_at')
 
 
 class BaseContract(models.Model):
@@ -56,6 +70,79 @@ class BaseContract(models.Model):
         abstract = True
 
 
+class ContractQuerySet(models.QuerySet):
+
+    def active(self):
+        return self.filter(is_active=True, start_at__gt=timezone.now())
+
+    def fit_for(self, profile):
+        """
+        Filter out the contracts whose hard constraints exclude the profile.
+
+        Constraints on attributes the profile didn't fill are kept, leaving them to the matching score.
+        """
+        queryset = self
+        for field in ('gender', 'race', 'hair', 'eye'):
+            value = getattr(profile, field)
+            if value is not None:
+                queryset = queryset.filter(models.Q(**{f'{field}__isnull': True}) | models.Q(**{field: value}))
+
+        # Unwilling to travel models can't take contracts that require traveling
+        if profile.travel_inboard is False:
+            queryset = queryset.exclude(require_travel_inboard=True)
+        if profile.travel_outboard is False:
+            queryset = queryset.exclude(require_travel_outboard=True)
+        if profile.days_away is not None:
+            queryset = queryset.filter(models.Q(num_of_days__isnull=True) | models.Q(num_of_days__lte=profile.days_away))
+
+        for field, value in (('age', calculate_age(profile.date_of_birth)), ('height', profile.height),
+                             ('weight', profile.weight)):
+            if value is not None:
+                queryset = queryset.filter(
+                    models.Q(**{f'{field}_min__isnull': True}) | models.Q(**{f'{field}_min__lte': value}),
+                    models.Q(**{f'{field}_max__isnull': True}) | models.Q(**{f'{field}_max__gte': value})
+                )
+        return queryset
+
+
+class ContractManager(models.Manager):
+
+    def get_queryset(self):
+        return ContractQuerySet(self.model, using=self._db)
+
+    def active(self):
+        return self.get_queryset().active()
+
+    def recommended(self, profile, limit=None):
+        """
+        Get the active contracts that match the profile the most, sorted by their matching scores.
+
+        The ranking is cached per profile, while the contracts themselves are always loaded fresh.
+        """
+        limit = limit or settings.RECOMMENDED_CONTRACTS_LIMIT
+        cache_key = get_recommendations_cache_key(profile.pk)
+        ranking = cache.get(cache_key)
+        if ranking is None:
+            ranking = rank_contracts(
+                ProfileColumns.from_queryset(Profile.objects.filter(pk=profile.pk)),
+                ContractColumns.from_queryset(self.active().fit_for(profile)),
+                settings.RECOMMENDED_CONTRACTS_LIMIT
+            )
+            cache.set(cache_key, ranking, timeout=settings.RECOMMENDED_CONTRACTS_CACHE_TIMEOUT)
+
+        ranking = ranking[:limit]
+        contracts = self.active().prefetch_related('skills', 'languages').in_bulk(
+            [contract_id for contract_id, _ in ranking]
+        )
+        recommended = []
+        for contract_id, score in ranking:
+            contract = contracts.get(contract_id)
+            if contract is not None:
+                contract.matching_score = score
+                recommended.append(contract)
+        return recommended
+
+
 class Contract(BaseContract):
     agency = models.ForeignKey(Agency, on_delete=models.CASCADE, related_name='contracts', verbose_name=_('Agency'))
 
@@ -67,6 +154,8 @@ class Contract(BaseContract):
     # Personal Details
     skills = models.ManyToManyField(Skill, blank=True, verbose_name=_('Skills'))
     languages = models.ManyToManyField(Language, blank=True, verbose_name=_('Languages'))
+    skills_bitset = models.BinaryField(default=b'', editable=False, verbose_name=_('Skills Bitset'))
+    languages_bitset = models.BinaryField(default=b'', editable=False, verbose_name=_('Languages Bitset'))
 
     gender = models.PositiveSmallIntegerField(choices=GenderChoices.choices, default=GenderChoices.MALE, null=True,
                                               blank=True, verbose_name=_('Gender'))
@@ -100,15 +189,25 @@ class Contract(BaseContract):
     # Others
     is_active = models.BooleanField(default=True, blank=True, verbose_name=_('Active'),
                                     help_text=_('Designates whether contract is viewed for models'))
+    is_fanned_out = models.BooleanField(default=False, editable=False, verbose_name=_('Is Fanned Out'),
+                                        help_text=_('Designates whether contract is pushed to the feeds of the agency '
+                                                    'followers, otherwise the feeds read it from the agency contracts'))
 
     # Manipulation Attributes
-    create_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Creation Date'))
+    create_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('Creation Date'))
     update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
 
+    objects = ContractManager()
+
     class Meta:
         verbose_name = _('Contract')
         verbose_name_plural = _('Contracts')
         ordering = ('-create_at', '-update_at')
+        indexes = (
+            # Contracts read by the feeds, rather than pushed to them
+            models.Index(fields=['agency', '-create_at'], condition=models.Q(is_fanned_out=False),
+                         name='contract_feed_read_idx'),
+        )
 
     def save(self, *args, **kwargs):
         if self.start_at and (self.start_at <= timezone.now() + timezone.timedelta(days=1)):
@@ -122,11 +221,86 @@ class Contract(BaseContract):
         if (self.require_travel_inboard is not None and self.require_travel_outboard is not None) and \
                 (self.require_travel_inboard and self.require_travel_outboard):
             raise ValidationError(_("Location cant require travelling inboard and outboard at the same time"))
-        return super().save(*args, **kwargs)
+        if self._state.adding:
+            # Contracts of agencies having too many followers are read by their feeds, rather than fanned out to them
+            self.is_fanned_out = self.agency.followers_count <= settings.CONTRACT_FEED_FANOUT_LIMIT
+        super().save(*args, **kwargs)
+        self._recommended_values = self.get_recommended_values()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept to tell whether the saves change the recommendations
+        instance._recommended_values = instance.get_recommended_values()
+        return instance
 
     def __str__(self):
         return self.title
 
+    def get_recommended_values(self) -> dict:
+        deferred = self.get_deferred_fields()
+        return {field: getattr(self, field) for field in RECOMMENDED_FIELDS if field not in deferred}
+
+    def has_recommended_changes(self) -> bool:
+        """Check whether the fields altering the recommendations changed since the contract was loaded or saved."""
+        loaded = getattr(self, '_recommended_values', {})
+        return any(
+            field not in loaded or loaded[field] != value for field, value in self.get_recommended_values().items()
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self.is_active and self.start_at > timezone.now()
+
+    def score_requests(self, requests=None):
+        """
+        Score the requests of the contract in one pass & return them sorted by matching score.
+
+        The profiles of the applicants are loaded into column arrays at once, so the number of queries
+        doesn't grow with the number of requests. In case of `requests` being none, all the requests are scored.
+        """
+        requests = list(self.requests.all() if requests is None else requests)
+        columns = ProfileColumns.from_queryset(
+            Profile.objects.filter(id__in={contract_request.profile_id for contract_request in requests})
+        )
+        scores, breakdown = columns.score(ContractRequirements.from_contract(self))
+        for contract_request in requests:
+            row = columns.rows[contract_request.profile_id]
+            contract_request.contract = self
+            contract_request.matching_breakdown = get_row_breakdown(breakdown, row)
+            contract_request.matching_score = float(scores[row])
+        return sorted(requests, key=lambda contract_request: contract_request.matching_score, reverse=True)
+
+    def refresh_matching_scores(self, requests=None):
+        """Score the requests of the contract & store their matching scores."""
+        requests = self.score_requests(requests)
+        ContractRequest.objects.bulk_update(requests, ['matching_score', 'matching_breakdown'])
+        return requests
+
+    def rank_candidates(self) -> RankedProfiles:
+        """Rank all the public profiles against the contract, served by the in memory profile index."""
+        return profile_index.rank(ContractRequirements.from_contract(self))
+
+
+class ContractRequestQuerySet(models.QuerySet):
+
+    def refresh_matching_scores(self):
+        """Recompute & store the matching scores of the requests, scoring them in one batch per contract."""
+        requests_by_contract = defaultdict(list)
+        for contract_request in self.select_related('contract'):
+            requests_by_contract[contract_request.contract_id].append(contract_request)
+        for requests in requests_by_contract.values():
+            requests[0].contract.refresh_matching_scores(requests)
+
+
+class ContractRequestManager(models.Manager):
+
+    def get_queryset(self):
+        return ContractRequestQuerySet(self.model, using=self._db)
+
+    def refresh_matching_scores(self):
+        return self.get_queryset().refresh_matching_scores()
+
 
 class ContractRequest(models.Model):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='contract_requests', verbose_name=_('Profile'))
@@ -142,89 +316,94 @@ class ContractRequest(models.Model):
                              ],
                              verbose_name=_('Money Offer'))
     director_notes = models.TextField(blank=True, verbose_name=_('Director Notes'))
-    create_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Creation Date'))
+
+    # Matching Attributes, kept in sync with the profile & contract by signals
+    matching_score = models.FloatField(null=True, blank=True, db_index=True, verbose_name=_('Matching Score'))
+    matching_breakdown = models.JSONField(null=True, blank=True, verbose_name=_('Matching Breakdown'),
+                                          help_text=_('Score of every matching criterion'))
+
+    accept_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Acceptance Date'))
+    create_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('Creation Date'))
     update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
 
+    objects = ContractRequestManager()
+
     class Meta:
         verbose_name = _('Contract Request')
         verbose_name_plural = _('Contract Requests')
         ordering = ('-create_at', '-update_at')
+        indexes = (
+            models.Index(fields=['contract', '-matching_score']),
+        )
+
+    def save(self, *args, **kwargs):
+        # Accepted since the first save having the accepted status, for the time to accept of the contracts funnel
+        accept_at = self.accept_at
+        if self.status != StatusChoices.ACCEPTED:
+            self.accept_at = None
+        elif self.accept_at is None:
+            self.accept_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.accept_at != accept_at:
+            kwargs['update_fields'] = {*update_fields, 'accept_at'}
+        return super().save(*args, **kwargs)
+
+    def get_criterion_score(self, criterion):
+        if self.matching_breakdown is None:
+            return None
+        return self.matching_breakdown.get(criterion)
 
     @property
     def inboard_score(self):
-        return self.contract.require_travel_inboard == self.profile.travel_inboard
+        return self.get_criterion_score('inboard')
 
     @property
     def outboard_score(self):
-        return self.contract.require_travel_outboard == self.profile.travel_outboard
+        return self.get_criterion_score('outboard')
 
     @property
     def days_score(self):
-        return self.contract.num_of_days <= self.profile.days_away
+        return self.get_criterion_score('days')
 
     @property
     def skills_score(self):
-        contract_skills = self.contract.skills.all()
-        all_skills_count = contract_skills.count()
-        intersection_skills_count = contract_skills.intersection(self.profile.skills.all()).count()
-        return intersection_skills_count / all_skills_count
+        return self.get_criterion_score('skills')
 
     @property
     def languages_score(self):
-        contract_languages = self.contract.languages.all()
-        all_languages_count = contract_languages.count()
-        intersection_languages_count = contract_languages.intersection(self.profile.languages.all()).count()
-        return intersection_languages_count / all_languages_count
+        return self.get_criterion_score('languages')
 
     @property
     def gender_score(self):
-        return self.contract.gender == self.profile.gender
+        return self.get_criterion_score('gender')
 
     @property
     def race_score(self):
-        return self.contract.race == self.profile.race
+        return self.get_criterion_score('race')
 
     @property
     def hair_score(self):
-        return self.contract.hair == self.profile.hair
+        return self.get_criterion_score('hair')
 
     @property
     def eye_score(self):
-        return self.contract.eye == self.profile.eye
+        return self.get_criterion_score('eye')
 
     @property
     def age_score(self):
-        return self.contract.age_min < self.profile.age < self.contract.age_max
+        return self.get_criterion_score('age')
 
     @property
     def height_score(self):
-        return self.contract.height_min < self.profile.height < self.contract.height_max
+        return self.get_criterion_score('height')
 
     @property
     def weight_score(self):
-        return self.contract.height_min < self.profile.height < self.contract.height_max
+        return self.get_criterion_score('weight')
 
     @property
     def scores(self):
-        return [
-            self.inboard_score,
-            self.outboard_score,
-            self.days_score,
-            self.skills_score,
-            self.languages_score,
-            self.gender_score,
-            self.race_score,
-            self.hair_score,
-            self.eye_score,
-            self.age_score,
-            self.height_score,
-            self.weight_score
-        ]
-
-    @property
-    def matching_score(self):
-        scores = self.scores
-        return sum(scores) / len(scores)
+        return [self.get_criterion_score(criterion) for criterion in MATCHING_CRITERIA]
 
 
 class SoloContract(BaseContract):
@@ -233,7 +412,7 @@ class SoloContract(BaseContract):
     model_notes = models.TextField(blank=True, verbose_name=_('Director Notes'))
     status = models.PositiveSmallIntegerField(choices=StatusChoices.choices, default=StatusChoices.PENDING, null=True,
                                               blank=True, verbose_name=_('Status'))
-    create_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Creation Date'))
+    create_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('Creation Date'))
     update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
 
     class Meta:
@@ -242,9 +421,248 @@ class SoloContract(BaseContract):
         ordering = ('-create_at', '-update_at')
 
 
+class ContractFeedItemManager(models.Manager):
+
+    def fan_out(self, contract, batch_size: int = 1000):
+        """Push the contract to the feeds of the profiles following its agency."""
+        followers = Profile.following_agencies.through.objects.filter(agency=contract.agency_id)
+        self.bulk_create(
+            [self.model(profile_id=profile_id, contract=contract, create_at=contract.create_at)
+             for profile_id in followers.values_list('profile', flat=True).iterator()],
+            batch_size=batch_size, ignore_conflicts=True
+        )
+
+    def backfill(self, profile_ids, agency_ids, size: Optional[int] = None):
+        """Push the latest fanned out contracts of the agencies to the feeds of the profiles, once following them."""
+        size = size or settings.CONTRACT_FEED_BACKFILL_SIZE
+        # Latest contracts of every agency in a single query, ranked within their agency
+        contracts = Contract.objects.filter(agency__in=agency_ids, is_fanned_out=True).annotate(
+            position=models.Window(RowNumber(), partition_by='agency', order_by=('-create_at', '-pk'))
+        ).filter(position__lte=size).values_list('pk', 'create_at')
+        self.bulk_create(
+            [self.model(profile_id=profile_id, contract_id=contract_id, create_at=create_at)
+             for profile_id in profile_ids for contract_id, create_at in contracts],
+            ignore_conflicts=True
+        )
+
+    def withdraw(self, profile_ids=None, agency_ids=None):
+        """Remove the contracts of the agencies from the feeds of the profiles, once unfollowing them."""
+        lookups = {}
+        if profile_ids is not None:
+            lookups['profile__in'] = profile_ids
+        if agency_ids is not None:
+            lookups['contract__agency__in'] = agency_ids
+        self.filter(**lookups).delete()
+
+    def feed(self, profile, before: Optional[Tuple[datetime, int]] = None, limit: Optional[int] = None) -> List:
+        """
+        Get the active contracts of the agencies the profile follows, latest first, before the creation date & ID of
+        a contract if any.
+
+        Fanned out contracts are read from the profile feed by a range of its index, merged with the contracts read
+        from the agencies which aren't fanned out.
+        """
+        limit = limit or settings.REST_FRAMEWORK['PAGE_SIZE']
+        pushed = self.filter(profile=profile, contract__is_active=True)
+        read = Contract.objects.filter(
+            agency__in=profile.following_agencies.values('pk'), is_fanned_out=False, is_active=True
+        )
+        if before is not None:
+            create_at, contract_id = before
+            pushed = pushed.filter(models.Q(create_at__lt=create_at) |
+                                   models.Q(create_at=create_at, contract_id__lt=contract_id))
+            read = read.filter(models.Q(create_at__lt=create_at) | models.Q(create_at=create_at, pk__lt=contract_id))
+        positions = sorted({
+            *pushed.order_by('-create_at', '-contract_id').values_list('create_at', 'contract_id')[:limit],
+            *read.order_by('-create_at', '-pk').values_list('create_at', 'pk')[:limit]
+        }, reverse=True)[:limit]
+        contracts = Contract.objects.prefetch_related('skills', 'languages').in_bulk(
+            [contract_id for _, contract_id in positions]
+        )
+        return [contracts[contract_id] for _, contract_id in positions if contract_id in contracts]
+
+
+class ContractFeedItem(models.Model):
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='feed_items', verbose_name=_('Profile'))
+    contract = models.ForeignKey(Contract, on_delete=models.CASCADE, related_name='feed_items',
+                                 verbose_name=_('Contract'))
+    # Copied from the contract, so that the feeds are sorted by their own index
+    create_at = models.DateTimeField(verbose_name=_('Creation Date'))
+
+    objects = ContractFeedItemManager()
+
+    class Meta:
+        verbose_name = _('Contract Feed Item')
+        verbose_name_plural = _('Contract Feed Items')
+        ordering = ('-create_at', '-contract_id')
+        unique_together = ('profile', 'contract')
+        indexes = (
+            models.Index(fields=['profile', '-create_at', '-contract']),
+        )
+
+
+def has_matched_fields(update_fields, matched_fields) -> bool:
+    """Check whether a save could have changed any of the matched fields."""
+    return update_fields is None or not set(update_fields).isdisjoint(matched_fields)
+
+
 @receiver(post_save, sender=ContractRequest)
 def assign_money_offer(sender, instance, created, *args, **kwargs):
     # Assign contract`s money offer as default for contract request
     if created and instance and not instance.money_offer and instance.contract and instance.contract.money_offer:
-        instance.money_offer = instance.cotract.money_offer
+        instance.money_offer = instance.contract.money_offer
         instance.save()
+
+
+@receiver(post_save, sender=ContractRequest)
+def assign_matching_score(sender, instance, created, *args, **kwargs):
+    if created and instance:
+        instance.contract.refresh_matching_scores([instance])
+
+
+@receiver(post_save, sender=Contract)
+def refresh_contract_matching_scores(sender, instance, created, update_fields=None, *args, **kwargs):
+    # New contracts have no requests to be scored yet
+    if not created and has_matched_fields(update_fields, CONTRACT_FIELDS):
+        instance.refresh_matching_scores()
+
+
+@receiver(post_save, sender=Profile)
+def refresh_profile_matching_scores(sender, instance, created, update_fields=None, *args, **kwargs):
+    if not created and has_matched_fields(update_fields, PROFILE_FIELDS):
+        ContractRequest.objects.filter(profile=instance).refresh_matching_scores()
+
+
+@receiver(m2m_changed, sender=Contract.skills.through)
+@receiver(m2m_changed, sender=Contract.languages.through)
+def sync_contract_bitsets(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    field_name = 'skills' if sender is Contract.skills.through else 'languages'
+    if action == 'pre_clear' and reverse:
+        stash_related_ids(Contract, field_name, instance)
+        return
+    # Connected ahead of the matching receivers, which read the requirements from the bitsets
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bitsets = refresh_bitsets(Contract, field_name, [instance.pk])
+        setattr(instance, f'{field_name}_bitset', bitsets[instance.pk])
+        return
+    pk_set = get_related_ids(Contract, field_name, instance) if action == 'post_clear' else pk_set
+    if pk_set:
+        refresh_bitsets(Contract, field_name, pk_set)
+
+
+@receiver(m2m_changed, sender=Contract.skills.through)
+@receiver(m2m_changed, sender=Contract.languages.through)
+def refresh_contract_relations_matching_scores(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.refresh_matching_scores()
+        return
+    # The instance is a skill / language, while the changed contracts are at the primary keys set
+    if action == 'post_clear':
+        pk_set = get_related_ids(Contract, 'skills' if sender is Contract.skills.through else 'languages', instance)
+    if pk_set:
+        ContractRequest.objects.filter(contract__in=pk_set).refresh_matching_scores()
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+@receiver(m2m_changed, sender=Profile.languages.through)
+def refresh_profile_relations_matching_scores(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ContractRequest.objects.filter(profile=instance).refresh_matching_scores()
+        return
+    # The instance is a skill / language, while the changed profiles are at the primary keys set, or stashed by the
+    # bitsets receivers of the profiles for the cleared ones
+    if action == 'post_clear':
+        pk_set = get_related_ids(Profile, 'skills' if sender is Profile.skills.through else 'languages', instance)
+    if pk_set:
+        ContractRequest.objects.filter(profile__in=pk_set).refresh_matching_scores()
+
+
+@receiver(pre_delete, sender=Skill)
+@receiver(pre_delete, sender=Language)
+def stash_deleted_contract_relations(sender, instance, *args, **kwargs):
+    # Relations of deleted skills & languages are cascaded without signals
+    stash_related_ids(Contract, 'skills' if sender is Skill else 'languages', instance)
+
+
+@receiver(post_delete, sender=Skill)
+@receiver(post_delete, sender=Language)
+def sync_deleted_contract_bitsets(sender, instance, *args, **kwargs):
+    # Connected after the bitsets receivers of the profiles, whose stashed profiles are rescored as well
+    field_name = 'skills' if sender is Skill else 'languages'
+    contract_ids = get_related_ids(Contract, field_name, instance)
+    if contract_ids:
+        refresh_bitsets(Contract, field_name, contract_ids)
+    profile_ids = get_related_ids(Profile, field_name, instance)
+    if contract_ids or profile_ids:
+        ContractRequest.objects.filter(
+            models.Q(contract__in=contract_ids) | models.Q(profile__in=profile_ids)
+        ).refresh_matching_scores()
+
+
+@receiver(post_save, sender=Contract)
+def fan_out_contract(sender, instance, created, raw=False, *args, **kwargs):
+    if created and not raw and instance.is_fanned_out:
+        ContractFeedItem.objects.fan_out(instance)
+
+
+@receiver(m2m_changed, sender=Profile.following_agencies.through)
+def sync_profile_feeds(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    # The instance is the profile, otherwise an agency while the changed profiles are at the primary keys set
+    if action in ('post_add', 'post_remove') and pk_set:
+        profile_ids, agency_ids = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+        if action == 'post_add':
+            ContractFeedItem.objects.backfill(profile_ids, agency_ids)
+        else:
+            ContractFeedItem.objects.withdraw(profile_ids, agency_ids)
+    elif action == 'post_clear':
+        if reverse:
+            ContractFeedItem.objects.withdraw(agency_ids=[instance.pk])
+        else:
+            ContractFeedItem.objects.withdraw(profile_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Contract)
+def invalidate_contract_recommendations(sender, instance, created, update_fields=None, *args, **kwargs):
+    # Saves of the other fields, like the fan out flag, leave the recommendations as they are
+    if created:
+        if instance.is_open:
+            invalidate_recommendations()
+    elif has_matched_fields(update_fields, RECOMMENDED_FIELDS) and instance.has_recommended_changes():
+        invalidate_recommendations()
+
+
+@receiver(post_delete, sender=Contract)
+def invalidate_deleted_contract_recommendations(sender, instance, *args, **kwargs):
+    if instance.is_open:
+        invalidate_recommendations()
+
+
+@receiver(m2m_changed, sender=Contract.skills.through)
+@receiver(m2m_changed, sender=Contract.languages.through)
+def invalidate_contract_relations_recommendations(sender, action, *args, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_recommendations()
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_model_recommendations(sender, instance, created, update_fields=None, *args, **kwargs):
+    if not created and has_matched_fields(update_fields, PROFILE_FIELDS):
+        invalidate_profile_recommendations(instance.pk)
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+@receiver(m2m_changed, sender=Profile.languages.through)
+def invalidate_model_relations_recommendations(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_profile_recommendations(instance.pk)
+    else:
+        for profile_id in pk_set or ():
+            invalidate_profile_recommendations(profile_id)
@@ -1,3 +1,420 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from accounts.models import User
+from accounts.enums import RoleChoices
+from profiles.enums import GenderChoices, RaceChoices
+from profiles.models import Language, Profile, Skill
+from profiles.utils import encode_bitset, subtract_years
+from .matching import (MATCHING_CRITERIA, ContractColumns, ContractRequirements, ProfileColumns, ProfileIndex,
+                       popcount, rank_contracts, stack_bitsets)
+from .api.filters import ContractFilter
+from .models import Contract, ContractFeedItem, ContractRequest
+from .utils import get_recommendations_cache_key
+
+
+def create_profile(username, skills=(), languages=(), **fields):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password', role=RoleChoices.MODEL)
+    profile = Profile.objects.get(user=user)
+    for field, value in fields.items():
+        setattr(profile, field, value)
+    profile.save()
+    profile.skills.add(*skills)
+    profile.languages.add(*languages)
+    return profile
+
+
+def create_contract(agency, skills=(), languages=(), **fields):
+    contract = Contract.objects.create(agency=agency, title='Contract', money_offer=100,
+                                       start_at=timezone.now() + timedelta(days=5), **fields)
+    contract.skills.add(*skills)
+    contract.languages.add(*languages)
+    return contract
+
+
+class BitsetOverlapTests(SimpleTestCase):
+
+    def test_popcount(self):
+        bits = stack_bitsets([encode_bitset([0, 3, 9]), b'', encode_bitset([15])])
+        self.assertEqual(bits.shape, (3, 2))
+        self.assertEqual(popcount(bits).tolist(), [3, 0, 1])
+
+    def test_overlap_widths(self):
+        # Bits beyond the width of either side count as unset
+        bits = stack_bitsets([encode_bitset([1, 20]), encode_bitset([1])])
+        self.assertEqual(ContractColumns._overlap(bits[0], stack_bitsets([encode_bitset([1, 2])])).tolist(), [0.5])
+        self.assertEqual(ContractColumns._overlap(bits[1], stack_bitsets([encode_bitset([1, 20]), b''])).tolist(),
+                         [0.5, 1.0])
+
+
+class MatchingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agency = User.objects.create_user('director', 'director@example.com', 'password',
+                                              role=RoleChoices.DIRECTOR).agency
+        cls.skills = [Skill.objects.create(name=name) for name in ('Dancing', 'Acting', 'Singing')]
+        cls.languages = [Language.objects.create(name=name) for name in ('English', 'French')]
+        cls.contract = create_contract(
+            cls.agency, cls.skills[:2], cls.languages[:1], gender=GenderChoices.FEMALE, race=RaceChoices.OTHER,
+            num_of_days=5, age_min=20, age_max=30, height_min=160, height_max=180
+        )
+        cls.fit = create_profile(
+            'fit', cls.skills, cls.languages[:1], gender=GenderChoices.FEMALE, race=RaceChoices.OTHER, days_away=10,
+            date_of_birth=subtract_years(localdate(), 25), height=170
+        )
+        cls.partial = create_profile(
+            'partial', cls.skills[:1], gender=GenderChoices.MALE, race=RaceChoices.OTHER, days_away=3, height=190
+        )
+
+
+class MatchingScoreTests(MatchingTestCase):
+
+    def test_score_requests(self):
+        requests = [ContractRequest(contract=self.contract, profile=profile) for profile in (self.partial, self.fit)]
+        with self.assertNumQueries(1):
+            scored = self.contract.score_requests(requests)
+        self.assertEqual([contract_request.profile for contract_request in scored], [self.fit, self.partial])
+        self.assertEqual(scored[0].matching_score, 1.0)
+        self.assertEqual(scored[0].matching_breakdown, {criterion: 1.0 for criterion in MATCHING_CRITERIA})
+        # Missing days, half the skills, no language, wrong gender, no age & out of range height
+        self.assertEqual(scored[1].matching_breakdown, {
+            'inboard': 1.0, 'outboard': 1.0, 'days': 0.0, 'skills': 0.5, 'languages': 0.0, 'gender': 0.0,
+            'race': 1.0, 'hair': 1.0, 'eye': 1.0, 'age': 0.0, 'height': 0.0, 'weight': 1.0
+        })
+        self.assertAlmostEqual(scored[1].matching_score, 6.5 / 12)
+
+    def test_unconstrained_contract(self):
+        contract = create_contract(self.agency, gender=None, race=None)
+        scored = contract.score_requests([ContractRequest(contract=contract, profile=self.partial)])
+        self.assertEqual(scored[0].matching_score, 1.0)
+
+    def test_score_all_requests(self):
+        ContractRequest.objects.create(contract=self.contract, profile=self.fit)
+        ContractRequest.objects.create(contract=self.contract, profile=self.partial)
+        scored = self.contract.score_requests()
+        self.assertEqual([contract_request.matching_score for contract_request in scored], [1.0, 6.5 / 12])
+
+
+class StoredMatchingScoreTests(MatchingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.request = ContractRequest.objects.create(contract=cls.contract, profile=cls.partial)
+
+    def assertStoredScore(self, score):
+        self.request.refresh_from_db()
+        self.assertAlmostEqual(self.request.matching_score, score)
+        self.assertAlmostEqual(sum(self.request.scores) / len(MATCHING_CRITERIA), score)
+
+    def test_scored_on_create(self):
+        self.assertStoredScore(6.5 / 12)
+        self.assertEqual(self.request.skills_score, 0.5)
+        self.assertEqual(ContractRequest.objects.get(profile=self.partial).matching_score, self.request.matching_score)
+
+    def test_profile_save(self):
+        self.partial.height = 170
+        self.partial.save()
+        self.assertStoredScore(7.5 / 12)
+        self.partial.gender = GenderChoices.FEMALE
+        self.partial.save(update_fields=['gender'])
+        self.assertStoredScore(8.5 / 12)
+
+    def test_contract_save(self):
+        self.contract.height_min = self.contract.height_max = None
+        self.contract.save()
+        self.assertStoredScore(7.5 / 12)
+        self.contract.num_of_days = 2
+        self.contract.save(update_fields=['num_of_days'])
+        self.assertStoredScore(8.5 / 12)
+
+    def test_other_fields_saves(self):
+        with self.assertNumQueries(1):
+            self.partial.save(update_fields=['city'])
+        self.assertStoredScore(6.5 / 12)
+
+    def test_relations_changes(self):
+        self.partial.skills.add(self.skills[1])
+        self.assertStoredScore(7 / 12)
+        self.contract.languages.clear()
+        self.assertStoredScore(8 / 12)
+        # Reverse relations of the skills
+        self.skills[1].contract_set.remove(self.contract)
+        self.assertStoredScore(8 / 12)
+        self.skills[0].profile_set.clear()
+        self.assertStoredScore(7 / 12)
+
+    def test_deleted_skill(self):
+        # Skills missing from the profile no longer count once deleted
+        self.skills[1].delete()
+        self.assertStoredScore(7 / 12)
+
+    def test_refresh_matching_scores(self):
+        ContractRequest.objects.filter(pk=self.request.pk).update(matching_score=None, matching_breakdown=None)
+        ContractRequest.objects.refresh_matching_scores()
+        self.assertStoredScore(6.5 / 12)
+
+
+class RecommendationTests(MatchingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.loose = create_contract(cls.agency, languages=cls.languages[1:], gender=None, race=None)
+        # Left out of the recommendations of the fitting profile, by its gender & by being inactive
+        create_contract(cls.agency, gender=GenderChoices.MALE, race=None)
+        create_contract(cls.agency, gender=None, race=None, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def recommend(self, profile, limit=None):
+        return [(contract, contract.matching_score) for contract in Contract.objects.recommended(profile, limit)]
+
+    def test_recommended(self):
+        self.assertEqual(self.recommend(self.fit), [(self.contract, 1.0), (self.loose, 11 / 12)])
+        self.assertEqual(self.recommend(self.fit, 1), [(self.contract, 1.0)])
+
+    def test_cached(self):
+        self.recommend(self.fit)
+        self.assertIsNotNone(cache.get(get_recommendations_cache_key(self.fit.pk)))
+        # The contracts & their skills & languages are loaded, while the ranking is not computed again
+        with self.assertNumQueries(3):
+            self.assertEqual(self.recommend(self.fit), [(self.contract, 1.0), (self.loose, 11 / 12)])
+
+    def test_contract_changes(self):
+        self.recommend(self.fit)
+        self.contract.title = 'Renamed'
+        self.contract.save()
+        self.assertIsNotNone(cache.get(get_recommendations_cache_key(self.fit.pk)))
+        self.contract.gender = GenderChoices.MALE
+        self.contract.save()
+        self.assertIsNone(cache.get(get_recommendations_cache_key(self.fit.pk)))
+        self.assertEqual(self.recommend(self.fit), [(self.loose, 11 / 12)])
+
+    def test_contract_created_and_deleted(self):
+        self.recommend(self.fit)
+        contract = create_contract(self.agency, gender=None, race=None)
+        self.assertEqual(self.recommend(self.fit), [(self.contract, 1.0), (contract, 1.0), (self.loose, 11 / 12)])
+        contract.delete()
+        self.assertEqual(self.recommend(self.fit), [(self.contract, 1.0), (self.loose, 11 / 12)])
+
+    def test_profile_changes(self):
+        self.recommend(self.fit)
+        self.recommend(self.partial)
+        self.fit.languages.add(self.languages[1])
+        self.assertIsNone(cache.get(get_recommendations_cache_key(self.fit.pk)))
+        self.assertIsNotNone(cache.get(get_recommendations_cache_key(self.partial.pk)))
+        self.assertEqual(self.recommend(self.fit), [(self.contract, 1.0), (self.loose, 1.0)])
+        self.fit.height = 200
+        self.fit.save()
+        self.assertEqual(self.recommend(self.fit), [(self.loose, 1.0)])
+
+    def test_rank_contracts_ties(self):
+        tied = [create_contract(self.agency, gender=None, race=None) for _ in range(3)]
+        contracts = ContractColumns.from_queryset(Contract.objects.filter(pk__in=[contract.pk for contract in tied]))
+        profiles = ProfileColumns.from_queryset(Profile.objects.filter(pk=self.partial.pk))
+        # The contracts score the same for the profile, the ties are broken by the ID whatever the order of the rows
+        self.assertEqual(len(set(contracts.score(profiles).tolist())), 1)
+        reversed_contracts = ContractColumns(
+            contracts.ids[::-1], {field: column[::-1] for field, column in contracts.columns.items()},
+            contracts.skills[::-1], contracts.languages[::-1]
+        )
+        for columns in (contracts, reversed_contracts):
+            ranking = rank_contracts(profiles, columns, 2)
+            self.assertEqual([contract_id for contract_id, _ in ranking], [tied[0].pk, tied[1].pk])
+
+
+class ProfileIndexTests(MatchingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.unmatched = create_profile('unmatched', gender=GenderChoices.MALE, race=RaceChoices.OTHER)
+
+    def setUp(self):
+        self.index = ProfileIndex()
+
+    def rank(self):
+        return [(profile, profile.matching_score)
+                for profile in self.index.rank(ContractRequirements.from_contract(self.contract))]
+
+    def test_rank(self):
+        self.assertEqual(self.rank(), [(self.fit, 1.0), (self.partial, 6.5 / 12), (self.unmatched, 6 / 12)])
+
+    def test_slices(self):
+        ranked = self.index.rank(ContractRequirements.from_contract(self.contract))
+        self.assertEqual(len(ranked), 3)
+        # Only the profiles of the slice are loaded, with their skills & languages
+        with self.assertNumQueries(3):
+            self.assertEqual(ranked[1:3], [self.partial, self.unmatched])
+        self.assertEqual(ranked[0], self.fit)
+        self.assertEqual(ranked[5:], [])
+
+    def test_ties(self):
+        tied = create_profile('tied', gender=GenderChoices.MALE, race=RaceChoices.OTHER)
+        ranked = self.index.rank(ContractRequirements.from_contract(self.contract))
+        self.assertEqual(ranked[2:3], [self.unmatched])
+        self.assertEqual(ranked[3:], [tied])
+
+    def test_updated_profiles(self):
+        self.rank()
+        self.partial.height = 170
+        self.partial.save()
+        self.unmatched.skills.add(*self.skills)
+        self.assertEqual(self.rank(), [(self.fit, 1.0), (self.partial, 7.5 / 12), (self.unmatched, 7 / 12)])
+
+    def test_hidden_and_deactivated_profiles(self):
+        self.rank()
+        self.partial.is_public = False
+        self.partial.save()
+        self.unmatched.user.is_active = False
+        self.unmatched.user.save()
+        self.assertEqual(self.rank(), [(self.fit, 1.0)])
+        self.partial.is_public = True
+        self.partial.save()
+        self.assertEqual(self.rank(), [(self.fit, 1.0), (self.partial, 6.5 / 12)])
+
+    def test_created_profiles(self):
+        self.rank()
+        profile = create_profile('created', gender=GenderChoices.FEMALE, race=RaceChoices.OTHER)
+        self.assertIn(profile, [profile for profile, _ in self.rank()])
+
+    def test_reconciled_profiles(self):
+        self.rank()
+        # Neither deletes nor bulk updates of the users touch the profiles
+        self.partial.delete()
+        User.objects.filter(pk=self.unmatched.user_id).update(is_active=False)
+        self.assertEqual(self.rank(), [(self.fit, 1.0)])
+        self.assertEqual(len(self.index.columns), 3)
+        User.objects.filter(pk=self.unmatched.user_id).update(is_active=True)
+        self.assertEqual(self.rank(), [(self.fit, 1.0), (self.unmatched, 6 / 12)])
+
+    @override_settings(PROFILE_INDEX_REBUILD_INTERVAL=-1)
+    def test_rebuild(self):
+        self.rank()
+        self.partial.delete()
+        self.assertEqual(self.rank(), [(self.fit, 1.0), (self.unmatched, 6 / 12)])
+        # Rebuilt from scratch, without the holes of the removed profiles
+        self.assertEqual(len(self.index.columns), 2)
+
+
+class ContractBitsetTests(MatchingTestCase):
+
+    def assertBitsets(self, contract, skills, languages=()):
+        stored = Contract.objects.get(pk=contract.pk)
+        self.assertEqual(bytes(stored.skills_bitset), encode_bitset(skill.pk for skill in skills))
+        self.assertEqual(bytes(stored.languages_bitset), encode_bitset(language.pk for language in languages))
+
+    def test_relations_changes(self):
+        self.assertBitsets(self.contract, self.skills[:2], self.languages[:1])
+        self.contract.skills.remove(self.skills[0])
+        self.contract.languages.add(self.languages[1])
+        self.assertBitsets(self.contract, self.skills[1:2], self.languages)
+        self.contract.save()
+        self.assertBitsets(self.contract, self.skills[1:2], self.languages)
+
+    def test_reverse_relations_changes(self):
+        self.languages[0].contract_set.clear()
+        self.assertBitsets(self.contract, self.skills[:2])
+        self.skills[2].contract_set.add(self.contract)
+        self.assertBitsets(self.contract, self.skills)
+
+    def test_deleted_relations(self):
+        self.skills[1].delete()
+        self.assertBitsets(self.contract, self.skills[:1], self.languages[:1])
+
+    def test_filter(self):
+        other = create_contract(self.agency, self.skills[2:])
+        queryset = Contract.objects.all()
+        self.assertEqual(set(ContractFilter({'skills': [self.skills[0].pk]}, queryset).qs), {self.contract})
+        self.assertEqual(set(ContractFilter({'skills': [self.skills[1].pk, self.skills[2].pk]}, queryset).qs),
+                         {self.contract, other})
+
+
+class ContractFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agency, cls.other_agency, cls.crowded_agency = (
+            User.objects.create_user(username, f'{username}@example.com', 'password', role=RoleChoices.DIRECTOR).agency
+            for username in ('director', 'other-director', 'crowded-director')
+        )
+        cls.profile, cls.other_profile = create_profile('model'), create_profile('other-model')
+        cls.profile.following_agencies.add(cls.agency, cls.crowded_agency)
+        cls.other_profile.following_agencies.add(cls.agency)
+        for agency in (cls.agency, cls.crowded_agency):
+            agency.refresh_from_db(fields=['followers_count'])
+
+    def feed(self, profile, before=None, limit=None):
+        return ContractFeedItem.objects.feed(profile, before, limit)
+
+    def pushed(self, profile):
+        return set(ContractFeedItem.objects.filter(profile=profile).values_list('contract', flat=True))
+
+    def test_fan_out(self):
+        contract = create_contract(self.agency)
+        self.assertTrue(contract.is_fanned_out)
+        self.assertEqual(self.pushed(self.profile), {contract.pk})
+        self.assertEqual(self.pushed(self.other_profile), {contract.pk})
+        create_contract(self.other_agency)
+        self.assertEqual(self.feed(self.profile), [contract])
+
+    @override_settings(CONTRACT_FEED_FANOUT_LIMIT=0)
+    def test_read_contracts(self):
+        # Contracts of the agencies having too many followers are read from the agencies by the feeds
+        contract = create_contract(self.crowded_agency)
+        self.assertFalse(contract.is_fanned_out)
+        self.assertEqual(self.pushed(self.profile), set())
+        self.assertEqual(self.feed(self.profile), [contract])
+        self.assertEqual(self.feed(self.other_profile), [])
+
+    def test_merged_feed(self):
+        contracts = [create_contract(self.agency)]
+        with override_settings(CONTRACT_FEED_FANOUT_LIMIT=0):
+            contracts.append(create_contract(self.crowded_agency))
+        contracts.append(create_contract(self.agency))
+        inactive = create_contract(self.agency)
+        inactive.is_active = False
+        inactive.save()
+        contracts.reverse()
+        self.assertEqual(self.feed(self.profile), contracts)
+        # Pages continue before the creation date & ID of the last contract
+        page = self.feed(self.profile, limit=2)
+        self.assertEqual(page, contracts[:2])
+        self.assertEqual(self.feed(self.profile, (page[-1].create_at, page[-1].pk), 2), contracts[2:])
+
+    def test_follow_backfill(self):
+        contract = create_contract(self.other_agency)
+        self.assertEqual(self.feed(self.profile), [])
+        self.profile.following_agencies.add(self.other_agency)
+        self.assertEqual(self.pushed(self.profile), {contract.pk})
+        self.assertEqual(self.feed(self.profile), [contract])
+
+    @override_settings(CONTRACT_FEED_BACKFILL_SIZE=1)
+    def test_follow_backfill_size(self):
+        create_contract(self.other_agency)
+        latest = create_contract(self.other_agency)
+        create_contract(self.crowded_agency)
+        crowded_latest = create_contract(self.crowded_agency)
+        self.other_agency.follower_agencies.add(self.other_profile)
+        self.assertEqual(self.pushed(self.other_profile), {latest.pk})
+        # Latest contracts of every followed agency
+        profile = create_profile('third-model')
+        profile.following_agencies.add(self.other_agency, self.crowded_agency)
+        self.assertEqual(self.pushed(profile), {latest.pk, crowded_latest.pk})
+
+    def test_unfollow_withdraw(self):
+        contract, other_contract = create_contract(self.agency), create_contract(self.crowded_agency)
+        self.profile.following_agencies.remove(self.agency)
+        self.assertEqual(self.pushed(self.profile), {other_contract.pk})
+        self.assertEqual(self.pushed(self.other_profile), {contract.pk})
+        self.profile.following_agencies.clear()
+        self.assertEqual(self.feed(self.profile), [])
+        self.agency.follower_agencies.clear()
+        self.assertEqual(self.feed(self.other_profile), [])
@@ -1,3 +1,9 @@
+import time
+
+from django.core.cache import cache
+
+
+RECOMMENDATIONS_VERSION_KEY = 'contracts:recommended:version'
 
 
 def get_model_field_names(model, exclude=None):
@@ -8,3 +14,23 @@ def get_model_field_names(model, exclude=None):
         lambda field_name: field_name not in exclude,
         map(lambda field: field.name, model._meta.get_fields())
     ))
+
+
+def get_recommendations_cache_key(profile_id) -> str:
+    """Get the cache key of the contracts recommended for a profile, scoped by the version of the contracts."""
+    version = cache.get_or_set(RECOMMENDATIONS_VERSION_KEY, time.time_ns, timeout=None)
+    return f'contracts:recommended:{version}:{profile_id}'
+
+
+def invalidate_profile_recommendations(profile_id) -> None:
+    """Invalidate the contracts recommended for a single profile."""
+    cache.delete(get_recommendations_cache_key(profile_id))
+
+
+def invalidate_recommendations() -> None:
+    """Invalidate the contracts recommended for all profiles by bumping the version of the contracts."""
+    try:
+        cache.incr(RECOMMENDATIONS_VERSION_KEY)
+    except ValueError:
+        # The version is missing, start a new one that can't collide with the previous ones
+        cache.set(RECOMMENDATIONS_VERSION_KEY, time.time_ns(), timeout=None)
@@ -63,6 +63,7 @@ INSTALLED_APPS = [
     'django_filters',
     'drf_spectacular',
     'djmoney',
+    'djmoney.contrib.exchange',
 
     # Custom apps
     'accounts',
@@ -72,7 +73,8 @@ INSTALLED_APPS = [
     'contracts',
     'info',
     'reviews',
-    'stats'
+    'stats',
+    'search'
 ]
 
 MIDDLEWARE = [
@@ -121,6 +123,13 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -184,7 +193,7 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.api.authentication.CustomJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -300,17 +309,23 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
     "JTI_CLAIM": "jti",
-    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
+    "TOKEN_USER_CLASS": "accounts.tokens.CustomTokenUser",
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.api.serializers.CustomTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.api.serializers.CustomTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
+# Seconds the active state & role of the token users are cached for. Deactivations & role changes are applied at once
+# by a cache shared by the processes, while a local memory cache is only invalidated in the process making them, so
+# that the other processes keep accepting the tokens of deactivated users for up to this window
+TOKEN_USER_CACHE_TIMEOUT = env.int(
+    'TOKEN_USER_CACHE_TIMEOUT', default=2 if CACHES['default']['BACKEND'].endswith('LocMemCache') else 5 * 60
+)
 
 
 # DJOSER Settings
@@ -381,7 +396,7 @@ DJOSER = {
     "SEND_DELETE_CONFIRMATION": True,
     'USERNAME_CHANGED_EMAIL_CONFIRMATION¶': bool(env('USERNAME_CHANGED_EMAIL_CONFIRMATION')),
     'PASSWORD_CHANGED_EMAIL_CONFIRMATION¶': bool(env('USERNAME_CHANGED_EMAIL_CONFIRMATION')),
-    'SOCIAL_AUTH_TOKEN_STRATEGY': 'djoser.social.token.jwt.TokenStrategy',
+    'SOCIAL_AUTH_TOKEN_STRATEGY': 'accounts.tokens.CustomTokenStrategy',
     'SOCIAL_AUTH_ALLOWED_REDIRECT_URIS': ['/google', '/facebook'],
     "LOGOUT_ON_PASSWORD_CHANGE": True,
     "LOGOUT_ON_EMAIL_CHANGE": True,
@@ -441,7 +456,7 @@ SPECTACULAR_SETTINGS = {
     # None will default to DRF's AUTHENTICATION_CLASSES
     'SERVE_AUTHENTICATION': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.api.authentication.CustomJWTAuthentication',
     ],
 
     # Dictionary of general configuration to pass to the SwaggerUI({ ... })
@@ -832,3 +847,50 @@ CURRENCY_CHOICES = [
     ('EUR', _('EUR €')),
     ('EGP', _('EGP £')),
 ]
+# Exchange rates are stored by the `update_rates` command, the stats reload them into memory once every interval
+OPEN_EXCHANGE_RATES_APP_ID = env.str('OPEN_EXCHANGE_RATES_APP_ID', default='')
+EXCHANGE_RATES_RELOAD_INTERVAL = 60 * 60
+
+
+# Matching Settings
+RECOMMENDED_CONTRACTS_LIMIT = 50
+RECOMMENDED_CONTRACTS_CACHE_TIMEOUT = 60 * 60
+PROFILE_INDEX_REBUILD_INTERVAL = 60 * 60
+
+
+# Following Settings
+# Maximum number of the targets followed, unfollowed or looked up at once
+FOLLOW_BATCH_MAX_SIZE = 100
+# Follows are suggested out of an in memory graph, rebuilt once every interval to catch up with the other processes
+FOLLOW_SUGGESTIONS_LIMIT = 50
+FOLLOW_GRAPH_REBUILD_INTERVAL = 5 * 60
+
+
+# Feed Settings
+# Contracts of agencies having more followers aren't fanned out to the feeds of the followers, which read them instead
+CONTRACT_FEED_FANOUT_LIMIT = env.int('CONTRACT_FEED_FANOUT_LIMIT', default=10_000)
+# Number of the latest contracts of an agency pushed to the feed of a profile once following it
+CONTRACT_FEED_BACKFILL_SIZE = 50
+
+
+# Search Settings
+# Dotted path of the search backend, defaults to the one of the database vendor
+SEARCH_BACKEND = env('SEARCH_BACKEND', default=None)
+
+
+# Geolocation Settings
+NEARBY_AGENCIES_RADIUS_KM = 10
+NEARBY_AGENCIES_MAX_RADIUS_KM = 500
+
+
+# Stats Settings
+# Seconds the cached stats are fresh for, then stale ones are kept for `STATS_CACHE_STALE_TIMEOUT` more seconds to be
+# served while a single request refreshes them
+STATS_CACHE_TIMEOUT = env.int('STATS_CACHE_TIMEOUT', default=60)
+STATS_CACHE_STALE_TIMEOUT = 60 * 60
+STATS_CACHE_STALE_WHILE_REVALIDATE = True
+STATS_CACHE_LOCK_TIMEOUT = 30
+# Seconds between the checks of the requests waiting for the ones refreshing the missing cached stats
+STATS_CACHE_LOCK_POLL_INTERVAL = 0.05
+# Number of rows the stats exports are fetched by at a time
+STATS_EXPORT_CHUNK_SIZE = 2000
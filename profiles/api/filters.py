@@ -2,24 +2,44 @@ from django.db import models
 
 from django_filters import rest_framework as filters
 
-from profiles.models import Profile, PreviousExperience
+from profiles.models import Profile, PreviousExperience, Skill, Language
+from profiles.utils import filter_bitset
+from search.documents import search_index
 
 
 class ProfileFilter(filters.FilterSet):
     search = filters.CharFilter(method='custom_search', label="Search first & last names, email, username, and bio")
+    skills = filters.ModelMultipleChoiceFilter(queryset=Skill.objects.all(), method='filter_bitset')
+    languages = filters.ModelMultipleChoiceFilter(queryset=Language.objects.all(), method='filter_bitset')
+    age_min = filters.NumberFilter(method='filter_age', label="Minimum age in full years")
+    age_max = filters.NumberFilter(method='filter_age', label="Maximum age in full years")
+    followers_min = filters.NumberFilter(field_name='followers_count', lookup_expr='gte',
+                                         label="Minimum number of followers")
+    followers_max = filters.NumberFilter(field_name='followers_count', lookup_expr='lte',
+                                         label="Maximum number of followers")
+    following_min = filters.NumberFilter(field_name='following_count', lookup_expr='gte',
+                                         label="Minimum number of followed profiles & agencies")
+    following_max = filters.NumberFilter(field_name='following_count', lookup_expr='lte',
+                                         label="Maximum number of followed profiles & agencies")
+
+    def filter_bitset(self, queryset, name, value):
+        return filter_bitset(queryset, name, value)
+
+    def filter_age(self, queryset, name, value):
+        if name == 'age_min':
+            return queryset.age_range(start=value)
+        return queryset.age_range(end=value)
 
     def custom_search(self, queryset, name, value):
-        return queryset.filter(
-            models.Q(user__first_name__icontains=value) | models.Q(user__last_name__icontains=value) |
-            models.Q(user__email__icontains=value) | models.Q(user__username__icontains=value) |
-            models.Q(bio__icontains=value)
-        )
+        # Served by the full text index, the best matching profiles come first
+        return search_index.search(queryset, value)
 
     class Meta:
         model = Profile
         exclude = ('user', 'image', 'cover', 'create_at', 'update_at')
         fields = ('is_public', 'skills', 'model_class', 'languages', 'gender', 'race', 'travel_inboard',
-                  'travel_outboard', 'days_away', 'height', 'weight', 'hair', 'eye', 'search')
+                  'travel_outboard', 'days_away', 'height', 'weight', 'hair', 'eye', 'age_min', 'age_max',
+                  'followers_min', 'followers_max', 'following_min', 'following_max', 'search')
 
 
 class PreviousExperienceFilter(filters.FilterSet):
@@ -49,7 +49,7 @@ class ProfileSerializer(FlexFieldsModelSerializer):
 
     class Meta:
         model = Profile
-        exclude = ('following_models', 'following_agencies')
+        exclude = ('following_models', 'following_agencies', 'skills_bitset', 'languages_bitset')
         read_only_fields = ('id', 'user', 'model_class', 'create_at', 'update_at', 'age')
         expandable_fields = {
             'user': ('accounts.api.serializers.CustomUserSerializer', {'many': False, 'read_only': True,
@@ -82,6 +82,11 @@ class ProfileSerializer(FlexFieldsModelSerializer):
         return data
 
 
+class SuggestedProfileSerializer(ProfileSerializer):
+    suggestion_score = serializers.FloatField(read_only=True)
+    mutual_count = serializers.IntegerField(read_only=True)
+
+
 class ProfileImageSerializer(serializers.ModelSerializer):
 
     class Meta:
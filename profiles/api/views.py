@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import status
@@ -11,15 +12,17 @@ from rest_framework.mixins import RetrieveModelMixin, UpdateModelMixin, ListMode
 
 from rest_flex_fields import is_expanded
 from rest_flex_fields.filter_backends import FlexFieldsDocsFilterBackend
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from accounts.api.permissions import IsModelUser, IsDirectorUser
 from accounts.utils import is_model_user, is_owner, get_user_associated_model
-from accounts.api.mixins import AllowAnyInSafeMethodOrCustomPermissionMixin, ProhibitedActionsMixin
+from accounts.api.mixins import (AllowAnyInSafeMethodOrCustomPermissionMixin, ProhibitedActionsMixin,
+                                 BulkFollowMixin)
 from profiles.models import Skill, Language, Profile, SocialLink, PreviousExperience, ProfileImage
+from profiles.graph import get_suggested_profiles
 from .filters import ProfileFilter, PreviousExperienceFilter
 from .serializers import (SkillSerializer, LanguageSerializer, ProfileSerializer, SocialLinkSerializer,
-                          PreviousExperienceSerializer, ProfileImageSerializer)
+                          PreviousExperienceSerializer, ProfileImageSerializer, SuggestedProfileSerializer)
 
 
 class SkillViewSet(ReadOnlyModelViewSet):
@@ -83,8 +86,8 @@ class PreviousExperienceViewSet(AllowAnyInSafeMethodOrCustomPermissionMixin, Mod
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class ProfileViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissionMixin, RetrieveModelMixin,
-                     UpdateModelMixin, ListModelMixin, GenericViewSet):
+class ProfileViewSet(BulkFollowMixin, ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermissionMixin,
+                     RetrieveModelMixin, UpdateModelMixin, ListModelMixin, GenericViewSet):
     queryset = Profile.objects.active()
     serializer_class = ProfileSerializer
     filterset_class = ProfileFilter
@@ -92,6 +95,7 @@ class ProfileViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermiss
     filter_backends = GenericViewSet.filter_backends + [FlexFieldsDocsFilterBackend]
     save_method_permission_classes = [IsAuthenticated]
     follow_permission_classes = [IsModelUser | IsDirectorUser]
+    follow_field_name = 'following_models'
     prohibited_actions = [
         ('put', 'update'),
         ('patch', 'partial_update'),
@@ -182,6 +186,28 @@ class ProfileViewSet(ProhibitedActionsMixin, AllowAnyInSafeMethodOrCustomPermiss
         self.queryset = account.following_models.all()
         return self.list(request, *args, **kwargs)
 
+    @extend_schema(parameters=[OpenApiParameter('limit', int, description='Number of profiles to be returned')],
+                   responses={status.HTTP_200_OK: SuggestedProfileSerializer(many=True),
+                              status.HTTP_403_FORBIDDEN: None},
+                   description='Profiles followed by the ones the user follows, that the user may follow as well. '
+                               'Follows are reflected at once when made through the same server process, the '
+                               'ones made through the other processes are reflected within the follow graph '
+                               'rebuild interval, `FOLLOW_GRAPH_REBUILD_INTERVAL` seconds.')
+    # The filters & the pagination are left out, as the suggestions are ranked by the follow graph
+    @action(detail=False, methods=['GET'], name='Get Suggested Profiles', serializer_class=SuggestedProfileSerializer,
+            permission_classes=[IsModelUser | IsDirectorUser], filter_backends=[], pagination_class=None)
+    def suggestions(self, request, *args, **kwargs):
+        # Check the type of the user, in case of not being model or director, an exception is thrown
+        account = self.get_user_associated_model_or_403()
+        try:
+            limit = int(request.query_params.get('limit', settings.FOLLOW_SUGGESTIONS_LIMIT))
+        except ValueError:
+            limit = settings.FOLLOW_SUGGESTIONS_LIMIT
+        # Clamped, as negative limits would drop the last items off the ranking
+        limit = min(max(limit, 1), settings.FOLLOW_SUGGESTIONS_LIMIT)
+        serializer = self.get_serializer(get_suggested_profiles(account, limit), many=True)
+        return Response(serializer.data)
+
     @extend_schema(request=None, responses={status.HTTP_200_OK: ProfileSerializer(many=True),
                                             status.HTTP_403_FORBIDDEN: None})
     @action(detail=True, methods=['GET'], name='Get Followers', url_path='followers')
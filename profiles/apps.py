@@ -6,3 +6,7 @@ class ProfilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'profiles'
     verbose_name = _('Profiles')
+
+    def ready(self):
+        # Connect the signals keeping the follow graph in sync
+        from . import graph  # noqa: F401
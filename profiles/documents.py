@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+
+from search.documents import Document, search_index
+from .models import Profile
+
+
+User = get_user_model()
+
+
+class ProfileDocument(Document):
+    fields = ('user__first_name', 'user__last_name', 'user__email', 'user__username', 'bio')
+    related = {User: 'user'}
+
+
+search_index.register(Profile, ProfileDocument)
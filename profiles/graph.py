@@ -0,0 +1,205 @@
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
+
+from agencies.models import Agency
+from .models import FOLLOW_FIELDS, Profile
+
+
+# Kinds of the nodes, kept at the lowest bit of their keys so that profiles & agencies share a single key space
+PROFILE, AGENCY = 0, 1
+
+
+def get_node_kind(model) -> int:
+    return AGENCY if issubclass(model, Agency) else PROFILE
+
+
+def get_node_key(object_id: int, kind: int) -> int:
+    return object_id << 1 | kind
+
+
+class FollowGraph:
+    """
+    In memory adjacency index of the follows of the profiles & agencies, used to suggest the profiles followed by the
+    ones followed, "models you may know", without self joining the following tables.
+
+    Edges are held in compressed sparse rows, the followed node keys of every follower being a slice of a single
+    array, looked up by a binary search of the sorted follower keys. Follows committed by the current process are kept
+    in added & removed sets on top of the rows, which are rebuilt from scratch once every
+    `FOLLOW_GRAPH_REBUILD_INTERVAL` seconds, folding them in & catching up with the changes of the other processes.
+
+    Rows are rebuilt out of the lock by a single thread & swapped in, the other requests keep being served by the
+    previous rows meanwhile, only the first build is waited for.
+    """
+
+    def __init__(self):
+        self.keys: Optional[np.ndarray] = None
+        self.indptr: Optional[np.ndarray] = None
+        self.targets: Optional[np.ndarray] = None
+        self.added: Dict[int, Set[int]] = defaultdict(set)
+        self.removed: Dict[int, Set[int]] = defaultdict(set)
+        self.built_at = None
+        # Follows changed while the rows are loaded, replayed on top of them as the load may have missed them
+        self.pending: Optional[List[Tuple[List[Tuple[int, int]], bool]]] = None
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+
+    @staticmethod
+    def load() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Load the follows of all the nodes into the (keys, indptr, targets) compressed sparse rows."""
+        sources, targets = [], []
+        for field in FOLLOW_FIELDS.values():
+            rows = np.array(
+                field.remote_field.through.objects.values_list(
+                    f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+                ), dtype=np.int64
+            ).reshape(-1, 2)
+            sources.append(rows[:, 0] << 1 | get_node_kind(field.model))
+            targets.append(rows[:, 1] << 1 | get_node_kind(field.related_model))
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        order = np.lexsort((targets, sources))
+        sources, targets = sources[order], targets[order]
+        keys, starts = np.unique(sources, return_index=True)
+        return keys, np.append(starts, len(sources)), targets
+
+    def build(self) -> None:
+        """Rebuild the rows, should be called by a single thread at a time, holding the build lock."""
+        built_at = timezone.now()
+        with self.lock:
+            self.pending = []
+        try:
+            keys, indptr, targets = self.load()
+        except BaseException:
+            with self.lock:
+                self.pending = None
+            raise
+        with self.lock:
+            self.keys, self.indptr, self.targets = keys, indptr, targets
+            self.added.clear()
+            self.removed.clear()
+            for edges, is_following in self.pending:
+                self.apply(edges, is_following)
+            self.pending, self.built_at = None, built_at
+
+    def refresh(self) -> None:
+        """Build the rows if they are missing, or rebuild them if they are stale & no other thread is at it."""
+        with self.lock:
+            built_at = self.built_at
+        if built_at is None:
+            # Nothing to be served yet, until the first build
+            with self.build_lock:
+                if self.built_at is None:
+                    self.build()
+        elif timezone.now() - built_at > timedelta(seconds=settings.FOLLOW_GRAPH_REBUILD_INTERVAL) \
+                and self.build_lock.acquire(blocking=False):
+            try:
+                self.build()
+            finally:
+                self.build_lock.release()
+
+    def neighbors(self, key: int) -> np.ndarray:
+        """Get the keys of the nodes followed by the node."""
+        row = np.searchsorted(self.keys, key)
+        targets = self.targets[self.indptr[row]:self.indptr[row + 1]] \
+            if row < len(self.keys) and self.keys[row] == key else self.targets[:0]
+        if key in self.added or key in self.removed:
+            targets = np.setdiff1d(
+                np.union1d(targets, np.fromiter(self.added.get(key, ()), dtype=np.int64)),
+                np.fromiter(self.removed.get(key, ()), dtype=np.int64)
+            )
+        return targets
+
+    def follow(self, edges: Iterable[Tuple[int, int]], is_following: bool = True) -> None:
+        """Add or remove the (follower, followed) keys edges, until the next build."""
+        edges = list(edges)
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((edges, is_following))
+            # Otherwise changes are applied by the first build anyway
+            if self.keys is not None:
+                self.apply(edges, is_following)
+
+    def apply(self, edges: List[Tuple[int, int]], is_following: bool) -> None:
+        for source, target in edges:
+            (self.added if is_following else self.removed)[source].add(target)
+            (self.removed if is_following else self.added)[source].discard(target)
+
+    def suggest(self, key: int, limit: Optional[int] = None) -> List[Tuple[int, float, int]]:
+        """
+        Suggest the profiles followed by the nodes the node follows, which it doesn't follow yet, return the
+        (profile id, score, mutual follows) triples, best first, of all of them or the best `limit` ones.
+
+        Candidates are scored by the follows leading to them, each weighted down by the number of follows of the
+        node it goes through, like the Adamic Adar index, so that following a selective node weighs more.
+        """
+        self.refresh()
+        with self.lock:
+            followed = self.neighbors(key)
+            paths = [self.neighbors(int(node)) for node in followed]
+        if not paths:
+            return []
+        candidates = np.concatenate(paths)
+        sizes = np.array([len(path) for path in paths])
+        weights = np.repeat(1 / np.log1p(np.maximum(sizes, 1)), sizes)
+        # Only the profiles, other than the node & the ones it already follows, are suggested
+        kept = ((candidates & 1) == PROFILE) & (candidates != key) & ~np.isin(candidates, followed)
+        candidates, inverse, mutual = np.unique(candidates[kept], return_inverse=True, return_counts=True)
+        scores = np.bincount(inverse, weights=weights[kept], minlength=len(candidates))
+        order = np.lexsort((candidates, -scores))[:limit]
+        return [(int(candidates[index]) >> 1, float(scores[index]), int(mutual[index])) for index in order]
+
+
+follow_graph = FollowGraph()
+
+
+def get_suggested_profiles(account, limit: Optional[int] = None) -> List[Profile]:
+    """
+    Get the active public profiles suggested to the profile or agency to follow, with their `suggestion_score` &
+    `mutual_count` set. Suggestions are loaded in batches until the limit is reached, skipping the hidden ones.
+    """
+    limit = limit or settings.FOLLOW_SUGGESTIONS_LIMIT
+    ranking = follow_graph.suggest(get_node_key(account.pk, get_node_kind(type(account))))
+    suggested = []
+    for start in range(0, len(ranking), limit):
+        batch = ranking[start:start + limit]
+        profiles = Profile.objects.active().filter(is_public=True).in_bulk([profile_id for profile_id, *_ in batch])
+        for profile_id, score, mutual_count in batch:
+            profile = profiles.get(profile_id)
+            if profile is not None:
+                profile.suggestion_score, profile.mutual_count = score, mutual_count
+                suggested.append(profile)
+        if len(suggested) >= limit:
+            break
+    return suggested[:limit]
+
+
+def sync_follow_graph(sender, instance, action, reverse, model, pk_set, using, *args, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    field = FOLLOW_FIELDS[sender]
+    instance_column, other_column = field.m2m_field_name(), field.m2m_reverse_field_name()
+    if reverse:
+        instance_column, other_column = other_column, instance_column
+    if action == 'pre_clear':
+        # The cleared relations are looked up before they are
+        pk_set = list(sender.objects.using(using).filter(**{instance_column: instance.pk}).values_list(
+            f'{other_column}_id', flat=True
+        ))
+    instance_key = get_node_key(instance.pk, get_node_kind(type(instance)))
+    keys = [get_node_key(pk, get_node_kind(model)) for pk in pk_set or ()]
+    edges = [(key, instance_key) for key in keys] if reverse else [(instance_key, key) for key in keys]
+    if field.remote_field.symmetrical:
+        edges += [(target, source) for source, target in edges]
+    # Applied once committed, so that the follows of rolled back transactions never reach the graph
+    transaction.on_commit(lambda: follow_graph.follow(edges, is_following=action == 'post_add'), using=using)
+
+
+for through in FOLLOW_FIELDS:
+    m2m_changed.connect(sync_follow_graph, sender=through, dispatch_uid=f'follow_graph_{through._meta.label_lower}')
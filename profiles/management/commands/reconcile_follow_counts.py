@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from agencies.models import Agency
+from profiles.models import Profile
+from profiles.utils import get_follow_fields, refresh_follow_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the followers & following counts of the profiles & agencies out of their following relations, ' \
+           'e.g. to fix any drift left by raw or bulk changes of the relations, which skip the signals keeping them ' \
+           'in sync.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of objects updated per query')
+
+    def handle(self, *args, **options):
+        fields = get_follow_fields(Profile, Agency)
+        for model in (Profile, Agency):
+            count = refresh_follow_counts(model, fields, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Fixed the counts of {count} {model._meta.verbose_name_plural}'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0012_alter_profile_cover_alter_profile_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='update_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Update Date'),
+        ),
+    ]
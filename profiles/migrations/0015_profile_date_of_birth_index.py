@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0014_profile_bitsets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='date_of_birth',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='Date of Birth'),
+        ),
+    ]
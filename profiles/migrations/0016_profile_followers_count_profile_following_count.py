@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:26
+
+from django.db import migrations, models
+
+from profiles.utils import get_follow_fields, refresh_follow_counts
+
+
+def fill_follow_counts(apps, schema_editor):
+    profile_model, agency_model = apps.get_model('profiles', 'Profile'), apps.get_model('agencies', 'Agency')
+    fields = get_follow_fields(profile_model, agency_model)
+    for model in (profile_model, agency_model):
+        refresh_follow_counts(model, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agencies', '0011_agency_followers_count_agency_following_count'),
+        ('profiles', '0015_profile_date_of_birth_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Followers Count'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Following Count'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
-from django.db.models.signals import post_save, pre_delete
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from django.utils.timezone import localdate
+from django.utils.timezone import localdate, now
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -11,7 +12,8 @@ from phonenumber_field.modelfields import PhoneNumberField
 from agencies.models import Agency
 from accounts.enums import RoleChoices
 from accounts.models import CustomUserManager
-from .utils import get_hostname_from_url
+from .utils import (get_date_of_birth_range, get_hostname_from_url, get_follow_fields, get_related_ids, has_bit,
+                    refresh_bitsets, stash_related_ids)
 from .validators import FileSizeValidator
 from .enums import GenderChoices, RaceChoices, HairColorChoices, EyeColorChoices, ClassChoices
 
@@ -85,8 +87,16 @@ class ProfilerQuerySet(models.QuerySet):
             )
         )
 
-    def age_range(self, start, end):
-        return self.with_age().filter(age__gte=start, age__lte=end)
+    def age_range(self, start=None, end=None):
+        # Filter on the date of birth itself rather than the computed age, so that its index is used
+        earliest, latest = get_date_of_birth_range(start, end)
+        if earliest is not None and latest is not None:
+            return self.filter(date_of_birth__range=(earliest, latest))
+        if earliest is not None:
+            return self.filter(date_of_birth__gte=earliest)
+        if latest is not None:
+            return self.filter(date_of_birth__lte=latest)
+        return self
 
 
 class ProfileManager(models.Manager):
@@ -97,7 +107,7 @@ class ProfileManager(models.Manager):
     def active(self):
         return self.get_queryset().filter(user__is_active=True)
 
-    def age_range(self, start, end):
+    def age_range(self, start=None, end=None):
         return self.get_queryset().age_range(start, end)
 
 
@@ -112,16 +122,21 @@ class Profile(models.Model):
                                               verbose_name=_('Following Models'))
     following_agencies = models.ManyToManyField(Agency, blank=True, related_name='follower_agencies',
                                                 verbose_name=_('Following Agencies'))
+    followers_count = models.PositiveIntegerField(default=0, editable=False, db_index=True,
+                                                  verbose_name=_('Followers Count'))
+    following_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Following Count'))
 
     # Personal Details
     bio = models.TextField(null=True, blank=True, verbose_name=_('Bio'))
     skills = models.ManyToManyField(Skill, blank=True, verbose_name=_('Skills'))
     languages = models.ManyToManyField(Language, blank=True, verbose_name=_('Languages'))
+    skills_bitset = models.BinaryField(default=b'', editable=False, verbose_name=_('Skills Bitset'))
+    languages_bitset = models.BinaryField(default=b'', editable=False, verbose_name=_('Languages Bitset'))
     gender = models.PositiveSmallIntegerField(choices=GenderChoices.choices, default=GenderChoices.MALE, null=True,
                                               blank=True, verbose_name=_('Gender'))
     race = models.PositiveSmallIntegerField(choices=RaceChoices.choices, default=RaceChoices.OTHER, null=True,
                                             blank=True, verbose_name=_('Race'))
-    date_of_birth = models.DateField(null=True, blank=True, verbose_name=_('Date of Birth'))
+    date_of_birth = models.DateField(null=True, blank=True, db_index=True, verbose_name=_('Date of Birth'))
 
     # Contact Information
     phone_number_1 = PhoneNumberField(null=True, blank=True, verbose_name=_('Phone Number 1'))
@@ -163,7 +178,7 @@ class Profile(models.Model):
 
     # Manipulation Attributes
     create_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Creation Date'))
-    update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
+    update_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_('Update Date'))
 
     objects = ProfileManager()
 
@@ -235,12 +250,102 @@ class ProfileImage(models.Model):
         ordering = ('-create_at', '-update_at')
 
 
+@receiver(connection_created)
+def register_bitset_functions(sender, connection, *args, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('HAS_BIT', 2, has_bit, deterministic=True)
+
+
 @receiver(post_save, sender=User)
 def create_model_profile(sender, instance, created, *args, **kwargs):
     if created and instance and instance.role == RoleChoices.MODEL:
         instance.profile = Profile.objects.create(user=instance)
 
 
+@receiver(post_save, sender=User)
+def touch_user_profile(sender, instance, created, update_fields=None, *args, **kwargs):
+    # Profiles of deactivated users should leave the profile index of the matching engine
+    if not created and (update_fields is None or 'is_active' in update_fields):
+        Profile.objects.filter(user=instance).update(update_at=now())
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+@receiver(m2m_changed, sender=Profile.languages.through)
+def sync_profile_bitsets(sender, instance, action, reverse, pk_set, *args, **kwargs):
+    field_name = 'skills' if sender is Profile.skills.through else 'languages'
+    if action == 'pre_clear' and reverse:
+        stash_related_ids(Profile, field_name, instance)
+        return
+    # Relations changes don't update the profile by themselves, touch them to be reloaded into the profile index
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bitsets = refresh_bitsets(Profile, field_name, [instance.pk], update_at=now())
+        # Keep the instance in sync, otherwise saving it later overwrites the stored bitset
+        setattr(instance, f'{field_name}_bitset', bitsets[instance.pk])
+        return
+    # The instance is a skill / language, while the changed profiles are at the primary keys set
+    pk_set = get_related_ids(Profile, field_name, instance) if action == 'post_clear' else pk_set
+    if pk_set:
+        refresh_bitsets(Profile, field_name, pk_set, update_at=now())
+
+
+@receiver(pre_delete, sender=Skill)
+@receiver(pre_delete, sender=Language)
+def stash_deleted_profile_relations(sender, instance, *args, **kwargs):
+    # Relations of deleted skills & languages are cascaded without signals
+    stash_related_ids(Profile, 'skills' if sender is Skill else 'languages', instance)
+
+
+@receiver(post_delete, sender=Skill)
+@receiver(post_delete, sender=Language)
+def sync_deleted_profile_bitsets(sender, instance, *args, **kwargs):
+    field_name = 'skills' if sender is Skill else 'languages'
+    pk_set = get_related_ids(Profile, field_name, instance)
+    if pk_set:
+        refresh_bitsets(Profile, field_name, pk_set, update_at=now())
+
+
+# Following relations of the profiles & agencies, keyed by their through models
+FOLLOW_FIELDS = {field.remote_field.through: field for field in get_follow_fields(Profile, Agency)}
+
+
+def increment_follow_counts(model, ids, field_name: str, count: int):
+    model.objects.filter(pk__in=ids).update(**{field_name: models.F(field_name) + count})
+
+
+@receiver(m2m_changed, sender=Profile.following_models.through)
+@receiver(m2m_changed, sender=Profile.following_agencies.through)
+@receiver(m2m_changed, sender=Agency.following_models.through)
+@receiver(m2m_changed, sender=Agency.following_agencies.through)
+def sync_follow_counts(sender, instance, action, reverse, model, pk_set, *args, **kwargs):
+    # Counted by F expressions, so that the concurrent follows aren't lost, rather than by counting the relations
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    field = FOLLOW_FIELDS[sender]
+    instance_column, other_column = field.m2m_field_name(), field.m2m_reverse_field_name()
+    if reverse:
+        instance_column, other_column = other_column, instance_column
+    if action != 'post_add':
+        # Only the existing relations are removed, so they are looked up before they are
+        lookups = {instance_column: instance.pk}
+        if pk_set is not None:
+            lookups[f'{other_column}__in'] = pk_set
+        pk_set = set(sender.objects.filter(**lookups).values_list(f'{other_column}_id', flat=True))
+    if not pk_set:
+        return
+    count = 1 if action == 'post_add' else -1
+    # Rows of a symmetrical relation are mirrored, following & followed at once
+    field_names = [('followers_count', 'following_count')] if reverse else [('following_count', 'followers_count')]
+    if field.remote_field.symmetrical:
+        field_names.append(('followers_count', 'following_count'))
+    for instance_field_name, other_field_name in field_names:
+        increment_follow_counts(type(instance), [instance.pk], instance_field_name, count * len(pk_set))
+        increment_follow_counts(model, pk_set, other_field_name, count)
+        # Keep the instance in sync, otherwise saving it later overwrites the stored count
+        setattr(instance, instance_field_name, getattr(instance, instance_field_name) + count * len(pk_set))
+
+
 @receiver(pre_delete, sender=Profile)
 def delete_model_photos(sender, instance, *args, **kwargs):
     image = instance.image
@@ -1,3 +1,434 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from math import log
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate
+
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.enums import RoleChoices
+from agencies.models import Agency
+from .graph import AGENCY, PROFILE, FollowGraph, get_node_key, get_suggested_profiles
+from .api.filters import ProfileFilter
+from .models import Language, Profile, Skill
+from .utils import encode_bitset, get_date_of_birth_range, has_bit, subtract_years
+
+
+def create_profile(username, **fields):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password', role=RoleChoices.MODEL)
+    if fields:
+        Profile.objects.filter(user=user).update(**fields)
+    return Profile.objects.get(user=user)
+
+
+def create_agency(username):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password', role=RoleChoices.DIRECTOR)
+    return Agency.objects.get(user=user)
+
+
+class SubtractYearsTests(SimpleTestCase):
+
+    def test_subtract(self):
+        self.assertEqual(subtract_years(date(2023, 6, 1), 30), date(1993, 6, 1))
+        self.assertEqual(subtract_years(date(2023, 6, 1), -1), date(2024, 6, 1))
+
+    def test_leap_day(self):
+        self.assertEqual(subtract_years(date(2024, 2, 29), 4), date(2020, 2, 29))
+        self.assertEqual(subtract_years(date(2024, 2, 29), 1), date(2023, 2, 28))
+
+    def test_out_of_range(self):
+        self.assertIsNone(subtract_years(date(2024, 1, 1), 2024))
+        self.assertIsNone(subtract_years(date(2024, 1, 1), -8000))
+
+
+@mock.patch('profiles.utils.localdate', return_value=date(2024, 2, 29))
+class DateOfBirthRangeTests(SimpleTestCase):
+
+    def test_unbounded(self, localdate):
+        self.assertEqual(get_date_of_birth_range(), (None, None))
+
+    def test_range(self, localdate):
+        self.assertEqual(get_date_of_birth_range(30, 31), (date(1992, 3, 1), date(1994, 2, 28)))
+        self.assertEqual(get_date_of_birth_range(0, 0), (date(2023, 3, 1), date(2024, 2, 29)))
+
+    def test_leap_day(self, localdate):
+        # Born on the 29th of February 2020, turned 4 today & not 5 before the 1st of March 2025
+        earliest, latest = get_date_of_birth_range(4, 4)
+        self.assertTrue(earliest <= date(2020, 2, 29) <= latest)
+        self.assertEqual(get_date_of_birth_range(1, 1), (date(2022, 3, 1), date(2023, 2, 28)))
+
+    def test_older_than_the_dates(self, localdate):
+        self.assertEqual(get_date_of_birth_range(10 ** 5, None), (None, date.min))
+        self.assertEqual(get_date_of_birth_range(None, 10 ** 5), (date.min, None))
+
+    def test_younger_than_the_dates(self, localdate):
+        self.assertEqual(get_date_of_birth_range(-10 ** 5, None), (None, date.max))
+        self.assertEqual(get_date_of_birth_range(None, -10 ** 5), (date.max, None))
+
+
+class BitsetTests(SimpleTestCase):
+
+    def test_encode(self):
+        self.assertEqual(encode_bitset([]), b'')
+        self.assertEqual(encode_bitset([0, 3, 9]), bytes([0b1001, 0b10]))
+
+    def test_has_bit(self):
+        bitset = encode_bitset([0, 3, 9])
+        self.assertEqual([index for index in range(24) if has_bit(bitset, index)], [0, 3, 9])
+        self.assertFalse(has_bit(None, 0))
+
+
+class ProfileBitsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.skills = [Skill.objects.create(name=name) for name in ('Dancing', 'Acting', 'Singing')]
+        cls.languages = [Language.objects.create(name=name) for name in ('English', 'French')]
+        cls.first, cls.second = create_profile('first'), create_profile('second')
+        cls.first.skills.add(*cls.skills[:2])
+        cls.first.languages.add(cls.languages[0])
+        cls.second.skills.add(cls.skills[2])
+
+    def assertBitsets(self, profile, skills, languages=()):
+        stored = Profile.objects.get(pk=profile.pk)
+        self.assertEqual(bytes(stored.skills_bitset), encode_bitset(skill.pk for skill in skills))
+        self.assertEqual(bytes(stored.languages_bitset), encode_bitset(language.pk for language in languages))
+
+    def test_relations_changes(self):
+        self.assertBitsets(self.first, self.skills[:2], self.languages[:1])
+        self.first.skills.remove(self.skills[0])
+        self.first.languages.clear()
+        self.assertBitsets(self.first, self.skills[1:2])
+        # Kept on the instance, so that saving it keeps the stored bitsets
+        self.first.save()
+        self.assertBitsets(self.first, self.skills[1:2])
+
+    def test_reverse_relations_changes(self):
+        self.skills[2].profile_set.add(self.first)
+        self.assertBitsets(self.first, self.skills, self.languages[:1])
+        self.skills[2].profile_set.clear()
+        self.assertBitsets(self.first, self.skills[:2], self.languages[:1])
+        self.assertBitsets(self.second, [])
+
+    def test_deleted_relations(self):
+        self.skills[0].delete()
+        self.assertBitsets(self.first, self.skills[1:2], self.languages[:1])
+        self.assertBitsets(self.second, self.skills[2:])
+
+    def test_filter(self):
+        queryset = Profile.objects.all()
+        self.assertEqual(set(ProfileFilter({'skills': [self.skills[1].pk]}, queryset).qs), {self.first})
+        self.assertEqual(set(ProfileFilter({'skills': [self.skills[1].pk, self.skills[2].pk]}, queryset).qs),
+                         {self.first, self.second})
+        self.assertEqual(set(ProfileFilter({'languages': [self.languages[1].pk]}, queryset).qs), set())
+
+
+class AgeRangeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = localdate()
+        dates_of_birth = [
+            subtract_years(today, years) + timedelta(days=days)
+            for years in (0, 1, 17, 18, 30, 31, 80) for days in (-1, 0, 1)
+        ]
+        dates_of_birth += [date(2000, 2, 29), date(2004, 2, 29), None]
+        for index, date_of_birth in enumerate(dates_of_birth):
+            create_profile(f'model-{index}', date_of_birth=date_of_birth)
+
+    def assertMatchesComputedAge(self, start, end):
+        lookups = {'age__gte': start, 'age__lte': end}
+        computed = Profile.objects.get_queryset().with_age().filter(
+            **{lookup: value for lookup, value in lookups.items() if value is not None}
+        )
+        self.assertEqual(
+            set(Profile.objects.age_range(start, end).values_list('pk', flat=True)),
+            set(computed.values_list('pk', flat=True)),
+            f'Ages from {start} to {end}'
+        )
+
+    def test_matches_computed_age(self):
+        for start, end in ((0, 0), (18, 18), (17, 31), (None, 30), (30, None), (1, 80), (23, 24)):
+            self.assertMatchesComputedAge(start, end)
+
+    def test_out_of_range_ages(self):
+        for start, end in ((-10 ** 5, None), (None, -10 ** 5), (10 ** 5, None), (None, 10 ** 5), (-1, -1)):
+            self.assertMatchesComputedAge(start, end)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class AgeRangeQueryPlanTests(TestCase):
+
+    def test_searches_date_of_birth_index(self):
+        plan = Profile.objects.age_range(30, 31).explain()
+        self.assertRegex(
+            plan, r'SEARCH \S+ USING (COVERING )?INDEX \S*date_of_birth\S* \(date_of_birth>\? AND date_of_birth<\?\)'
+        )
+        self.assertNotIn('SCAN', plan)
+
+
+class FollowGraphTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agency = create_agency('director')
+        cls.first, cls.second, cls.third, cls.fourth = (create_profile(f'model-{index}') for index in range(4))
+        cls.agency.following_models.add(cls.first, cls.second)
+        # Follows between profiles are symmetrical
+        cls.first.following_models.add(cls.third)
+        cls.second.following_models.add(cls.third, cls.fourth)
+
+    def setUp(self):
+        self.graph = FollowGraph()
+        patcher = mock.patch('profiles.graph.follow_graph', self.graph)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggest(self, account, limit=None):
+        kind = AGENCY if isinstance(account, Agency) else PROFILE
+        return [(pk, mutual_count) for pk, score, mutual_count in self.graph.suggest(get_node_key(account.pk, kind),
+                                                                                      limit)]
+
+    def test_rows(self):
+        self.graph.refresh()
+        self.assertEqual(
+            list(self.graph.neighbors(get_node_key(self.agency.pk, AGENCY))),
+            [get_node_key(self.first.pk, PROFILE), get_node_key(self.second.pk, PROFILE)]
+        )
+        self.assertEqual(len(self.graph.neighbors(get_node_key(self.fourth.pk, PROFILE))), 1)
+        self.assertEqual(len(self.graph.neighbors(get_node_key(10 ** 6, PROFILE))), 0)
+
+    def test_suggest(self):
+        # Follows through the selective first profile weigh more than the ones through the second
+        ranking = self.graph.suggest(get_node_key(self.agency.pk, AGENCY))
+        self.assertEqual([(pk, mutual_count) for pk, score, mutual_count in ranking],
+                         [(self.third.pk, 2), (self.fourth.pk, 1)])
+        self.assertAlmostEqual(ranking[0][1], 1 / log(2) + 1 / log(3))
+        self.assertAlmostEqual(ranking[1][1], 1 / log(3))
+        self.assertEqual(self.suggest(self.agency, 1), [(self.third.pk, 2)])
+
+    def test_suggest_leaves_out_followed(self):
+        self.assertEqual(self.suggest(self.first), [(self.second.pk, 1)])
+        self.assertEqual(self.suggest(self.fourth), [(self.third.pk, 1)])
+
+    def test_follows_applied_on_commit(self):
+        self.graph.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agency.following_models.add(self.third)
+            # Not applied until committed
+            self.assertEqual(self.suggest(self.agency), [(self.third.pk, 2), (self.fourth.pk, 1)])
+        self.assertEqual(self.suggest(self.agency), [(self.fourth.pk, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agency.following_models.remove(self.third)
+        self.assertEqual(self.suggest(self.agency), [(self.third.pk, 2), (self.fourth.pk, 1)])
+
+    def test_rolled_back_follows_not_applied(self):
+        self.graph.refresh()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.agency.following_models.add(self.third)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.suggest(self.agency), [(self.third.pk, 2), (self.fourth.pk, 1)])
+
+    def test_clear(self):
+        self.graph.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agency.following_models.clear()
+        self.assertEqual(self.suggest(self.agency), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.agency.following_models.add(self.first, self.second)
+            # Reverse accessor of the agencies following the profile
+            self.first.follower_models.clear()
+            self.first.following_models.clear()
+        # Ties are broken by the ids
+        self.assertEqual(self.suggest(self.agency), [(self.third.pk, 1), (self.fourth.pk, 1)])
+        # Same as the rows of a graph built after the changes
+        self.assertEqual(
+            [self.graph.suggest(get_node_key(account.pk, kind)) for account, kind in ((self.agency, AGENCY),
+                                                                                     (self.third, PROFILE))],
+            [FollowGraph().suggest(get_node_key(account.pk, kind)) for account, kind in ((self.agency, AGENCY),
+                                                                                        (self.third, PROFILE))]
+        )
+
+    def test_pending_follows_replayed(self):
+        load = FollowGraph.load
+        edge = (get_node_key(self.agency.pk, AGENCY), get_node_key(self.third.pk, PROFILE))
+
+        def load_missing_follow():
+            rows = load()
+            # Followed after the rows were read, before they are swapped in
+            self.graph.follow([edge])
+            return rows
+
+        with mock.patch.object(self.graph, 'load', load_missing_follow):
+            self.graph.refresh()
+        self.assertIsNone(self.graph.pending)
+        self.assertEqual(self.suggest(self.agency), [(self.fourth.pk, 1)])
+
+    def test_rebuild_catches_up(self):
+        self.graph.refresh()
+        # Follows of the other processes reach the graph by its rebuilds only
+        Profile.following_models.through.objects.create(from_profile=self.fourth, to_profile=self.first)
+        self.assertEqual(self.suggest(self.fourth), [(self.third.pk, 1)])
+        with override_settings(FOLLOW_GRAPH_REBUILD_INTERVAL=-1):
+            self.assertEqual(self.suggest(self.fourth), [(self.third.pk, 2)])
+
+    def test_suggested_profiles(self):
+        Profile.objects.filter(pk=self.third.pk).update(is_public=False)
+        self.assertEqual(get_suggested_profiles(self.agency), [self.fourth])
+        Profile.objects.filter(pk=self.third.pk).update(is_public=True)
+        User.objects.filter(pk=self.fourth.user_id).update(is_active=False)
+        suggested = get_suggested_profiles(self.agency, 1)
+        self.assertEqual(suggested, [self.third])
+        self.assertEqual(suggested[0].mutual_count, 2)
+
+
+class FollowCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second, cls.third = (create_profile(f'model-{index}') for index in range(3))
+        cls.agency, cls.other_agency = create_agency('director'), create_agency('other-director')
+
+    def assertCounts(self, account, followers_count, following_count):
+        account.refresh_from_db()
+        self.assertEqual((account.followers_count, account.following_count), (followers_count, following_count))
+
+    def test_follow_agencies(self):
+        self.first.following_agencies.add(self.agency, self.other_agency)
+        self.assertCounts(self.first, 0, 2)
+        self.assertCounts(self.agency, 1, 0)
+        # Existing follows are neither added again nor counted twice
+        self.first.following_agencies.add(self.agency)
+        self.first.following_agencies.remove(self.agency, self.agency)
+        self.assertCounts(self.first, 0, 1)
+        self.assertCounts(self.agency, 0, 0)
+        self.assertCounts(self.other_agency, 1, 0)
+
+    def test_symmetrical_follows(self):
+        self.first.following_models.add(self.second, self.third)
+        self.assertCounts(self.first, 2, 2)
+        self.assertCounts(self.second, 1, 1)
+        self.agency.following_agencies.add(self.other_agency)
+        self.assertCounts(self.other_agency, 1, 1)
+        self.second.following_models.remove(self.first)
+        self.assertCounts(self.first, 1, 1)
+        self.assertCounts(self.second, 0, 0)
+
+    def test_reverse_follows(self):
+        # Profiles following the agency
+        self.agency.follower_agencies.add(self.first, self.second)
+        self.assertCounts(self.agency, 2, 0)
+        self.assertCounts(self.second, 0, 1)
+        self.agency.follower_agencies.clear()
+        self.assertCounts(self.agency, 0, 0)
+        self.assertCounts(self.first, 0, 0)
+
+    def test_clear(self):
+        self.agency.following_models.add(self.first, self.second)
+        self.agency.following_models.clear()
+        self.assertCounts(self.agency, 0, 0)
+        self.assertCounts(self.first, 0, 0)
+        self.agency.following_models.clear()
+        self.assertCounts(self.agency, 0, 0)
+
+    def test_instance_kept_in_sync(self):
+        self.first.following_agencies.add(self.agency)
+        self.first.save()
+        self.assertCounts(self.first, 0, 1)
+
+    def test_reconcile(self):
+        self.first.following_models.add(self.second)
+        self.first.following_agencies.add(self.agency)
+        self.agency.following_models.add(self.first)
+        # Deleted profiles cascade their follows without signals
+        self.third.following_agencies.add(self.agency)
+        self.third.delete()
+        Profile.objects.filter(pk=self.second.pk).update(followers_count=5, following_count=5)
+        self.assertCounts(self.agency, 2, 1)
+        call_command('reconcile_follow_counts', batch_size=1, stdout=StringIO())
+        self.assertCounts(self.first, 2, 2)
+        self.assertCounts(self.second, 1, 1)
+        self.assertCounts(self.agency, 1, 1)
+        self.assertCounts(self.other_agency, 0, 0)
+
+
+class BulkFollowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile, cls.second, cls.third, cls.fourth = (create_profile(f'model-{index}') for index in range(4))
+        cls.agency, cls.other_agency = create_agency('director'), create_agency('other-director')
+        User.objects.filter(pk=cls.fourth.user_id).update(is_active=False)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.profile.user)
+
+    def post(self, url_name, ids):
+        return self.client.post(reverse(url_name), {'ids': ids}, format='json')
+
+    def test_bulk_follow(self):
+        # The account itself, the inactive profiles & the missing ones are skipped
+        ids = [self.second.pk, self.third.pk, self.profile.pk, self.fourth.pk, 10 ** 6]
+        response = self.post('profiles:profile-bulk-follow', ids)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'ids': sorted([self.second.pk, self.third.pk])})
+        self.assertEqual(set(self.profile.following_models.all()), {self.second, self.third})
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.following_count, 2)
+        # Following again is a no-op
+        self.assertEqual(self.post('profiles:profile-bulk-follow', ids).status_code, 200)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.following_count, 2)
+
+    def test_bulk_follow_queries(self):
+        # The queries don't grow with the number of targets
+        last_agency = create_agency('last-director')
+        with CaptureQueriesContext(connection) as single:
+            self.post('agencies:agency-bulk-follow', [self.agency.pk])
+        with CaptureQueriesContext(connection) as many:
+            self.post('agencies:agency-bulk-follow', [self.other_agency.pk, last_agency.pk])
+        self.assertEqual(len(single), len(many))
+
+    def test_bulk_unfollow(self):
+        self.profile.following_agencies.add(self.agency, self.other_agency)
+        response = self.post('agencies:agency-bulk-unfollow', [self.agency.pk, 10 ** 6])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(self.profile.following_agencies.all()), [self.other_agency])
+        self.agency.refresh_from_db()
+        self.assertEqual(self.agency.followers_count, 0)
+
+    def test_director_bulk_follow(self):
+        self.client.force_authenticate(self.agency.user)
+        self.post('agencies:agency-bulk-follow', [self.agency.pk, self.other_agency.pk])
+        self.post('profiles:profile-bulk-follow', [self.second.pk])
+        self.assertEqual(list(self.agency.following_agencies.all()), [self.other_agency])
+        self.assertEqual(list(self.agency.following_models.all()), [self.second])
+
+    def test_follow_status(self):
+        self.profile.following_models.add(self.third)
+        response = self.client.get(reverse('profiles:profile-follow-status'),
+                                   {'ids': [self.third.pk, self.second.pk, self.third.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'id': self.third.pk, 'is_following': True},
+                                           {'id': self.second.pk, 'is_following': False}])
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.post('profiles:profile-bulk-follow', []).status_code, 400)
+        self.assertEqual(self.post('profiles:profile-bulk-follow', [0]).status_code, 400)
+        ids = list(range(1, settings.FOLLOW_BATCH_MAX_SIZE + 2))
+        self.assertEqual(self.post('profiles:profile-bulk-follow', ids).status_code, 400)
+
+    def test_permissions(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post('profiles:profile-bulk-follow', [self.second.pk]).status_code, 401)
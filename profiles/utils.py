@@ -1,6 +1,14 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import reduce
+from operator import add, or_
+from typing import Iterable, Optional, Tuple
 from urllib.parse import urlparse
 
+from django.db import models, connections
+from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
+from django.utils.timezone import localdate
 
 
 def get_hostname_from_url(url) -> str:
@@ -26,3 +34,161 @@ def create_html_image(image):
             </a>
         """
     )
+
+
+def subtract_years(value: date, years: int) -> Optional[date]:
+    """Subtract years from a date, the 29th of February falls back to the 28th. Out of range dates are None."""
+    if not date.min.year <= value.year - years <= date.max.year:
+        return None
+    try:
+        return value.replace(year=value.year - years)
+    except ValueError:
+        return value.replace(year=value.year - years, day=28)
+
+
+def get_date_of_birth_range(age_min: Optional[int] = None,
+                            age_max: Optional[int] = None) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Translate an inclusive range of ages in full years into an inclusive range of dates of birth.
+
+    People aged `age_max` at most were born after the day they would have turned `age_max + 1`, and people aged
+    `age_min` at least were born at most on the day they turned `age_min`. Unbounded sides are None, while bounds
+    matching every date are kept as the extreme dates, so that the profiles without a date of birth still fail them.
+    """
+    today = localdate()
+    earliest = latest = None
+    # Ages out of the range of the dates are older than anyone can be when positive, younger than anyone when negative
+    if age_max is not None:
+        turned = subtract_years(today, int(age_max) + 1)
+        if turned is None:
+            earliest = date.min if int(age_max) >= 0 else date.max
+        else:
+            earliest = turned + timedelta(days=1) if turned < date.max else date.max
+    if age_min is not None:
+        latest = subtract_years(today, int(age_min))
+        if latest is None:
+            latest = date.min if int(age_min) >= 0 else date.max
+    return earliest, latest
+
+
+def encode_bitset(ids: Iterable[int]) -> bytes:
+    """Encode a set of IDs as a little endian bitset, where the bit N is set for the ID N."""
+    mask = 0
+    for pk in ids:
+        mask |= 1 << pk
+    return mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+
+
+def has_bit(bitset, index: int) -> bool:
+    """Whether the bit of the index is set at a bitset, registered as `HAS_BIT` SQL function on SQLite."""
+    return bitset is not None and index // 8 < len(bitset) and bool(bitset[index // 8] >> index % 8 & 1)
+
+
+class HasBit(models.Func):
+    """Whether the bit of the index is set at a bitset field, supported on SQLite & PostgreSQL."""
+    function = 'HAS_BIT'
+    arity = 2
+    output_field = models.BooleanField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        (bitset, bitset_params), (index, index_params) = (
+            compiler.compile(expression) for expression in self.get_source_expressions()
+        )
+        # get_bit numbers the bits of every byte starting from the least significant one, like the encoded bitsets
+        sql = f'(octet_length({bitset}) > {index} / 8 AND get_bit({bitset}, {index}) = 1)'
+        return sql, (*bitset_params, *index_params, *bitset_params, *index_params)
+
+
+def filter_bitset(queryset, field_name: str, values):
+    """Filter the objects related to any of the values, tested against their bitsets instead of the join table."""
+    if not values:
+        return queryset
+    if connections[queryset.db].vendor not in ('sqlite', 'postgresql'):
+        return queryset.filter(**{f'{field_name}__in': values}).distinct()
+    return queryset.filter(reduce(or_, (HasBit(f'{field_name}_bitset', value.pk) for value in values)))
+
+
+def refresh_bitsets(model, field_name: str, ids: Iterable[int], **fields) -> dict:
+    """
+    Recompute & store the bitsets of a many to many field of the model, kept at `<field_name>_bitset`.
+
+    Extra fields are stored along with the bitsets, returns the new bitsets keyed by the objects IDs.
+    """
+    field = model._meta.get_field(field_name)
+    source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+    ids = list(ids)
+    related_ids = defaultdict(list)
+    for object_id, related_id in field.remote_field.through.objects.filter(**{f'{source}__in': ids}).values_list(
+            f'{source}_id', f'{target}_id'):
+        related_ids[object_id].append(related_id)
+    bitsets = {object_id: encode_bitset(related_ids[object_id]) for object_id in ids}
+    bitset_field = f'{field_name}_bitset'
+    model.objects.bulk_update(
+        [model(pk=object_id, **{bitset_field: bitset}, **fields) for object_id, bitset in bitsets.items()],
+        [bitset_field, *fields]
+    )
+    return bitsets
+
+
+def get_related_ids_key(model, field_name: str) -> str:
+    return f'_related_{model._meta.model_name}_{field_name}_ids'
+
+
+def stash_related_ids(model, field_name: str, instance) -> None:
+    """
+    Keep the IDs of the model objects related to the instance through the many to many field on the instance.
+
+    Relations cleared from the reverse side send no primary keys set, and the ones of deleted objects send no signal,
+    so the objects whose bitsets change are looked up before, on `pre_clear` & `pre_delete`.
+    """
+    field = model._meta.get_field(field_name)
+    ids = field.remote_field.through.objects.filter(**{field.m2m_reverse_field_name(): instance.pk}).values_list(
+        f'{field.m2m_field_name()}_id', flat=True
+    )
+    setattr(instance, get_related_ids_key(model, field_name), set(ids))
+
+
+def get_related_ids(model, field_name: str, instance) -> set:
+    """Get the IDs of the model objects stashed on the instance, before its relations were cleared or deleted."""
+    return getattr(instance, get_related_ids_key(model, field_name), set())
+
+
+def get_follow_fields(profile_model, agency_model) -> list:
+    """Get the following many to many fields of the profiles & agencies, either of them following either of them."""
+    return [model._meta.get_field(field_name) for model in (profile_model, agency_model)
+            for field_name in ('following_models', 'following_agencies')]
+
+
+def count_follows(fields, model) -> Tuple[models.Expression, models.Expression]:
+    """
+    Count the followers & following of the model objects within the query, out of the rows of the following many to
+    many fields, each row being the follower & the followed objects.
+    """
+    def count(field, column):
+        through = field.remote_field.through
+        return Coalesce(models.Subquery(
+            through.objects.filter(**{column: models.OuterRef('pk')}).order_by().values(column).annotate(
+                count=models.Count('*')
+            ).values('count')
+        ), 0)
+
+    label = model._meta.label
+    followers = [count(field, field.m2m_reverse_field_name()) for field in fields
+                 if field.related_model._meta.label == label]
+    following = [count(field, field.m2m_field_name()) for field in fields if field.model._meta.label == label]
+    return reduce(add, followers), reduce(add, following)
+
+
+def refresh_follow_counts(model, fields, batch_size: int = 1000) -> int:
+    """
+    Recount & store the `followers_count` & `following_count` of the model objects out of the following many to many
+    fields, return the number of the objects whose counts drifted.
+    """
+    followers, following = count_follows(fields, model)
+    drifted = model.objects.annotate(followers=followers, following=following).exclude(
+        followers_count=models.F('followers'), following_count=models.F('following')
+    ).values_list('pk', 'followers', 'following')
+    objects = [model(pk=pk, followers_count=followers, following_count=following)
+               for pk, followers, following in drifted.iterator()]
+    model.objects.bulk_update(objects, ['followers_count', 'following_count'], batch_size=batch_size)
+    return len(objects)
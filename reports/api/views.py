@@ -34,12 +34,12 @@ class ReportViewSet(RetrieveModelMixin, CreateModelMixin, GenericViewSet):
         return context
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
 
     @extend_schema(responses={200: ReportSerializer(many=True)})
     @action(detail=False, methods=["GET"], name='my-reports', url_path='my-reports')
     def my_reports(self, request, *args, **kwargs):
-        self.queryset = self.queryset.filter(user=request.user)
+        self.queryset = self.queryset.filter(user=request.user.pk)
         queryset = self.filter_queryset(self.get_queryset())
 
         page = self.paginate_queryset(queryset)
@@ -98,4 +98,4 @@ class ReportResponseViewSet(RetrieveModelMixin, CreateModelMixin, UpdateModelMix
     permission_classes = [IsModelUser | IsDirectorUser]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
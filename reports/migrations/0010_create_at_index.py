@@ -0,0 +1,18 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_alter_report_attachment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='create_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation Date'),
+        ),
+    ]
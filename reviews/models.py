@@ -29,7 +29,7 @@ class Rate(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
 
     # Manipulation Attributes
-    create_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Creation Date'))
+    create_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('Creation Date'))
     update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
 
     class Meta:
@@ -0,0 +1,141 @@
+import re
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, models
+from django.utils.module_loading import import_string
+
+from .models import SearchDocument
+
+
+# Name of the FTS5 table indexing the search documents on SQLite
+FTS_TABLE = 'search_searchdocument_fts'
+
+
+class BaseSearchBackend:
+    """
+    Search backends filter a queryset by the search documents of its model, and annotate the matched objects with
+    their relevance as `search_rank`, the more relevant the higher.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @staticmethod
+    def tokenize(query: str) -> List[str]:
+        return re.findall(r'\w+', query.lower())
+
+    def quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def get_outer_column(self, queryset, field_name: Optional[str] = None) -> str:
+        """Get the column joined with the search documents, the primary key or else the foreign key of the field."""
+        opts = queryset.model._meta
+        field = opts.get_field(field_name) if field_name else opts.pk
+        return f'{self.quote(opts.db_table)}.{self.quote(field.column)}'
+
+    def search(self, queryset, content_type, query: Optional[str] = None, location: Optional[str] = None,
+               field_name: Optional[str] = None):
+        # Queries of the text & the location are matched against their own columns
+        columns = {'text': self.tokenize(query or ''), 'location': self.tokenize(location or '')}
+        columns = {column: tokens for column, tokens in columns.items() if tokens}
+        if not columns:
+            return queryset.none()
+        return self.search_columns(queryset, content_type, columns, field_name).order_by(
+            '-search_rank', *queryset.model._meta.ordering
+        )
+
+    def search_columns(self, queryset, content_type, columns: Dict[str, List[str]], field_name: Optional[str]):
+        raise NotImplementedError('Search backends must implement search_columns')
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Fallback backend matching every token as a substring of the documents, without ranking."""
+
+    def search_columns(self, queryset, content_type, columns, field_name):
+        documents = SearchDocument.objects.filter(content_type=content_type)
+        for column, tokens in columns.items():
+            for token in tokens:
+                documents = documents.filter(**{f'{column}__icontains': token})
+        return queryset.filter(**{f'{field_name or "pk"}__in': documents.values('object_id')}).annotate(
+            search_rank=models.Value(0.0, output_field=models.FloatField())
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Backend served by the FTS5 table, every token matches as a prefix & results are ranked by BM25."""
+
+    @staticmethod
+    def get_prefixes(tokens: List[str]) -> str:
+        # Tokens are made of word characters only, quoting them keeps FTS5 keywords like OR & NOT as plain words
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    @classmethod
+    def get_match(cls, columns: Dict[str, List[str]]) -> str:
+        return ' AND '.join(f'{column} : ({cls.get_prefixes(tokens)})' for column, tokens in columns.items())
+
+    def search_columns(self, queryset, content_type, columns, field_name):
+        fts, documents = self.quote(FTS_TABLE), self.quote(SearchDocument._meta.db_table)
+        # Joined rather than filtered by a subquery, so that the ranking function runs within the matching query
+        return queryset.extra(
+            tables=[FTS_TABLE, SearchDocument._meta.db_table],
+            where=[
+                f'{fts} MATCH %s',
+                f'{documents}."id" = {fts}."rowid"',
+                # The unary plus keeps the planner from driving the join by the content type index, instead of
+                # running the full text query once
+                f'+{documents}."content_type_id" = %s',
+                f'{documents}."object_id" = {self.get_outer_column(queryset, field_name)}',
+            ],
+            params=[self.get_match(columns), content_type.pk],
+            # BM25 scores are negative, the better the match the lower the score
+            select={'search_rank': f'-bm25({fts})'}
+        )
+
+
+class PostgreSQLSearchBackend(BaseSearchBackend):
+    """
+    Backend served by the `tsvector` & trigram indexes, every token matches as a prefix, and misspelled queries
+    still match similar words. Results are ranked by `ts_rank` & the word similarity.
+    """
+
+    @staticmethod
+    def get_tsquery(tokens: List[str]) -> str:
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def search_columns(self, queryset, content_type, columns, field_name):
+        documents = self.quote(SearchDocument._meta.db_table)
+        where, params, ranks, rank_params = [
+            f'{documents}."content_type_id" = %s',
+            f'{documents}."object_id" = {self.get_outer_column(queryset, field_name)}',
+        ], [content_type.pk], [], []
+        for column, tokens in columns.items():
+            vector = f'to_tsvector(\'simple\', {documents}.{self.quote(column)})'
+            tsquery, text = self.get_tsquery(tokens), ' '.join(tokens)
+            where.append(f'({vector} @@ to_tsquery(\'simple\', %s) OR %s <%% {documents}.{self.quote(column)})')
+            params.extend([tsquery, text])
+            ranks.append(
+                f'ts_rank({vector}, to_tsquery(\'simple\', %s)) + word_similarity(%s, {documents}.{self.quote(column)})'
+            )
+            rank_params.extend([tsquery, text])
+        return queryset.extra(
+            tables=[SearchDocument._meta.db_table],
+            where=where,
+            params=params,
+            select={'search_rank': ' + '.join(ranks)},
+            select_params=rank_params
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(using: str = 'default') -> BaseSearchBackend:
+    """Get the configured search backend, or the one of the database vendor falling back to substring matching."""
+    connection = connections[using]
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)(connection)
+    return BACKENDS.get(connection.vendor, LikeSearchBackend)(connection)
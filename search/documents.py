@@ -0,0 +1,147 @@
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.contrib.contenttypes.models import ContentType
+
+from .models import SearchDocument
+from .backends import get_search_backend
+
+
+class Document:
+    """
+    Describe how the search documents of a model are built, like a model admin describes its admin pages.
+
+    Attributes:
+        - fields (Tuple[str, ...]): Single valued lookups, whose values are joined into the document text.
+        - location_fields (Tuple[str, ...]): Single valued lookups, whose values are joined into the document
+            location, which is tokenized & searched separately from the text.
+        - related (Dict[Model, str]): Related models whose changes alter the documents, mapped to the lookups from
+            the indexed model to them, EG.: `{User: 'user'}`.
+    """
+    fields: Tuple[str, ...] = ()
+    location_fields: Tuple[str, ...] = ()
+    related: Dict = {}
+
+    def __init__(self, model):
+        self.model = model
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    @staticmethod
+    def join(values) -> str:
+        return ' '.join(str(value) for value in values if value)
+
+    def get_documents(self, queryset, content_type) -> Iterator[SearchDocument]:
+        """Build the search documents of the queryset objects."""
+        count = len(self.fields)
+        for pk, *values in queryset.values_list('pk', *self.fields, *self.location_fields).iterator():
+            yield SearchDocument(
+                content_type=content_type,
+                object_id=pk,
+                text=self.join(values[:count]),
+                location=self.join(values[count:])
+            )
+
+    def get_field_names(self, lookup: Optional[str] = None) -> Set[str]:
+        """Get the names of the fields making the documents, either of the model or of the related one at lookup."""
+        fields = (*self.fields, *self.location_fields)
+        if lookup is None:
+            return {field.split('__', 1)[0] for field in fields}
+        prefix = f'{lookup}__'
+        return {field[len(prefix):].split('__', 1)[0] for field in fields if field.startswith(prefix)}
+
+
+class SearchIndex:
+    """Registry of the indexed models, keeping their search documents in sync through the model signals."""
+
+    def __init__(self):
+        self._registry: Dict = {}
+
+    def __contains__(self, model):
+        return model in self._registry
+
+    def __iter__(self):
+        return iter(self._registry)
+
+    def register(self, model, document_class=Document):
+        document = self._registry[model] = document_class(model)
+        label = model._meta.label_lower
+
+        def handle_save(sender, instance, update_fields=None, *args, **kwargs):
+            if update_fields is None or document.get_field_names() & set(update_fields):
+                self.update(model, [instance.pk])
+
+        def handle_delete(sender, instance, *args, **kwargs):
+            self.delete(model, [instance.pk])
+
+        post_save.connect(handle_save, sender=model, weak=False, dispatch_uid=f'search_save_{label}')
+        post_delete.connect(handle_delete, sender=model, weak=False, dispatch_uid=f'search_delete_{label}')
+
+        for related_model, lookup in document.related.items():
+            post_save.connect(
+                self.get_related_handler(model, lookup),
+                sender=related_model,
+                weak=False,
+                dispatch_uid=f'search_save_{label}_{related_model._meta.label_lower}'
+            )
+
+    def get_related_handler(self, model, lookup: str):
+        document = self._registry[model]
+        field_names = document.get_field_names(lookup)
+
+        def handle_related_save(sender, instance, created, update_fields=None, *args, **kwargs):
+            # Newly created related objects have nothing pointing to them yet
+            if created or (update_fields is not None and not field_names & set(update_fields)):
+                return
+            pks = list(document.get_queryset().filter(**{lookup: instance}).values_list('pk', flat=True))
+            if pks:
+                self.update(model, pks)
+
+        return handle_related_save
+
+    def update(self, model, pks: Iterable[int]):
+        """Rebuild the search documents of the model objects."""
+        document = self._registry[model]
+        content_type = ContentType.objects.get_for_model(model)
+        pks = list(pks)
+        documents = document.get_documents(document.get_queryset().filter(pk__in=pks), content_type)
+        with transaction.atomic():
+            SearchDocument.objects.filter(content_type=content_type, object_id__in=pks).delete()
+            SearchDocument.objects.bulk_create(list(documents))
+
+    def delete(self, model, pks: Iterable[int]):
+        content_type = ContentType.objects.get_for_model(model)
+        SearchDocument.objects.filter(content_type=content_type, object_id__in=list(pks)).delete()
+
+    def rebuild(self, model, batch_size: int = 1000) -> int:
+        """Rebuild the search documents of all the model objects, return the number of indexed objects."""
+        document = self._registry[model]
+        content_type = ContentType.objects.get_for_model(model)
+        count = 0
+        with transaction.atomic():
+            SearchDocument.objects.filter(content_type=content_type).delete()
+            batch = []
+            for search_document in document.get_documents(document.get_queryset(), content_type):
+                batch.append(search_document)
+                if len(batch) >= batch_size:
+                    count += len(SearchDocument.objects.bulk_create(batch))
+                    batch = []
+            count += len(SearchDocument.objects.bulk_create(batch))
+        return count
+
+    def search(self, queryset, query: Optional[str] = None, location: Optional[str] = None,
+               field_name: Optional[str] = None):
+        """
+        Filter the queryset by the search queries of the documents text & location in a single query, ordered by
+        relevance & annotated with `search_rank`.
+
+        The documents of the queryset objects are searched, or else the ones of their foreign key at `field_name`.
+        """
+        model = queryset.model._meta.get_field(field_name).related_model if field_name else queryset.model
+        content_type = ContentType.objects.get_for_model(model)
+        return get_search_backend(queryset.db).search(queryset, content_type, query, location, field_name)
+
+
+search_index = SearchIndex()
@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from search.documents import search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search documents of the indexed models, e.g. to repair them after bulk changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Labels of the models to be rebuilt, EG.: profiles.Profile')
+
+    def handle(self, *args, **options):
+        models = list(search_index)
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(exc)
+            for model in models:
+                if model not in search_index:
+                    raise CommandError(f'{model._meta.label} is not indexed')
+
+        for model in models:
+            count = search_index.rebuild(model)
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {model._meta.verbose_name_plural}'))
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = (
+    # External content table reading the documents text, with prefix indexes serving the short prefix queries
+    """
+    CREATE VIRTUAL TABLE "search_searchdocument_fts" USING fts5(
+        "text", content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_insert" AFTER INSERT ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text") VALUES (new."id", new."text");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_delete" AFTER DELETE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text")
+        VALUES ('delete', old."id", old."text");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_update" AFTER UPDATE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text")
+        VALUES ('delete', old."id", old."text");
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text") VALUES (new."id", new."text");
+    END
+    """,
+    """INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts") VALUES ('rebuild')""",
+)
+
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_update"',
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_delete"',
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_insert"',
+    'DROP TABLE IF EXISTS "search_searchdocument_fts"',
+)
+
+POSTGRESQL_FORWARD = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE INDEX "search_searchdocument_text_tsvector" ON "search_searchdocument"
+    USING gin (to_tsvector('simple', "text"))
+    """,
+    """
+    CREATE INDEX "search_searchdocument_text_trigram" ON "search_searchdocument"
+    USING gin ("text" gin_trgm_ops)
+    """,
+)
+
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS "search_searchdocument_text_trigram"',
+    'DROP INDEX IF EXISTS "search_searchdocument_text_tsvector"',
+)
+
+
+def run_vendor_statements(statements):
+    """Run the statements of the database vendor, other vendors are served by substring matching."""
+
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_vendor_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_vendor_statements({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
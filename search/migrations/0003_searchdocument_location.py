@@ -0,0 +1,115 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_update"',
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_delete"',
+    'DROP TRIGGER IF EXISTS "search_searchdocument_fts_insert"',
+    'DROP TABLE IF EXISTS "search_searchdocument_fts"',
+)
+
+# The location is indexed as a column of its own, so that it's tokenized & matched separately from the text
+SQLITE_FORWARD = SQLITE_DROP + (
+    """
+    CREATE VIRTUAL TABLE "search_searchdocument_fts" USING fts5(
+        "text", "location", content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_insert" AFTER INSERT ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text", "location")
+        VALUES (new."id", new."text", new."location");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_delete" AFTER DELETE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text", "location")
+        VALUES ('delete', old."id", old."text", old."location");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_update" AFTER UPDATE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text", "location")
+        VALUES ('delete', old."id", old."text", old."location");
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text", "location")
+        VALUES (new."id", new."text", new."location");
+    END
+    """,
+    """INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts") VALUES ('rebuild')""",
+)
+
+SQLITE_BACKWARD = SQLITE_DROP + (
+    """
+    CREATE VIRTUAL TABLE "search_searchdocument_fts" USING fts5(
+        "text", content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_insert" AFTER INSERT ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text") VALUES (new."id", new."text");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_delete" AFTER DELETE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text")
+        VALUES ('delete', old."id", old."text");
+    END
+    """,
+    """
+    CREATE TRIGGER "search_searchdocument_fts_update" AFTER UPDATE ON "search_searchdocument" BEGIN
+        INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts", "rowid", "text")
+        VALUES ('delete', old."id", old."text");
+        INSERT INTO "search_searchdocument_fts" ("rowid", "text") VALUES (new."id", new."text");
+    END
+    """,
+    """INSERT INTO "search_searchdocument_fts" ("search_searchdocument_fts") VALUES ('rebuild')""",
+)
+
+POSTGRESQL_FORWARD = (
+    """
+    CREATE INDEX "search_searchdocument_location_tsvector" ON "search_searchdocument"
+    USING gin (to_tsvector('simple', "location"))
+    """,
+    """
+    CREATE INDEX "search_searchdocument_location_trigram" ON "search_searchdocument"
+    USING gin ("location" gin_trgm_ops)
+    """,
+)
+
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS "search_searchdocument_location_trigram"',
+    'DROP INDEX IF EXISTS "search_searchdocument_location_tsvector"',
+)
+
+
+def run_vendor_statements(statements):
+    """Run the statements of the database vendor, other vendors are served by substring matching."""
+
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchdocument',
+            name='location',
+            field=models.TextField(blank=True, default='', verbose_name='Location'),
+        ),
+        migrations.RunPython(
+            run_vendor_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_vendor_statements({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+# Documents of the indexed models as of this migration, later changes of the documents are applied by running the
+# `rebuild_search_index` command rather than by this migration
+DOCUMENTS = {
+    ('profiles', 'profile'): (
+        ('user__first_name', 'user__last_name', 'user__email', 'user__username', 'bio'),
+        (),
+    ),
+    ('contracts', 'contract'): (
+        ('title', 'description', 'guidelines', 'restrictions'),
+        ('city', 'country', 'address'),
+    ),
+    ('contracts', 'solocontract'): (
+        ('title', 'description', 'guidelines', 'restrictions'),
+        ('city', 'country', 'address'),
+    ),
+}
+
+
+def join(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def backfill_search_documents(apps, schema_editor, batch_size=1000):
+    """Index the objects existing before the search app, later ones are indexed by the model signals."""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    db_alias = schema_editor.connection.alias
+
+    for (app_label, model_name), (fields, location_fields) in DOCUMENTS.items():
+        model = apps.get_model(app_label, model_name)
+        content_type, _ = ContentType.objects.using(db_alias).get_or_create(app_label=app_label, model=model_name)
+        SearchDocument.objects.using(db_alias).filter(content_type=content_type).delete()
+        count, batch = len(fields), []
+        queryset = model._base_manager.using(db_alias).values_list('pk', *fields, *location_fields)
+        for pk, *values in queryset.iterator():
+            batch.append(SearchDocument(
+                content_type=content_type,
+                object_id=pk,
+                text=join(values[:count]),
+                location=join(values[count:])
+            ))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.using(db_alias).bulk_create(batch)
+                batch = []
+        SearchDocument.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_searchdocument_location'),
+        ('accounts', '0004_user_date_joined_index'),
+        ('profiles', '0016_profile_followers_count_profile_following_count'),
+        ('contracts', '0007_contractfeeditem'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
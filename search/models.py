@@ -0,0 +1,30 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.fields import GenericForeignKey
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of an indexed model instance.
+
+    The full text index itself is maintained by the database: an FTS5 table kept in sync by triggers on SQLite, and
+    expression indexes on PostgreSQL, see the migrations.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, verbose_name=_('Content Type'))
+    object_id = models.PositiveBigIntegerField(verbose_name=_('Object ID'))
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+    text = models.TextField(blank=True, default='', verbose_name=_('Text'))
+    location = models.TextField(blank=True, default='', verbose_name=_('Location'))
+
+    # Manipulation Attributes
+    update_at = models.DateTimeField(auto_now=True, verbose_name=_('Update Date'))
+
+    class Meta:
+        verbose_name = _('Search Document')
+        verbose_name_plural = _('Search Documents')
+        unique_together = ('content_type', 'object_id')
+
+    def __str__(self):
+        return f'{self.content_type} #{self.object_id}'
@@ -0,0 +1,199 @@
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.enums import RoleChoices
+from profiles.models import Profile
+from contracts.models import Contract, ContractRequest, SoloContract
+from contracts.api.filters import ContractFilter, ContractRequestFilter
+from .documents import search_index
+from .backends import LikeSearchBackend, SQLiteSearchBackend, get_search_backend
+
+
+class SearchTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna = cls.create_profile('anna', 'Anna', 'Smith', 'Dancer')
+        cls.annie = cls.create_profile('annie', 'Annie', 'Jones',
+                                       'Singer, actress & occasional dancer for the local theater company')
+        cls.bob = cls.create_profile('bob', 'Bob', 'Brown', 'Photographer')
+
+    @staticmethod
+    def create_profile(username, first_name, last_name, bio):
+        user = User.objects.create_user(username, f'{username}@example.com', 'password', first_name=first_name,
+                                        last_name=last_name, role=RoleChoices.MODEL)
+        Profile.objects.filter(user=user).update(bio=bio)
+        # Bulk updates send no signals, the documents are rebuilt by hand like after a data migration
+        search_index.update(Profile, [user.profile.pk])
+        return user.profile
+
+    def search(self, query):
+        return list(search_index.search(Profile.objects.all(), query))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 is served on SQLite')
+class SQLiteSearchBackendTests(SearchTestCase):
+
+    def test_backend(self):
+        self.assertIsInstance(get_search_backend(), SQLiteSearchBackend)
+
+    def test_prefix_match(self):
+        self.assertEqual(set(self.search('ann')), {self.anna, self.annie})
+        self.assertEqual(self.search('ann smi'), [self.anna])
+
+    def test_infix_not_matched(self):
+        self.assertEqual(self.search('nna'), [])
+
+    def test_keywords_matched_as_words(self):
+        self.assertEqual(self.search('bob OR anna'), [])
+
+    def test_ranking(self):
+        # Shorter documents matching the token rank higher by BM25
+        results = self.search('dancer')
+        self.assertEqual(results, [self.anna, self.annie])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_related_save(self):
+        self.bob.user.first_name = 'Robert'
+        self.bob.user.save()
+        self.assertEqual(self.search('robert'), [self.bob])
+
+    def test_delete(self):
+        self.bob.delete()
+        self.assertEqual(self.search('bob'), [])
+
+    def test_rebuild(self):
+        self.assertEqual(search_index.rebuild(Profile), 3)
+        self.assertEqual(set(self.search('ann')), {self.anna, self.annie})
+
+
+@override_settings(SEARCH_BACKEND='search.backends.LikeSearchBackend')
+class LikeSearchBackendTests(SearchTestCase):
+
+    def test_backend(self):
+        self.assertIsInstance(get_search_backend(), LikeSearchBackend)
+
+    def test_substring_match(self):
+        self.assertEqual(set(self.search('nn')), {self.anna, self.annie})
+        self.assertEqual(self.search('nna smi'), [self.anna])
+
+    def test_unranked(self):
+        results = self.search('dancer')
+        self.assertEqual(set(results), {self.anna, self.annie})
+        self.assertEqual({profile.search_rank for profile in results}, {0.0})
+
+    def test_empty_query(self):
+        self.assertEqual(self.search(''), [])
+
+
+class ContractSearchTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        director = User.objects.create_user('director', 'director@example.com', 'password',
+                                            role=RoleChoices.DIRECTOR)
+        cls.runway = cls.create_contract(director.agency, 'Runway show', city='Paris', country='France')
+        cls.catalog = cls.create_contract(director.agency, 'Summer catalog',
+                                          description='Shooting of the runway collection for the catalog',
+                                          city='Lyon', country='France')
+        cls.billboard = cls.create_contract(director.agency, 'Billboard', description='Paris metro campaign',
+                                            city='London', country='United Kingdom')
+        model = User.objects.create_user('model', 'model@example.com', 'password', role=RoleChoices.MODEL)
+        cls.solo = SoloContract.objects.create(profile=model.profile, agency=director.agency, title='Runway fitting',
+                                               money_offer=100, start_at=timezone.now() + timedelta(days=5))
+        cls.requests = {
+            contract: ContractRequest.objects.create(profile=model.profile, contract=contract)
+            for contract in (cls.runway, cls.catalog, cls.billboard)
+        }
+
+    @staticmethod
+    def create_contract(agency, title, **fields):
+        return Contract.objects.create(agency=agency, title=title, money_offer=100,
+                                       start_at=timezone.now() + timedelta(days=5), **fields)
+
+    def search(self, query=None, location=None):
+        return list(search_index.search(Contract.objects.all(), query, location))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 is served on SQLite')
+class SQLiteContractSearchTests(ContractSearchTestCase):
+
+    def test_prefix_match(self):
+        self.assertEqual(set(self.search('run')), {self.runway, self.catalog})
+        self.assertEqual(self.search('runway sho'), [self.runway, self.catalog])
+
+    def test_ranking(self):
+        # Shorter documents matching the token rank higher by BM25
+        results = self.search('runway')
+        self.assertEqual(results, [self.runway, self.catalog])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_location(self):
+        # Locations are matched against the location fields only, not the text mentioning them
+        self.assertEqual(self.search(location='paris'), [self.runway])
+        self.assertEqual(set(self.search(location='france')), {self.runway, self.catalog})
+        self.assertEqual(self.search('paris'), [self.billboard])
+
+    def test_text_and_location(self):
+        self.assertEqual(self.search('runway', 'lyon'), [self.catalog])
+        self.assertEqual(self.search('billboard', 'france'), [])
+
+    def test_models_indexed_apart(self):
+        self.assertEqual(list(search_index.search(SoloContract.objects.all(), 'runway')), [self.solo])
+
+    def test_save(self):
+        self.billboard.title = 'Runway billboard'
+        self.billboard.city = 'Paris'
+        self.billboard.save()
+        self.assertIn(self.billboard, self.search('runway'))
+        self.assertEqual(set(self.search(location='paris')), {self.runway, self.billboard})
+
+    def test_save_update_fields(self):
+        self.catalog.title = 'Winter catalog'
+        self.catalog.save(update_fields=['title'])
+        self.assertEqual(self.search('winter'), [self.catalog])
+        self.assertEqual(self.search('summer'), [])
+
+    def test_delete(self):
+        self.runway.delete()
+        self.assertEqual(self.search('runway'), [self.catalog])
+        self.assertEqual(self.search(location='paris'), [])
+
+    def test_search_filter(self):
+        queryset = Contract.objects.all()
+        self.assertEqual(list(ContractFilter({'search': 'runway'}, queryset).qs), [self.runway, self.catalog])
+        self.assertEqual(list(ContractFilter({'location': 'paris'}, queryset).qs), [self.runway])
+        self.assertEqual(list(ContractFilter({'search': 'runway', 'location': 'lyon'}, queryset).qs), [self.catalog])
+
+    def test_request_filter(self):
+        # Requests are searched by the documents of their contract
+        queryset = ContractRequest.objects.all()
+        self.assertEqual(
+            list(ContractRequestFilter({'search': 'runway'}, queryset).qs),
+            [self.requests[self.runway], self.requests[self.catalog]]
+        )
+        self.assertEqual(
+            list(ContractRequestFilter({'location': 'london'}, queryset).qs), [self.requests[self.billboard]]
+        )
+        self.assertEqual(list(ContractRequestFilter({}, queryset).qs.order_by('pk')), list(queryset.order_by('pk')))
+
+
+@override_settings(SEARCH_BACKEND='search.backends.LikeSearchBackend')
+class LikeContractSearchTests(ContractSearchTestCase):
+
+    def test_substring_match(self):
+        self.assertEqual(set(self.search('unwa')), {self.runway, self.catalog})
+        self.assertEqual(self.search(location='ondo'), [self.billboard])
+        self.assertEqual(self.search('unwa', 'yon'), [self.catalog])
+
+    def test_request_filter(self):
+        queryset = ContractRequest.objects.all()
+        self.assertEqual(
+            set(ContractRequestFilter({'search': 'runway'}, queryset).qs),
+            {self.requests[self.runway], self.requests[self.catalog]}
+        )
@@ -24,16 +24,12 @@ function createChartContainer(chartID, title){
     return parent;
 }
 
-function createChart(ctx, type, title, labels, data){
+function createChart(ctx, type, labels, datasets){
     var chart = new Chart(ctx, {
         type: type,
         data: {
             labels: labels,
-            datasets: [{
-                label: title,
-                data: data,
-                borderWidth: 1
-            }]
+            datasets: datasets.map(dataset => ({...dataset, borderWidth: 1}))
         },
         options: {
             scales: {
@@ -67,38 +63,60 @@ async function callAPI(url, token){
     }
 }
 
-async function displayChartContainer(url, token, parent, label, value, id, title, type){
-    const data = await callAPI(url, token);
-
+function displayChartContainer(series, parent, label, value, id, title, type, group){
     var ctx = createChartContainer(id, title);
     parent.append(ctx);
 
-    createChart(
-        ctx.querySelector('canvas'),
-        type,
-        title,
-        data.results.map(item => item[label]),
-        data.results.map(item => item[value])
-    );
+    // Dated series are returned from the latest to the earliest, they are charted chronologically
+    var rows = label === 'date' ? [...series].reverse() : series;
+    var labels = [...new Set(rows.map(item => item[label]))];
+
+    // Grouped series, like the sums of each currency, are charted as a dataset per group
+    var datasets = [{label: title, data: rows.map(item => item[value])}];
+    if (group !== undefined) {
+        datasets = [...new Set(rows.map(item => item[group]))].map(name => ({
+            label: `${title} (${name})`,
+            data: labels.map(key => {
+                var row = rows.find(item => item[label] === key && item[group] === name);
+                return row === undefined ? 0 : row[value];
+            })
+        }));
+    }
+
+    createChart(ctx.querySelector('canvas'), type, labels, datasets);
+}
+
+function lastDaysRange(days){
+    // Start of the first day of the range, in UTC like the server time zone
+    var since = new Date();
+    since.setUTCHours(0, 0, 0, 0);
+    since.setUTCDate(since.getUTCDate() - days + 1);
+    return `from=${since.toISOString()}`;
 }
 
 window.onload = async () => {
     const parent = document.querySelector('.card-body > .row');
     const token = JSON.parse(document.getElementById('token').textContent);
 
-    await displayChartContainer('/api/stats/users/daily-count/', token, parent, 'date', 'count', 1, 'Registered User Daily Count', 'line');
-    await displayChartContainer('/api/stats/users/role-count/', token, parent, 'label', 'count', 2, 'Registered User Role Percentage', 'pie');
+    // All the series are fetched at once
+    const stats = await callAPI(`/api/stats/dashboard/?${lastDaysRange(30)}`, token);
+    if (stats === undefined) {
+        return;
+    }
+
+    displayChartContainer(stats.users.daily_count, parent, 'date', 'count', 1, 'Registered User Daily Count', 'line');
+    displayChartContainer(stats.users.role_count, parent, 'label', 'count', 2, 'Registered User Role Percentage', 'pie');
 
-    await displayChartContainer('/api/stats/reports/daily-count/', token, parent, 'date', 'count', 3, 'Reports Daily Count', 'line');
-    await displayChartContainer('/api/stats/reports/type-count/', token, parent, 'label', 'count', 4, 'Reports Type Percentage', 'pie');
+    displayChartContainer(stats.reports.daily_count, parent, 'date', 'count', 3, 'Reports Daily Count', 'line');
+    displayChartContainer(stats.reports.type_count, parent, 'label', 'count', 4, 'Reports Type Percentage', 'pie');
 
-    await displayChartContainer('/api/stats/rates/daily-count/', token, parent, 'date', 'count', 5, 'Rates Daily Count', 'line');
-    await displayChartContainer('/api/stats/rates/daily-sum/', token, parent, 'date', 'sum', 6, 'Rates Daily Sum', 'line');
-    await displayChartContainer('/api/stats/rates/rate-count/', token, parent, 'label', 'count', 7, 'Rates Percentage', 'pie');
+    displayChartContainer(stats.rates.daily_count, parent, 'date', 'count', 5, 'Rates Daily Count', 'line');
+    displayChartContainer(stats.rates.daily_sum, parent, 'date', 'sum', 6, 'Rates Daily Sum', 'line');
+    displayChartContainer(stats.rates.rate_count, parent, 'label', 'count', 7, 'Rates Percentage', 'pie');
 
-    await displayChartContainer('/api/stats/contracts/daily-count/', token, parent, 'label', 'count', 8, 'Contracts Daily Count', 'line');
-    await displayChartContainer('/api/stats/contracts/offer-sum/', token, parent, 'date', 'sum', 9, 'Contracts Offer Sum', 'line');
+    displayChartContainer(stats.contracts.daily_count, parent, 'date', 'count', 8, 'Contracts Daily Count', 'line');
+    displayChartContainer(stats.contracts.offer_sum, parent, 'date', 'sum', 9, 'Contracts Offer Sum', 'line', 'currency');
 
-    await displayChartContainer('/api/stats/solo-contracts/daily-count/', token, parent, 'label', 'count', 8, 'Solo Contracts Daily Count', 'line');
-    await displayChartContainer('/api/stats/solo-contracts/offer-sum/', token, parent, 'date', 'sum', 9, 'Solo Contracts Offer Sum', 'line');
+    displayChartContainer(stats.solo_contracts.daily_count, parent, 'date', 'count', 10, 'Solo Contracts Daily Count', 'line');
+    displayChartContainer(stats.solo_contracts.offer_sum, parent, 'date', 'sum', 11, 'Solo Contracts Offer Sum', 'line', 'currency');
 }
@@ -1,13 +1,39 @@
+from datetime import time
+
+from django.utils.timezone import localdate, localtime
+
 from django_filters import rest_framework as filters
 
 from reviews.models import Rate
 from reports.models import Report
 from accounts.models import User
 from accounts.enums import RoleChoices
-from contracts.models import Contract, SoloContract
-
-
-class UserStatsFilter(filters.FilterSet):
+from contracts.models import Contract, SoloContract, ContractRequest
+from stats.models import (UserDailyRollup, ReportDailyRollup, RateDailyRollup, ContractDailyRollup,
+                          SoloContractDailyRollup, UniqueDailyRollup, RetentionDailyRollup)
+
+
+class DateRangeStatsFilter(filters.FilterSet):
+    """
+    Filter the objects by the `from` & `to` datetimes, the latter excluded, compared with their date field as is, so
+    that its index is used.
+    """
+    date_range_field_name = 'create_at'
+    date_range_filter_class = filters.IsoDateTimeFilter
+
+    @classmethod
+    def get_filters(cls):
+        declared_filters = super().get_filters()
+        # `from` is a reserved word, so the range filters can't be declared as class attributes
+        declared_filters['from'] = cls.date_range_filter_class(field_name=cls.date_range_field_name,
+                                                               lookup_expr='gte', label='From')
+        declared_filters['to'] = cls.date_range_filter_class(field_name=cls.date_range_field_name,
+                                                             lookup_expr='lt', label='To (excluded)')
+        return declared_filters
+
+
+class UserStatsFilter(DateRangeStatsFilter):
+    date_range_field_name = 'date_joined'
     role = filters.ChoiceFilter(choices=RoleChoices.exclude_admin())
     date_joined = filters.NumberFilter(field_name='date_joined', lookup_expr='day')
     date_joined_day__gt = filters.NumberFilter(field_name='date_joined', lookup_expr='day__gt')
@@ -18,7 +44,7 @@ class UserStatsFilter(filters.FilterSet):
         fields = ('date_joined', 'role')
 
 
-class BaeCreateAtStatsFilter(filters.FilterSet):
+class BaeCreateAtStatsFilter(DateRangeStatsFilter):
     create_at = filters.NumberFilter(field_name='create_at', lookup_expr='day')
     create_at_day__gt = filters.NumberFilter(field_name='create_at', lookup_expr='day__gt')
     create_at_day__lt = filters.NumberFilter(field_name='create_at', lookup_expr='day__lt')
@@ -58,3 +84,96 @@ class SoloContractStatsFilter(BaeCreateAtStatsFilter):
         fields = ('industry', 'title', 'description', 'guidelines', 'restrictions', 'money_offer_currency',
                   'money_offer', 'start_at', 'require_travel_inboard', 'require_travel_outboard', 'num_of_days',
                   'profile', 'agency', 'model_notes', 'status', 'create_at')
+
+
+class ContractRequestStatsFilter(BaeCreateAtStatsFilter):
+
+    class Meta:
+        model = ContractRequest
+        fields = ('contract', 'profile', 'status', 'create_at')
+
+
+class LocalDateFilter(filters.IsoDateTimeFilter):
+    """Filter the dates by the ones of the datetimes in the current timezone."""
+
+    def filter(self, qs, value):
+        return super().filter(qs, value and localdate(value))
+
+
+class DateRangeRollupStatsFilter(DateRangeStatsFilter):
+    date_range_field_name = 'date'
+    date_range_filter_class = LocalDateFilter
+
+    def is_exact(self) -> bool:
+        """Whether the daily rows cover the exact range, the one whose bounds are at the start of the days."""
+        if not self.is_valid():
+            # Invalid ranges are reported once filtered
+            return True
+        bounds = (self.form.cleaned_data.get('from'), self.form.cleaned_data.get('to'))
+        return all(bound is None or localtime(bound).time() == time.min for bound in bounds)
+
+
+class UserRollupStatsFilter(DateRangeRollupStatsFilter):
+    """Filter the daily rollup of the users by the same parameters as `UserStatsFilter`."""
+    role = filters.ChoiceFilter(choices=RoleChoices.exclude_admin())
+    date_joined = filters.NumberFilter(field_name='date', lookup_expr='day')
+    date_joined_day__gt = filters.NumberFilter(field_name='date', lookup_expr='day__gt')
+    date_joined_day__lt = filters.NumberFilter(field_name='date', lookup_expr='day__lt')
+
+    class Meta:
+        model = UserDailyRollup
+        fields = ('date_joined', 'role')
+
+
+class RetentionRollupStatsFilter(UserRollupStatsFilter):
+    """Filter the retention rollup of the users by their joining day & role, like `UserRollupStatsFilter`."""
+
+    class Meta:
+        model = RetentionDailyRollup
+        fields = ('date_joined', 'role')
+
+
+class BaseCreateAtRollupStatsFilter(DateRangeRollupStatsFilter):
+    """Filter the daily rollups by the same parameters as `BaeCreateAtStatsFilter`."""
+    create_at = filters.NumberFilter(field_name='date', lookup_expr='day')
+    create_at_day__gt = filters.NumberFilter(field_name='date', lookup_expr='day__gt')
+    create_at_day__lt = filters.NumberFilter(field_name='date', lookup_expr='day__lt')
+
+    class Meta:
+        fields = ('create_at', )
+
+
+class ReportRollupStatsFilter(BaseCreateAtRollupStatsFilter):
+
+    class Meta:
+        model = ReportDailyRollup
+        fields = ('is_active', 'type', 'create_at')
+
+
+class RateRollupStatsFilter(BaseCreateAtRollupStatsFilter):
+
+    class Meta:
+        model = RateDailyRollup
+        fields = ('is_active', 'create_at')
+
+
+class ContractRollupStatsFilter(BaseCreateAtRollupStatsFilter):
+
+    class Meta:
+        model = ContractDailyRollup
+        fields = ('industry', 'money_offer_currency', 'is_active', 'create_at')
+
+
+class SoloContractRollupStatsFilter(BaseCreateAtRollupStatsFilter):
+
+    class Meta:
+        model = SoloContractDailyRollup
+        fields = ('industry', 'money_offer_currency', 'status', 'create_at')
+
+
+class UniqueDailyRollupStatsFilter(DateRangeRollupStatsFilter):
+    """Filter the daily sketches of the distinct values by the `from` & `to` range only, see `UniqueStatsMixin`."""
+
+    class Meta:
+        model = UniqueDailyRollup
+        fields = ()
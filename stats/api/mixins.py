@@ -0,0 +1,399 @@
+import time
+from datetime import timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet, Sum
+from django.http import StreamingHttpResponse
+from django.utils.timezone import localdate
+
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django_filters.fields import IsoDateTimeField
+from django_filters.utils import translate_validation
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+from stats.cache import get_stats_cache_key, get_stats_version
+from stats.exchange import exchange_rates
+from stats.sketches import sketches
+from stats.retention import get_week_start
+from stats.utils import BUCKETS, truncate, truncate_value, fill_gaps, get_groups, iter_gaps
+from stats.api.filters import UniqueDailyRollupStatsFilter
+from stats.api.renderers import CSVRenderer, JSONLinesRenderer
+
+
+class BucketStatsMixin:
+    """
+    Group the dated stats actions by the `bucket` parameter, either of `BUCKETS` & defaulting to days, and fill the
+    buckets having no objects with zeros, throughout the `from` & `to` range if any.
+    """
+    # Dated actions, mapped to the aggregated field
+    bucket_actions: Dict[str, str] = {}
+    default_bucket = 'day'
+    # Whether the stats are streamed rather than listed, set by the exports
+    stream_stats = False
+
+    def get_bucket(self) -> str:
+        bucket = self.request.query_params.get('bucket') or self.default_bucket
+        if bucket not in BUCKETS:
+            raise ValidationError({'bucket': [f'Select a valid bucket, either of: {", ".join(BUCKETS)}.']})
+        return bucket
+
+    def truncate(self, field_name: str):
+        return truncate(field_name, self.get_bucket())
+
+    def get_bucket_range(self) -> Tuple[Optional[object], Optional[object]]:
+        """Get the first & the last buckets of the `from` & `to` range, the latter being excluded."""
+        bucket, field = self.get_bucket(), IsoDateTimeField(required=False)
+        start, end = (field.clean(self.request.query_params.get(name)) for name in ('from', 'to'))
+        return (
+            start and truncate_value(start, bucket),
+            end and truncate_value(end - timedelta(microseconds=1), bucket)
+        )
+
+    def get_bucket_dimensions(self) -> Tuple[str, ...]:
+        """Get the fields the rows of the dated action are grouped by along with their bucket."""
+        return ()
+
+    def fill_gaps(self, rows, aggregate: str, dimensions: Tuple[str, ...] = ()):
+        """
+        Fill the gaps of the dated rows into a list, or else into a generator along with `stream_stats`, out of the
+        rows ordered from the latest bucket, fetched in chunks when they are a queryset.
+        """
+        args = (self.get_bucket(), aggregate, *self.get_bucket_range())
+        if not self.stream_stats:
+            return fill_gaps(rows, *args, dimensions=dimensions)
+        if isinstance(rows, QuerySet):
+            rows = rows.order_by('-bucket')
+        chunk_size = settings.STATS_EXPORT_CHUNK_SIZE
+        iterate = (lambda: rows.iterator(chunk_size=chunk_size)) if isinstance(rows, QuerySet) else (lambda: rows)
+        # The groups of dimensions are gathered by a pass of their own, rather than by keeping the rows
+        return iter_gaps(iterate(), *args, dimensions=dimensions, groups=get_groups(iterate(), dimensions))
+
+    def get_stats(self):
+        """Get the aggregated rows of the action, filtered & gap filled."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action in self.bucket_actions:
+            return self.fill_gaps(queryset, self.bucket_actions[self.action], self.get_bucket_dimensions())
+        return queryset
+
+    def list_view(self, request, *args, **kwargs):
+        queryset = self.get_stats()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class RollupStatsMixin(BucketStatsMixin):
+    """
+    Serve the stats actions out of the daily rollup of the model, so that their cost scales with the number of days
+    rather than the number of objects. Requests filtered by fields other than the rollup dimensions, or bucketed by
+    hours, fall back to aggregating the objects themselves.
+    """
+    rollup_queryset = None
+    rollup_filterset_class = None
+    # Actions served by the rollup, mapped to the field they are grouped by & the aggregated one, `count` or `sum`,
+    # the dated actions are grouped by their `bucket`
+    rollup_actions: Dict[str, Tuple[str, str]] = {}
+    rollup_ignored_params = ('page', 'page_size', 'format', 'bucket', 'series', 'convert')
+
+    def is_rollup_request(self) -> bool:
+        if self.request is None or self.action not in self.rollup_actions:
+            return False
+        if self.action in self.bucket_actions and self.get_bucket() == 'hour':
+            return False
+        params = {name for name, value in self.request.query_params.items() if value != ''}
+        if not params - set(self.rollup_ignored_params) <= set(self.rollup_filterset_class.base_filters):
+            return False
+        # Ranges starting or ending within a day are only partly covered by its row
+        return self.rollup_filterset_class(self.request.query_params, request=self.request).is_exact()
+
+    def get_rollup_queryset(self):
+        group_by, aggregate = self.rollup_actions[self.action]
+        # Rows left empty by deleted or updated objects are skipped, rather than reported as zero counts
+        queryset = self.rollup_queryset.filter(total_count__gt=0)
+        if self.action in self.bucket_actions:
+            # Coarser buckets are summed out of the daily rows
+            queryset = queryset.annotate(bucket=self.truncate('date'))
+        return self.aggregate_rollup(queryset, group_by, aggregate).order_by(
+            f'-{group_by}' if group_by == 'bucket' else aggregate
+        )
+
+    def aggregate_rollup(self, queryset, group_by: str, aggregate: str):
+        return queryset.values(group_by).annotate(**{aggregate: Sum(f'total_{aggregate}')})
+
+    def filter_queryset(self, queryset):
+        if queryset.model is not self.rollup_queryset.model:
+            return super().filter_queryset(queryset)
+        filterset = self.rollup_filterset_class(self.request.query_params, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs
+
+
+class RetentionStatsMixin:
+    """
+    Serve the weekly cohorts retention of the users out of their retention rollup, the users who joined in each week
+    split by role, along with the ones of them active in each of the following `weeks` weeks.
+    """
+    # Rollups of the users joining & of their activity, filtered by their filtersets
+    cohort_queryset = None
+    cohort_filterset_class = None
+    retention_queryset = None
+    retention_filterset_class = None
+    default_retention_weeks = 12
+    max_retention_weeks = 52
+
+    def get_retention_weeks(self) -> int:
+        weeks = self.request.query_params.get('weeks') or self.default_retention_weeks
+        if not str(weeks).isdigit() or not 0 < int(weeks) <= self.max_retention_weeks:
+            raise ValidationError({'weeks': [f'Enter a number of weeks from 1 to {self.max_retention_weeks}.']})
+        return int(weeks)
+
+    def filter_rollup(self, queryset, filterset_class):
+        filterset = filterset_class(self.request.query_params, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs
+
+    def get_retention(self):
+        weeks, current_week = self.get_retention_weeks(), get_week_start(localdate())
+        sizes = self.filter_rollup(self.cohort_queryset, self.cohort_filterset_class).annotate(
+            cohort=truncate('date', 'week')
+        ).values('cohort', 'role').annotate(size=Sum('total_count')).order_by()
+        retained = self.filter_rollup(self.retention_queryset, self.retention_filterset_class).filter(
+            week__lt=weeks
+        ).annotate(
+            cohort=truncate('date', 'week')
+        ).values('cohort', 'role', 'week').annotate(count=Sum('total_count')).order_by()
+
+        cohorts = {
+            (row['cohort'], row['role']): {
+                **row,
+                'retention': [0 if row['cohort'] + timedelta(weeks=week) <= current_week else None
+                              for week in range(weeks)]
+            }
+            for row in sizes if row['size']
+        }
+        for row in retained:
+            cohort = cohorts.get((row['cohort'], row['role']))
+            if cohort is not None:
+                cohort['retention'][row['week']] = row['count']
+        # From the latest cohort to the earliest
+        return sorted(cohorts.values(), key=lambda cohort: (-cohort['cohort'].toordinal(), cohort['role'] or 0))
+
+    def get_stats(self):
+        if self.action == 'retention':
+            return self.get_retention()
+        return super().get_stats()
+
+
+class UniqueStatsMixin:
+    """
+    Serve the distinct counts of the actions out of the daily HyperLogLog sketches, merged into their buckets, so that
+    their cost scales with the number of days. Requests filtered by other than the `from` & `to` range of whole days,
+    or bucketed by hours, fall back to the exact distinct counts of the objects themselves.
+    """
+    # Actions served by the sketches, mapped to the names of the sketches
+    unique_actions: Dict[str, str] = {}
+    unique_ignored_params = ('page', 'page_size', 'format', 'bucket', 'series')
+
+    def is_sketch_request(self) -> bool:
+        if self.request is None or self.action not in self.unique_actions or self.get_bucket() == 'hour':
+            return False
+        params = {name for name, value in self.request.query_params.items() if value != ''}
+        if not params - set(self.unique_ignored_params) <= set(UniqueDailyRollupStatsFilter.base_filters):
+            return False
+        return UniqueDailyRollupStatsFilter(self.request.query_params, request=self.request).is_exact()
+
+    def get_stats(self):
+        if not self.is_sketch_request():
+            return super().get_stats()
+        sketch = sketches[self.unique_actions[self.action]]
+        filterset = UniqueDailyRollupStatsFilter(self.request.query_params, queryset=sketch.get_queryset(),
+                                                 request=self.request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        aggregate = self.bucket_actions[self.action]
+        # Counted from the earliest bucket, one row per bucket
+        return self.fill_gaps(sketch.count(filterset.qs, self.get_bucket(), aggregate)[::-1], aggregate)
+
+
+class MoneyStatsMixin:
+    """
+    Sum the money of the actions grouped by currency, or else converted to `DEFAULT_CURRENCY` by the `convert`
+    parameter. Amounts are converted by the in memory exchange rates within the aggregate query itself.
+    """
+    money_actions: Tuple[str, ...] = ()
+    money_currency_field = 'money_offer_currency'
+
+    def is_converted(self) -> bool:
+        return self.action in self.money_actions and \
+            self.request.query_params.get('convert') in serializers.BooleanField.TRUE_VALUES
+
+    def sum_money(self, queryset, amount_field: str, group_by: str = 'bucket', aggregate: str = 'sum'):
+        """Sum the amounts of the rows grouped by the field, and by their currency unless converted."""
+        if not self.is_converted():
+            return queryset.values(group_by, self.money_currency_field).annotate(**{aggregate: Sum(amount_field)})
+        missing = set(settings.CURRENCIES) - set(exchange_rates.get_rates())
+        if missing:
+            raise ValidationError({'convert': [
+                f'Exchange rates of {", ".join(sorted(missing))} to {settings.DEFAULT_CURRENCY} are missing.'
+            ]})
+        return queryset.values(group_by).annotate(
+            **{aggregate: Sum(exchange_rates.convert(amount_field, self.money_currency_field))}
+        )
+
+    def get_bucket_dimensions(self) -> Tuple[str, ...]:
+        if self.action in self.money_actions and not self.is_converted():
+            return (self.money_currency_field, )
+        return super().get_bucket_dimensions()
+
+    def aggregate_rollup(self, queryset, group_by: str, aggregate: str):
+        if self.action in self.money_actions:
+            return self.sum_money(queryset, f'total_{aggregate}', group_by, aggregate)
+        return super().aggregate_rollup(queryset, group_by, aggregate)
+
+
+class CachedStatsMixin:
+    """
+    Cache the stats of the actions, keyed by the action, the filter parameters & the bucket, and invalidated by
+    bumping the version of the model stats as its objects change, see `stats.cache`.
+
+    A single request aggregates the missing or stale stats, holding a lock, rather than every concurrent request
+    aggregating them again. With `STATS_CACHE_STALE_WHILE_REVALIDATE`, the others serve the stale entry meanwhile,
+    otherwise they wait for the fresh one.
+    """
+    cache_ignored_params = ('page', 'page_size', 'format', 'bucket', 'series')
+
+    def get_stats_cache_key(self) -> str:
+        params = [
+            (name, value)
+            for name, values in self.request.query_params.lists() if name not in self.cache_ignored_params
+            for value in values
+        ]
+        if self.action in self.bucket_actions:
+            params.append(('bucket', self.get_bucket()))
+        return get_stats_cache_key(f'{self.queryset.model._meta.label_lower}:{self.action}', params)
+
+    def get_stats(self):
+        # Streamed stats are left out of the cache, which would hold them whole
+        if not settings.STATS_CACHE_TIMEOUT or self.stream_stats:
+            return super().get_stats()
+
+        cache_key = self.get_stats_cache_key()
+        lock_key = f'{cache_key}:lock'
+        # Read before aggregating, so that changes made meanwhile leave the entry stale
+        version = get_stats_version(self.queryset.model)
+        entry = cache.get(cache_key)
+        if self.is_fresh_entry(entry, version):
+            return entry['stats']
+
+        # A single request aggregates the stats, while the others serve the stale entry or wait for the fresh one
+        if not cache.add(lock_key, True, timeout=settings.STATS_CACHE_LOCK_TIMEOUT):
+            if entry is not None and settings.STATS_CACHE_STALE_WHILE_REVALIDATE:
+                return entry['stats']
+            entry = self.wait_for_entry(cache_key, lock_key, version)
+            if entry is not None:
+                return entry['stats']
+            # The refreshing request failed or timed out, aggregate them along with no lock
+            return self.cache_stats(cache_key, version)
+
+        try:
+            return self.cache_stats(cache_key, version)
+        finally:
+            cache.delete(lock_key)
+
+    @staticmethod
+    def is_fresh_entry(entry: Optional[Dict], version: int) -> bool:
+        return entry is not None and entry['version'] == version and entry['fresh_until'] > time.time()
+
+    def wait_for_entry(self, cache_key: str, lock_key: str, version: int) -> Optional[Dict]:
+        """Wait for the request holding the lock to cache the fresh entry, until the lock is released or expires."""
+        while True:
+            time.sleep(settings.STATS_CACHE_LOCK_POLL_INTERVAL)
+            entry = cache.get(cache_key)
+            if self.is_fresh_entry(entry, version):
+                return entry
+            if cache.get(lock_key) is None:
+                return None
+
+    def cache_stats(self, cache_key: str, version: int):
+        stats = list(super().get_stats())
+        cache.set(
+            cache_key,
+            {'version': version, 'fresh_until': time.time() + settings.STATS_CACHE_TIMEOUT, 'stats': stats},
+            timeout=settings.STATS_CACHE_TIMEOUT + settings.STATS_CACHE_STALE_TIMEOUT
+        )
+        return stats
+
+
+class ExportStatsMixin:
+    """
+    Export the stats of either action named by the `series` parameter, or else the filtered objects themselves, as
+    CSV or JSON Lines by the `format` parameter. Rows are streamed as they are fetched in chunks, so that the memory
+    used doesn't grow with the number of rows.
+    """
+    # Fields of the objects exported along with no `series`
+    export_fields: Tuple[str, ...] = ('id', )
+    # Actions whose stats aren't rows, and so can't be exported
+    export_ignored_actions: Tuple[str, ...] = ('export', )
+
+    @property
+    def ordering_fields(self) -> Optional[Tuple[str, ...]]:
+        # The exported objects have no serializer, so the fields they are ordered by default to the exported ones
+        return self.export_fields if self.action == 'export' else None
+
+    def get_export_series(self) -> Dict[str, str]:
+        """Get the actions that can be exported, mapped by their URL paths."""
+        return {
+            extra_action.url_path: extra_action.__name__
+            for extra_action in self.get_extra_actions() if extra_action.__name__ not in self.export_ignored_actions
+        }
+
+    def get_export_rows(self, series: Optional[str]) -> Iterator[Dict]:
+        chunk_size = settings.STATS_EXPORT_CHUNK_SIZE
+        if series is None:
+            queryset = self.filter_queryset(self.get_queryset()).values(*self.export_fields)
+            return queryset.iterator(chunk_size=chunk_size)
+        # Aggregated & serialized like the action itself, though streamed
+        self.action, self.stream_stats = series, True
+        stats = self.get_stats()
+        if isinstance(stats, QuerySet):
+            stats = stats.iterator(chunk_size=chunk_size)
+        return map(self.get_serializer().to_representation, stats)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('series', str, description='URL path of the action whose stats are exported, EG.: '
+                                                        'daily-count, otherwise the objects are exported'),
+            OpenApiParameter('format', str, enum=('csv', 'jsonl'), default='csv'),
+            OpenApiParameter('bucket', str, enum=BUCKETS, default='day',
+                             description='Granularity the objects of dated series are grouped by'),
+        ],
+        responses={(200, CSVRenderer.media_type): OpenApiTypes.STR,
+                   (200, JSONLinesRenderer.media_type): OpenApiTypes.STR}
+    )
+    @action(["GET"], detail=False, renderer_classes=[CSVRenderer, JSONLinesRenderer])
+    def export(self, request, *args, **kwargs):
+        series = request.query_params.get('series') or None
+        export_series = self.get_export_series()
+        if series is not None and series not in export_series:
+            raise ValidationError({'series': [f'Select a valid series, either of: {", ".join(export_series)}.']})
+
+        renderer = request.accepted_renderer
+        rows = self.get_export_rows(series and export_series[series])
+        response = StreamingHttpResponse(renderer.stream(rows),
+                                         content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}-{series or "objects"}.' \
+                                          f'{renderer.format}"'
+        return response
@@ -0,0 +1,63 @@
+import csv
+import json
+from datetime import date
+from typing import Dict, Iterable, Iterator
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class EchoBuffer:
+    """File-like object returning the written values, so that the CSV lines are yielded rather than buffered."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class StreamingRenderer(BaseRenderer):
+    """Render the rows one at a time, so that they can be streamed as they are fetched."""
+    charset = 'utf-8'
+
+    def stream(self, rows: Iterable[Dict]) -> Iterator[bytes]:
+        raise NotImplementedError('Renderer class requires .stream() to be implemented')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Responses which aren't streamed, like the errors ones, are rendered as a single row
+        if data is None:
+            return b''
+        return b''.join(self.stream(data if isinstance(data, list) else [data]))
+
+
+class CSVRenderer(StreamingRenderer):
+    """Render the rows as CSV, headed by the fields of the first row."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    @staticmethod
+    def get_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, (list, tuple)):
+            # EG.: the messages of the errors
+            return ' '.join(map(str, value))
+        return value
+
+    def stream(self, rows: Iterable[Dict]) -> Iterator[bytes]:
+        writer, fields = csv.writer(EchoBuffer()), None
+        for row in rows:
+            if fields is None:
+                fields = list(row)
+                yield writer.writerow(fields).encode(self.charset)
+            yield writer.writerow([self.get_value(row.get(field)) for field in fields]).encode(self.charset)
+
+
+class JSONLinesRenderer(StreamingRenderer):
+    """Render the rows as JSON Lines, an object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+    def stream(self, rows: Iterable[Dict]) -> Iterator[bytes]:
+        for row in rows:
+            yield (json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n').encode(self.charset)
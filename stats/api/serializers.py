@@ -1,10 +1,15 @@
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib.auth.backends import get_user_model
 
 from rest_framework import serializers
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 
 from reviews.models import Rate
 from reports.models import Report
-from contracts.models import Contract, SoloContract
+from contracts.models import Contract, SoloContract, ContractRequest
 from reports.enums import get_type_label_from_value
 from accounts.enums import get_role_label_from_value
 
@@ -12,14 +17,32 @@ from accounts.enums import get_role_label_from_value
 User = get_user_model()
 
 
+@extend_schema_field(OpenApiTypes.STR)
+class BucketField(serializers.Field):
+    """Start of the bucket the objects are grouped by, a datetime for hourly buckets or else a date."""
+
+    def to_representation(self, value):
+        if isinstance(value, datetime):
+            return serializers.DateTimeField().to_representation(value)
+        return serializers.DateField().to_representation(value)
+
+
 class BaseDateCountStatsSerializer(serializers.ModelSerializer):
-    date = serializers.DateField()
+    date = BucketField(read_only=True)
     count = serializers.IntegerField()
 
     class Meta:
         fields = ('date', 'count')
 
 
+class BaseDateUniqueStatsSerializer(BaseDateCountStatsSerializer):
+    unique = serializers.IntegerField()
+    count = None
+
+    class Meta:
+        fields = ('date', 'unique')
+
+
 class BaseLabelCountStatsSerializer(serializers.ModelSerializer):
     count = serializers.IntegerField()
     label = serializers.CharField()
@@ -46,6 +69,20 @@ class RoleCountUserStatsSerializer(BaseLabelCountStatsSerializer):
         return representation
 
 
+class RetentionUserStatsSerializer(serializers.Serializer):
+    cohort = serializers.DateField(help_text='Start of the week the users joined in')
+    label = serializers.CharField(source='role')
+    size = serializers.IntegerField(help_text='Users who joined')
+    retention = serializers.ListField(child=serializers.IntegerField(allow_null=True),
+                                      help_text='Users active in each week since the joining one, null for the weeks '
+                                                'yet to come')
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation['label'] = get_role_label_from_value(int(representation['label']))
+        return representation
+
+
 class DateCountReportStatsSerializer(BaseDateCountStatsSerializer):
 
     class Meta(BaseDateCountStatsSerializer.Meta):
@@ -64,6 +101,12 @@ class TypeCountReportStatsSerializer(BaseLabelCountStatsSerializer):
         return representation
 
 
+class DateUniqueReportStatsSerializer(BaseDateUniqueStatsSerializer):
+
+    class Meta(BaseDateUniqueStatsSerializer.Meta):
+        model = Report
+
+
 class DateCountRateStatsSerializer(BaseDateCountStatsSerializer):
 
     class Meta(BaseDateCountStatsSerializer.Meta):
@@ -86,6 +129,12 @@ class DateSumRateStatsSerializer(BaseDateCountStatsSerializer):
         fields = ('date', 'sum')
 
 
+class DateUniqueRateStatsSerializer(BaseDateUniqueStatsSerializer):
+
+    class Meta(BaseDateUniqueStatsSerializer.Meta):
+        model = Rate
+
+
 class DateCountContractStatsSerializer(BaseDateCountStatsSerializer):
 
     class Meta(BaseDateCountStatsSerializer.Meta):
@@ -93,12 +142,14 @@ class DateCountContractStatsSerializer(BaseDateCountStatsSerializer):
 
 
 class DateSumContractStatsSerializer(BaseDateCountStatsSerializer):
+    # Converted sums aren't grouped by currency, and are of the default one
+    currency = serializers.CharField(source='money_offer_currency', default=settings.DEFAULT_CURRENCY)
     sum = serializers.IntegerField()
     count = None
 
     class Meta:
         model = Contract
-        fields = ('date', 'sum')
+        fields = ('date', 'currency', 'sum')
 
 
 class DateCountSoloContractStatsSerializer(BaseDateCountStatsSerializer):
@@ -108,9 +159,71 @@ class DateCountSoloContractStatsSerializer(BaseDateCountStatsSerializer):
 
 
 class DateSumSoloContractStatsSerializer(BaseDateCountStatsSerializer):
+    # Converted sums aren't grouped by currency, and are of the default one
+    currency = serializers.CharField(source='money_offer_currency', default=settings.DEFAULT_CURRENCY)
     sum = serializers.IntegerField()
     count = None
 
     class Meta:
         model = SoloContract
-        fields = ('date', 'sum')
+        fields = ('date', 'currency', 'sum')
+
+
+class DateUniqueContractRequestStatsSerializer(BaseDateUniqueStatsSerializer):
+
+    class Meta(BaseDateUniqueStatsSerializer.Meta):
+        model = ContractRequest
+
+
+class PercentilesStatsSerializer(serializers.Serializer):
+    p50 = serializers.FloatField(allow_null=True, help_text='Seconds')
+    p90 = serializers.FloatField(allow_null=True, help_text='Seconds')
+    p95 = serializers.FloatField(allow_null=True, help_text='Seconds')
+
+
+class FunnelContractStatsSerializer(serializers.Serializer):
+    posted = serializers.IntegerField(help_text='Contracts posted')
+    requested = serializers.IntegerField(help_text='Contracts having requests')
+    accepted = serializers.IntegerField(help_text='Contracts having accepted requests')
+    rated = serializers.IntegerField(help_text='Contracts having rated requests')
+    request_conversion = serializers.FloatField(allow_null=True, help_text='Requested out of the posted contracts')
+    accept_conversion = serializers.FloatField(allow_null=True, help_text='Accepted out of the requested contracts')
+    rate_conversion = serializers.FloatField(allow_null=True, help_text='Rated out of the accepted contracts')
+    requests = serializers.DictField(child=serializers.IntegerField(), help_text='Requests count of each status')
+    time_to_first_request = PercentilesStatsSerializer(help_text='From posting the contracts to their first requests')
+    time_to_accept = PercentilesStatsSerializer(help_text='From posting the contracts to their first acceptances')
+
+
+class UserDashboardStatsSerializer(serializers.Serializer):
+    daily_count = DateCountUserStatsSerializer(many=True)
+    role_count = RoleCountUserStatsSerializer(many=True)
+
+
+class ReportDashboardStatsSerializer(serializers.Serializer):
+    daily_count = DateCountReportStatsSerializer(many=True)
+    type_count = TypeCountReportStatsSerializer(many=True)
+
+
+class RateDashboardStatsSerializer(serializers.Serializer):
+    daily_count = DateCountRateStatsSerializer(many=True)
+    daily_sum = DateSumRateStatsSerializer(many=True)
+    rate_count = RateCountRateStatsSerializer(many=True)
+
+
+class ContractDashboardStatsSerializer(serializers.Serializer):
+    daily_count = DateCountContractStatsSerializer(many=True)
+    offer_sum = DateSumContractStatsSerializer(many=True)
+
+
+class SoloContractDashboardStatsSerializer(serializers.Serializer):
+    daily_count = DateCountSoloContractStatsSerializer(many=True)
+    offer_sum = DateSumSoloContractStatsSerializer(many=True)
+
+
+class DashboardStatsSerializer(serializers.Serializer):
+    """Describe the dashboard series, which are serialized by the ones of their stats viewsets."""
+    users = UserDashboardStatsSerializer()
+    reports = ReportDashboardStatsSerializer()
+    rates = RateDashboardStatsSerializer()
+    contracts = ContractDashboardStatsSerializer()
+    solo_contracts = SoloContractDashboardStatsSerializer()
@@ -3,7 +3,7 @@ from django.urls import path, include
 from rest_framework import routers
 
 from .views import (UserStatsViewSet, ReportStatsViewSet, RateStatsViewSet, ContractStatsViewSet,
-                    SoloContractStatsViewSet)
+                    SoloContractStatsViewSet, ContractRequestStatsViewSet, DashboardStatsViewSet)
 
 
 app_name = 'stats'
@@ -14,6 +14,8 @@ router.register('reports', ReportStatsViewSet, basename='reports')
 router.register('rates', RateStatsViewSet, basename='rates')
 router.register('contracts', ContractStatsViewSet, basename='contracts')
 router.register('solo-contracts', SoloContractStatsViewSet, basename='solo_contracts')
+router.register('contract-requests', ContractRequestStatsViewSet, basename='contract_requests')
+router.register('dashboard', DashboardStatsViewSet, basename='dashboard')
 
 urlpatterns = [
     path('stats/', include(router.urls), name='users'),
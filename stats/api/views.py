@@ -1,57 +1,99 @@
-from django.db.models import Count, Sum
-from django.db.models.functions import TruncDate
+from collections import defaultdict
+from typing import Dict
+
+from django.db.models import Count, F, Min, Q, Sum
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.backends import get_user_model
 
 from rest_framework.decorators import action
-from rest_framework.mixins import ListModelMixin
 from rest_framework.viewsets import GenericViewSet
+from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 from reviews.models import Rate
 from reports.models import Report
-from contracts.models import Contract, SoloContract
+from accounts.enums import RoleChoices
+from contracts.enums import StatusChoices
+from contracts.models import Contract, SoloContract, ContractRequest
+from stats.models import (UserDailyRollup, ReportDailyRollup, RateDailyRollup, ContractDailyRollup,
+                          SoloContractDailyRollup, RetentionDailyRollup)
+from stats.utils import BUCKETS, get_percentiles
+from stats.sketches import HyperLogLog
+from .mixins import (BucketStatsMixin, CachedStatsMixin, RollupStatsMixin, ExportStatsMixin, MoneyStatsMixin,
+                     UniqueStatsMixin, RetentionStatsMixin)
 from .pagination import StatsPageNumberPagination
-from .filters import (UserStatsFilter, ReportStatsFilter, RateStatsFilter, ContractStatsFilter, SoloContractStatsFilter)
+from .filters import (UserStatsFilter, ReportStatsFilter, RateStatsFilter, ContractStatsFilter, SoloContractStatsFilter,
+                      UserRollupStatsFilter, ReportRollupStatsFilter, RateRollupStatsFilter, ContractRollupStatsFilter,
+                      SoloContractRollupStatsFilter, ContractRequestStatsFilter, RetentionRollupStatsFilter)
 from .serializers import (DateCountUserStatsSerializer, RoleCountUserStatsSerializer, DateCountReportStatsSerializer,
                           TypeCountReportStatsSerializer, DateCountRateStatsSerializer, RateCountRateStatsSerializer,
                           DateSumRateStatsSerializer, DateCountContractStatsSerializer, DateSumContractStatsSerializer,
-                          DateCountSoloContractStatsSerializer, DateSumSoloContractStatsSerializer)
+                          DateCountSoloContractStatsSerializer, DateSumSoloContractStatsSerializer,
+                          DateUniqueReportStatsSerializer, DateUniqueRateStatsSerializer,
+                          DateUniqueContractRequestStatsSerializer, FunnelContractStatsSerializer,
+                          RetentionUserStatsSerializer, DashboardStatsSerializer)
 
 
 User = get_user_model()
 
+BUCKET_PARAMETER = OpenApiParameter('bucket', str, enum=BUCKETS, default='day',
+                                    description='Granularity the objects are grouped by')
+CONVERT_PARAMETER = OpenApiParameter('convert', bool, default=False,
+                                     description='Convert the sums to the default currency, rather than grouping them '
+                                                 'by currency')
+UNIQUE_DESCRIPTION = f'Distinct counts are estimated within a standard error of ' \
+                     f'{HyperLogLog.get_standard_error():.1%}, unless filtered by other than a range of whole days ' \
+                     f'or bucketed by hours.'
+
 
-class UserStatsViewSet(GenericViewSet):
+class UserStatsViewSet(ExportStatsMixin, CachedStatsMixin, RetentionStatsMixin, RollupStatsMixin, GenericViewSet):
     queryset = User.objects.exclude_admin()
     filterset_class = UserStatsFilter
     permission_classes = [IsAdminUser]
     pagination_class = StatsPageNumberPagination
-    list_view = ListModelMixin.list
+    export_fields = ('id', 'role', 'is_active', 'date_joined')
+    bucket_actions = {'daily_count': 'count'}
+    rollup_queryset = UserDailyRollup.objects.filter(is_active=True).exclude(role=RoleChoices.ADMIN)
+    rollup_filterset_class = UserRollupStatsFilter
+    # Users deactivated since are still counted in the cohorts they were active in
+    cohort_queryset = UserDailyRollup.objects.exclude(role=RoleChoices.ADMIN)
+    cohort_filterset_class = UserRollupStatsFilter
+    retention_queryset = RetentionDailyRollup.objects.exclude(role=RoleChoices.ADMIN)
+    retention_filterset_class = RetentionRollupStatsFilter
+    rollup_actions = {
+        'daily_count': ('bucket', 'count'),
+        'role_count': ('role', 'count'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'daily_count':
             return DateCountUserStatsSerializer
         if self.action == 'role_count':
             return RoleCountUserStatsSerializer
+        if self.action == 'retention':
+            return RetentionUserStatsSerializer
         return super().get_serializer_class()
 
     def get_queryset(self):
+        if self.is_rollup_request():
+            return self.get_rollup_queryset()
         queryset = super().get_queryset()
         if self.action == 'daily_count':
             return queryset.annotate(
-                date=TruncDate('date_joined')
-            ).values('date').annotate(
+                bucket=self.truncate('date_joined')
+            ).values('bucket').annotate(
                 count=Count('id')
-            ).order_by('-date')
+            ).order_by('-bucket')
         if self.action == 'role_count':
             return queryset.values('role').annotate(
                 count=Count('id')
             ).order_by('count')
         return queryset
 
-    @extend_schema(responses={200: DateCountUserStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateCountUserStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-count')
     def daily_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
@@ -61,145 +103,273 @@ class UserStatsViewSet(GenericViewSet):
     def role_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
+    @extend_schema(parameters=[OpenApiParameter('weeks', int, default=RetentionStatsMixin.default_retention_weeks,
+                                                description='Number of weeks since joining the users retention is '
+                                                            'counted in')],
+                   description='Weekly cohorts of the users joined within the filters, split by role, and the users of '
+                               'them active, logged in, in each of the following weeks.',
+                   responses={200: RetentionUserStatsSerializer(many=True)})
+    @action(["GET"], detail=False)
+    def retention(self, request, *args, **kwargs):
+        return self.list_view(request, *args, **kwargs)
+
 
-class ReportStatsViewSet(GenericViewSet):
+class ReportStatsViewSet(ExportStatsMixin, CachedStatsMixin, UniqueStatsMixin, RollupStatsMixin, GenericViewSet):
     queryset = Report.objects.all()
     filterset_class = ReportStatsFilter
     permission_classes = [IsAdminUser]
     pagination_class = StatsPageNumberPagination
-    list_view = ListModelMixin.list
+    export_fields = ('id', 'user', 'type', 'is_active', 'create_at')
+    bucket_actions = {'daily_count': 'count', 'daily_unique': 'unique'}
+    unique_actions = {'daily_unique': 'reports.report.user'}
+    rollup_queryset = ReportDailyRollup.objects.all()
+    rollup_filterset_class = ReportRollupStatsFilter
+    rollup_actions = {
+        'daily_count': ('bucket', 'count'),
+        'type_count': ('type', 'count'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'daily_count':
             return DateCountReportStatsSerializer
+        if self.action == 'daily_unique':
+            return DateUniqueReportStatsSerializer
         if self.action == 'type_count':
             return TypeCountReportStatsSerializer
         return super().get_serializer_class()
 
     def get_queryset(self):
+        if self.is_rollup_request():
+            return self.get_rollup_queryset()
         queryset = super().get_queryset()
         if self.action == 'daily_count':
             return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
                 count=Count('id')
-            ).order_by('-date')
+            ).order_by('-bucket')
+        if self.action == 'daily_unique':
+            return queryset.annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
+                unique=Count('user', distinct=True)
+            ).order_by('-bucket')
         if self.action == 'type_count':
             return queryset.values('type').annotate(
                 count=Count('id')
             ).order_by('count')
         return queryset
 
-    @extend_schema(responses={200: DateCountReportStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateCountReportStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-count')
     def daily_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
+    @extend_schema(parameters=[BUCKET_PARAMETER], description=f'Distinct users reporting. {UNIQUE_DESCRIPTION}',
+                   responses={200: DateUniqueReportStatsSerializer(many=True)})
+    @action(["GET"], detail=False, url_path='daily-unique')
+    def daily_unique(self, request, *args, **kwargs):
+        return self.list_view(request, *args, **kwargs)
+
     @extend_schema(responses={200: TypeCountReportStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='type-count')
     def type_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
 
-class RateStatsViewSet(GenericViewSet):
+class RateStatsViewSet(ExportStatsMixin, CachedStatsMixin, UniqueStatsMixin, RollupStatsMixin, GenericViewSet):
     queryset = Rate.objects.all()
     filterset_class = RateStatsFilter
     permission_classes = [IsAdminUser]
     pagination_class = StatsPageNumberPagination
-    list_view = ListModelMixin.list
+    export_fields = ('id', 'agency', 'profile', 'rate', 'is_active', 'create_at')
+    bucket_actions = {'daily_count': 'count', 'daily_sum': 'sum', 'daily_unique': 'unique'}
+    unique_actions = {'daily_unique': 'reviews.rate.agency'}
+    rollup_queryset = RateDailyRollup.objects.all()
+    rollup_filterset_class = RateRollupStatsFilter
+    rollup_actions = {
+        'daily_count': ('bucket', 'count'),
+        'daily_sum': ('bucket', 'sum'),
+        'rate_count': ('rate', 'count'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'daily_count':
             return DateCountRateStatsSerializer
         if self.action == 'daily_sum':
             return DateSumRateStatsSerializer
+        if self.action == 'daily_unique':
+            return DateUniqueRateStatsSerializer
         if self.action == 'rate_count':
             return RateCountRateStatsSerializer
         return super().get_serializer_class()
 
     def get_queryset(self):
+        if self.is_rollup_request():
+            return self.get_rollup_queryset()
         queryset = super().get_queryset()
         if self.action == 'daily_count':
             return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
                 count=Count('id')
-            ).order_by('-date')
+            ).order_by('-bucket')
         if self.action == 'daily_sum':
             return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
                 sum=Sum('rate')
-            ).order_by('-date')
+            ).order_by('-bucket')
+        if self.action == 'daily_unique':
+            return queryset.annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
+                unique=Count('agency', distinct=True)
+            ).order_by('-bucket')
         if self.action == 'rate_count':
             return queryset.values('rate').annotate(
                 count=Count('id')
             ).order_by('count')
         return queryset
 
-    @extend_schema(responses={200: DateCountRateStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateCountRateStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-count')
     def daily_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
-    @extend_schema(responses={200: DateSumRateStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateSumRateStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-sum')
     def daily_sum(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
+    @extend_schema(parameters=[BUCKET_PARAMETER], description=f'Distinct agencies rating. {UNIQUE_DESCRIPTION}',
+                   responses={200: DateUniqueRateStatsSerializer(many=True)})
+    @action(["GET"], detail=False, url_path='daily-unique')
+    def daily_unique(self, request, *args, **kwargs):
+        return self.list_view(request, *args, **kwargs)
+
     @extend_schema(responses={200: RateCountRateStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='rate-count')
     def rate_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
 
-class ContractStatsViewSet(GenericViewSet):
+class ContractStatsViewSet(ExportStatsMixin, CachedStatsMixin, MoneyStatsMixin, RollupStatsMixin, GenericViewSet):
     queryset = Contract.objects.all()
     filterset_class = ContractStatsFilter
     permission_classes = [IsAdminUser]
     pagination_class = StatsPageNumberPagination
-    list_view = ListModelMixin.list
+    export_fields = ('id', 'agency', 'industry', 'money_offer', 'money_offer_currency', 'start_at', 'is_active',
+                     'create_at')
+    export_ignored_actions = ('export', 'funnel')
+    bucket_actions = {'daily_count': 'count', 'offer_sum': 'sum'}
+    money_actions = ('offer_sum', )
+    rollup_queryset = ContractDailyRollup.objects.all()
+    rollup_filterset_class = ContractRollupStatsFilter
+    rollup_actions = {
+        'daily_count': ('bucket', 'count'),
+        'offer_sum': ('bucket', 'sum'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'daily_count':
             return DateCountContractStatsSerializer
         if self.action == 'offer_sum':
             return DateSumContractStatsSerializer
+        if self.action == 'funnel':
+            return FunnelContractStatsSerializer
         return super().get_serializer_class()
 
     def get_queryset(self):
+        if self.is_rollup_request():
+            return self.get_rollup_queryset()
         queryset = super().get_queryset()
         if self.action == 'daily_count':
             return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
                 count=Count('id')
-            ).order_by('-date')
+            ).order_by('-bucket')
         if self.action == 'offer_sum':
-            return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
-                sum=Sum('money_offer')
-            ).order_by('-date')
+            return self.sum_money(
+                queryset.annotate(bucket=self.truncate('create_at')), 'money_offer'
+            ).order_by('-bucket')
         return queryset
 
-    @extend_schema(responses={200: DateCountContractStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateCountContractStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-count')
     def daily_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
-    @extend_schema(responses={200: DateSumContractStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER, CONVERT_PARAMETER],
+                   responses={200: DateSumContractStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='offer-sum')
     def offer_sum(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
-
-class SoloContractStatsViewSet(GenericViewSet):
+    def get_funnel(self, contracts) -> Dict:
+        """
+        Get the funnel of the contracts through their requests, accepted & then rated, along with the percentiles of
+        the durations from posting them to their first requests & acceptances.
+        """
+        rated_requests = Rate.objects.filter(
+            content_type=ContentType.objects.get_for_model(ContractRequest)
+        ).values('object_id')
+        # Grouped per contract once, then either counted or summarized
+        funnel = Contract.objects.filter(pk__in=contracts.values('pk')).annotate(
+            requests_count=Count('requests'),
+            accepted_count=Count('requests', filter=Q(requests__status=StatusChoices.ACCEPTED)),
+            rated_count=Count('requests', filter=Q(requests__in=rated_requests)),
+            time_to_first_request=Min('requests__create_at') - F('create_at'),
+            time_to_accept=Min('requests__accept_at') - F('create_at')
+        ).order_by()
+        counts = funnel.aggregate(
+            posted=Count('pk'),
+            requested=Count('pk', filter=Q(requests_count__gt=0)),
+            accepted=Count('pk', filter=Q(accepted_count__gt=0)),
+            rated=Count('pk', filter=Q(rated_count__gt=0))
+        )
+        durations = list(zip(*funnel.values_list('time_to_first_request', 'time_to_accept'))) or [(), ()]
+        statuses = ContractRequest.objects.filter(
+            contract__in=contracts.values('pk'), status__isnull=False
+        ).values('status').annotate(count=Count('id')).order_by()
+        return {
+            **counts,
+            'request_conversion': counts['requested'] / counts['posted'] if counts['posted'] else None,
+            'accept_conversion': counts['accepted'] / counts['requested'] if counts['requested'] else None,
+            'rate_conversion': counts['rated'] / counts['accepted'] if counts['accepted'] else None,
+            'requests': {
+                **{str(label): 0 for label in StatusChoices.labels},
+                **{str(StatusChoices(row['status']).label): row['count'] for row in statuses}
+            },
+            'time_to_first_request': get_percentiles(durations[0]),
+            'time_to_accept': get_percentiles(durations[1]),
+        }
+
+    @extend_schema(description='Funnel of the contracts posted within the filters, through their requests, accepted '
+                               '& then rated.',
+                   responses={200: FunnelContractStatsSerializer})
+    @action(["GET"], detail=False, pagination_class=None)
+    def funnel(self, request, *args, **kwargs):
+        contracts = self.filter_queryset(self.get_queryset())
+        return Response(self.get_serializer(self.get_funnel(contracts)).data)
+
+
+class SoloContractStatsViewSet(ExportStatsMixin, CachedStatsMixin, MoneyStatsMixin, RollupStatsMixin, GenericViewSet):
     queryset = SoloContract.objects.all()
     filterset_class = SoloContractStatsFilter
     permission_classes = [IsAdminUser]
     pagination_class = StatsPageNumberPagination
-    list_view = ListModelMixin.list
+    export_fields = ('id', 'agency', 'profile', 'industry', 'money_offer', 'money_offer_currency', 'start_at', 'status',
+                     'create_at')
+    bucket_actions = {'daily_count': 'count', 'offer_sum': 'sum'}
+    money_actions = ('offer_sum', )
+    rollup_queryset = SoloContractDailyRollup.objects.all()
+    rollup_filterset_class = SoloContractRollupStatsFilter
+    rollup_actions = {
+        'daily_count': ('bucket', 'count'),
+        'offer_sum': ('bucket', 'sum'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'daily_count':
@@ -209,27 +379,97 @@ class SoloContractStatsViewSet(GenericViewSet):
         return super().get_serializer_class()
 
     def get_queryset(self):
+        if self.is_rollup_request():
+            return self.get_rollup_queryset()
         queryset = super().get_queryset()
         if self.action == 'daily_count':
             return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
                 count=Count('id')
-            ).order_by('-date')
+            ).order_by('-bucket')
         if self.action == 'offer_sum':
-            return queryset.annotate(
-                date=TruncDate('create_at')
-            ).values('date').annotate(
-                sum=Sum('money_offer')
-            ).order_by('-date')
+            return self.sum_money(
+                queryset.annotate(bucket=self.truncate('create_at')), 'money_offer'
+            ).order_by('-bucket')
         return queryset
 
-    @extend_schema(responses={200: DateCountSoloContractStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER], responses={200: DateCountSoloContractStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='daily-count')
     def daily_count(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
 
-    @extend_schema(responses={200: DateSumSoloContractStatsSerializer(many=True)})
+    @extend_schema(parameters=[BUCKET_PARAMETER, CONVERT_PARAMETER],
+                   responses={200: DateSumSoloContractStatsSerializer(many=True)})
     @action(["GET"], detail=False, url_path='offer-sum')
     def offer_sum(self, request, *args, **kwargs):
         return self.list_view(request, *args, **kwargs)
+
+
+class ContractRequestStatsViewSet(ExportStatsMixin, CachedStatsMixin, UniqueStatsMixin, BucketStatsMixin,
+                                  GenericViewSet):
+    queryset = ContractRequest.objects.all()
+    filterset_class = ContractRequestStatsFilter
+    permission_classes = [IsAdminUser]
+    pagination_class = StatsPageNumberPagination
+    export_fields = ('id', 'contract', 'profile', 'status', 'create_at')
+    bucket_actions = {'daily_unique': 'unique'}
+    unique_actions = {'daily_unique': 'contracts.contractrequest.profile'}
+
+    def get_serializer_class(self):
+        if self.action == 'daily_unique':
+            return DateUniqueContractRequestStatsSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'daily_unique':
+            return queryset.annotate(
+                bucket=self.truncate('create_at')
+            ).values('bucket').annotate(
+                unique=Count('profile', distinct=True)
+            ).order_by('-bucket')
+        return queryset
+
+    @extend_schema(parameters=[BUCKET_PARAMETER], description=f'Distinct profiles applying. {UNIQUE_DESCRIPTION}',
+                   responses={200: DateUniqueContractRequestStatsSerializer(many=True)})
+    @action(["GET"], detail=False, url_path='daily-unique')
+    def daily_unique(self, request, *args, **kwargs):
+        return self.list_view(request, *args, **kwargs)
+
+
+class DashboardStatsViewSet(GenericViewSet):
+    """Get all the series of the stats viewsets in a single payload."""
+    serializer_class = DashboardStatsSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+    filter_backends = []
+    # Names of the series, along with their stats viewsets & actions
+    series = (
+        ('users', UserStatsViewSet, ('daily_count', 'role_count')),
+        ('reports', ReportStatsViewSet, ('daily_count', 'type_count')),
+        ('rates', RateStatsViewSet, ('daily_count', 'daily_sum', 'rate_count')),
+        ('contracts', ContractStatsViewSet, ('daily_count', 'offer_sum')),
+        ('solo_contracts', SoloContractStatsViewSet, ('daily_count', 'offer_sum')),
+    )
+
+    def get_series(self, viewset_class, action_name):
+        """Get the series of the stats viewset action, filtered by the same parameters as the dashboard."""
+        view = viewset_class(request=self.request, args=(), kwargs={}, action=action_name, format_kwarg=None)
+        return view.get_serializer(view.get_stats(), many=True).data
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('from', OpenApiTypes.DATETIME, description='Start of the window'),
+            OpenApiParameter('to', OpenApiTypes.DATETIME, description='End of the window, excluded'),
+            BUCKET_PARAMETER,
+        ],
+        responses={200: DashboardStatsSerializer}
+    )
+    def list(self, request, *args, **kwargs):
+        data = defaultdict(dict)
+        # Aggregated one after the other on the connection of the request, rather than opening one per series
+        for name, viewset_class, actions in self.series:
+            for action_name in actions:
+                data[name][action_name] = self.get_series(viewset_class, action_name)
+        return Response(data)
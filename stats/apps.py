@@ -6,3 +6,7 @@ class StatsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stats'
     verbose_name = _('Stats')
+
+    def ready(self):
+        # Connect the signals keeping the rollups, the sketches, the retention & the cached stats in sync
+        from . import rollups, sketches, retention, cache  # noqa: F401
@@ -0,0 +1,63 @@
+import time
+from hashlib import md5
+from typing import Iterable, Set
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+from .rollups import rollups
+from .sketches import sketches
+from .api.filters import (UserStatsFilter, ReportStatsFilter, RateStatsFilter, ContractStatsFilter,
+                          SoloContractStatsFilter, ContractRequestStatsFilter)
+
+
+def get_stats_version_key(model) -> str:
+    return f'stats:version:{model._meta.label_lower}'
+
+
+def get_stats_version(model) -> int:
+    """Get the version of the model stats, bumped whenever its objects change."""
+    return cache.get_or_set(get_stats_version_key(model), time.time_ns, timeout=None)
+
+
+def invalidate_stats(model) -> None:
+    """Invalidate the cached stats of the model by bumping their version."""
+    try:
+        cache.incr(get_stats_version_key(model))
+    except ValueError:
+        # The version is missing, start a new one that can't collide with the previous ones
+        cache.set(get_stats_version_key(model), time.time_ns(), timeout=None)
+
+
+def get_stats_cache_key(name: str, params: Iterable) -> str:
+    """Get the cache key of the stats named by their viewset & action, for the (name, value) pairs of parameters."""
+    # Parameters are normalized, so that the same filters given in any order share the same entry
+    query = urlencode(sorted((key, value) for key, value in params if value != ''))
+    return f'stats:{name}:{md5(query.encode()).hexdigest()}'
+
+
+def watch(model, field_names: Set[str]):
+    """Invalidate the stats of the model whenever its objects are created, deleted, or changed at the fields."""
+    label = model._meta.label_lower
+
+    def handle_save(sender, instance, created, update_fields=None, *args, **kwargs):
+        if created or update_fields is None or field_names & set(update_fields):
+            invalidate_stats(model)
+
+    def handle_delete(sender, instance, *args, **kwargs):
+        invalidate_stats(model)
+
+    post_save.connect(handle_save, sender=model, weak=False, dispatch_uid=f'stats_cache_save_{label}')
+    post_delete.connect(handle_delete, sender=model, weak=False, dispatch_uid=f'stats_cache_delete_{label}')
+
+
+for filterset_class in (UserStatsFilter, ReportStatsFilter, RateStatsFilter, ContractStatsFilter,
+                        SoloContractStatsFilter, ContractRequestStatsFilter):
+    # Changes of the fields neither filtered, rolled up nor sketched, like the users last login, leave the stats as is
+    stats_model = filterset_class._meta.model
+    watch(stats_model, {
+        *(declared_filter.field_name for declared_filter in filterset_class.base_filters.values()),
+        *(rollups[stats_model].fields if stats_model in rollups else ()),
+        *(field for sketch in sketches.get_model_sketches(stats_model) for field in sketch.fields)
+    })
@@ -0,0 +1,60 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from djmoney.contrib.exchange.models import ExchangeBackend, get_default_backend_name
+
+
+class ExchangeRates:
+    """
+    In memory table of the rates converting each currency to `DEFAULT_CURRENCY`, out of the rates of the default
+    exchange backend stored by the `update_rates` command.
+
+    The table is loaded on the first access, and reloaded once every `EXCHANGE_RATES_RELOAD_INTERVAL` seconds to
+    catch up with the updated rates.
+    """
+
+    def __init__(self):
+        self.rates: Optional[Dict[str, Decimal]] = None
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def load(self) -> None:
+        backend = ExchangeBackend.objects.filter(name=get_default_backend_name()).first()
+        values = {}
+        if backend is not None:
+            values = dict(backend.rates.values_list('currency', 'value'))
+            values[backend.base_currency] = Decimal(1)
+        target = values.get(settings.DEFAULT_CURRENCY)
+        # Rates are stored relative to the backend base currency, and crossed through it
+        self.rates = {settings.DEFAULT_CURRENCY: Decimal(1)}
+        if target is not None:
+            self.rates.update({currency: target / value for currency, value in values.items() if value})
+        self.loaded_at = timezone.now()
+
+    def get_rates(self) -> Dict[str, Decimal]:
+        """Get the rates converting each currency having one to `DEFAULT_CURRENCY`."""
+        with self.lock:
+            interval = timedelta(seconds=settings.EXCHANGE_RATES_RELOAD_INTERVAL)
+            if self.rates is None or timezone.now() - self.loaded_at > interval:
+                self.load()
+            return self.rates
+
+    def convert(self, amount_field: str, currency_field: str) -> models.Case:
+        """
+        Convert the amounts of the rows to `DEFAULT_CURRENCY` within the query, by the rate of their currency, so that
+        they are summed by a single aggregate. Amounts of currencies having no rate are converted to NULL.
+        """
+        return models.Case(
+            *(models.When(**{currency_field: currency}, then=models.F(amount_field) * models.Value(rate))
+              for currency, rate in self.get_rates().items()),
+            default=None,
+            output_field=models.DecimalField(max_digits=32, decimal_places=4)
+        )
+
+
+exchange_rates = ExchangeRates()
@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.cache import invalidate_stats
+from stats.rollups import rollups
+from stats.sketches import sketches
+from stats.retention import User, retention
+
+
+class Command(BaseCommand):
+    help = 'Build the daily rollups, sketches & retention of the stats out of the whole objects, e.g. to backfill ' \
+           'them or fix any drift left by bulk updates or deletions, which the signals keeping them in sync skip or ' \
+           'can\'t undo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Labels of the models to be rolled up, EG.: reviews.Rate')
+
+    def handle(self, *args, **options):
+        models = list(dict.fromkeys([*(rollup.model for rollup in rollups), *(sketch.model for sketch in sketches)]))
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as exc:
+                raise CommandError(exc)
+            for model in models:
+                if model not in rollups and not sketches.get_model_sketches(model):
+                    raise CommandError(f'{model._meta.label} is neither rolled up nor sketched')
+
+        for model in models:
+            if model in rollups:
+                count = rollups[model].rebuild()
+                self.stdout.write(self.style.SUCCESS(f'Built {count} daily rows of {model._meta.verbose_name_plural}'))
+            for sketch in sketches.get_model_sketches(model):
+                count = sketch.rebuild()
+                self.stdout.write(self.style.SUCCESS(f'Built {count} daily sketches of {sketch.name}'))
+            if model is User:
+                # Out of the activity bitmaps, as the logins of the past weeks aren't stored elsewhere
+                count = retention.rebuild()
+                self.stdout.write(self.style.SUCCESS(f'Built {count} daily retention rows of the users'))
+            invalidate_stats(model)
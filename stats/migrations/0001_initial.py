@@ -0,0 +1,104 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('role', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Admin'), (1, 'Model'), (2, 'Director'), (3, 'Other')], null=True, verbose_name='Role')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+            ],
+            options={
+                'verbose_name': 'User Daily Rollup',
+                'verbose_name_plural': 'User Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'role', 'is_active')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SoloContractDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('industry', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Film'), (1, 'Cinema'), (2, 'Fashion'), (3, 'Television'), (4, 'Commercials'), (5, 'Theater'), (6, 'Mixed'), (7, 'Other')], null=True, verbose_name='Industry')),
+                ('money_offer_currency', models.CharField(choices=[('EGP', 'EGP £'), ('EUR', 'EUR €'), ('USD', 'USD $')], max_length=3, verbose_name='Money Offer Currency')),
+                ('total_sum', models.DecimalField(decimal_places=4, default=0, max_digits=24, verbose_name='Total Sum')),
+                ('status', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Pending'), (1, 'Accepted'), (3, 'Rejected'), (4, 'Other')], null=True, verbose_name='Status')),
+            ],
+            options={
+                'verbose_name': 'Solo Contract Daily Rollup',
+                'verbose_name_plural': 'Solo Contract Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'industry', 'money_offer_currency', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('type', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Bug Report'), (2, 'Performance Issue'), (3, 'User Interface (UI) Issue'), (4, 'Security Vulnerability'), (5, 'Compatibility Issue'), (6, 'Data Integrity Issue'), (7, 'Documentation Issue'), (8, 'Accessibility Issue'), (9, 'Hardware Problem'), (10, 'Network Connectivity Issue'), (11, 'Crash Report'), (12, 'Installation/Deployment Issue'), (13, 'Usability/UX Issue'), (14, 'Performance Degradation'), (15, 'Feature Request'), (16, 'Discrimination'), (17, 'Bullying'), (18, 'Poverty and Homelessness'), (19, 'Substance Abuse'), (20, 'Mental Health Issues'), (21, 'Domestic Violence'), (22, 'Human Trafficking'), (23, 'Environmental Concerns'), (24, 'Education Disparities'), (25, 'Healthcare Access'), (26, 'Gender Inequality'), (27, 'Racial Injustice'), (28, 'Immigration and Refugee Challenges'), (29, 'Child Abuse and Neglect'), (30, 'Privacy Concerns'), (31, 'Nudity Content'), (32, 'Other')], null=True, verbose_name='Type')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+            ],
+            options={
+                'verbose_name': 'Report Daily Rollup',
+                'verbose_name_plural': 'Report Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'type', 'is_active')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RateDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('rate', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Rate')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('total_sum', models.BigIntegerField(default=0, verbose_name='Total Sum')),
+            ],
+            options={
+                'verbose_name': 'Rate Daily Rollup',
+                'verbose_name_plural': 'Rate Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'rate', 'is_active')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ContractDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('industry', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Film'), (1, 'Cinema'), (2, 'Fashion'), (3, 'Television'), (4, 'Commercials'), (5, 'Theater'), (6, 'Mixed'), (7, 'Other')], null=True, verbose_name='Industry')),
+                ('money_offer_currency', models.CharField(choices=[('EGP', 'EGP £'), ('EUR', 'EUR €'), ('USD', 'USD $')], max_length=3, verbose_name='Money Offer Currency')),
+                ('total_sum', models.DecimalField(decimal_places=4, default=0, max_digits=24, verbose_name='Total Sum')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+            ],
+            options={
+                'verbose_name': 'Contract Daily Rollup',
+                'verbose_name_plural': 'Contract Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'industry', 'money_offer_currency', 'is_active')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniqueDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('registers', models.BinaryField(default=b'', verbose_name='Registers')),
+            ],
+            options={
+                'verbose_name': 'Unique Daily Rollup',
+                'verbose_name_plural': 'Unique Daily Rollups',
+                'ordering': ('-date',),
+                'unique_together': {('name', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.3 on 2026-10-18 21:21
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import localdate
+import django.db.models.deletion
+
+
+def get_week_start(value):
+    return value - timedelta(days=value.weekday())
+
+
+def fill_activities(apps, schema_editor):
+    # The last logins are the only activity known of the users so far
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    activity_model = apps.get_model('stats', 'UserActivity')
+    rollup_model = apps.get_model('stats', 'RetentionDailyRollup')
+    activities, counts = [], Counter()
+    users = user_model.objects.filter(last_login__isnull=False).values_list('id', 'date_joined', 'last_login', 'role')
+    for user_id, joined_at, last_login, role in users.iterator():
+        # Copied from `stats.retention`, as of the bitmaps of a single week set
+        week = (get_week_start(localdate(last_login)) - get_week_start(localdate(joined_at))).days // 7
+        if week < 0:
+            continue
+        weeks = bytearray(week // 8 + 1)
+        weeks[week // 8] |= 1 << week % 8
+        activities.append(activity_model(user_id=user_id, weeks=bytes(weeks)))
+        counts[(localdate(joined_at), role, week)] += 1
+    activity_model.objects.bulk_create(activities, batch_size=1000)
+    rollup_model.objects.bulk_create([
+        rollup_model(date=joined_on, role=role, week=week, total_count=count)
+        for (joined_on, role, week), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stats', '0002_uniquedailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('weeks', models.BinaryField(default=b'', verbose_name='Weeks')),
+            ],
+            options={
+                'verbose_name': 'User Activity',
+                'verbose_name_plural': 'User Activities',
+            },
+        ),
+        migrations.CreateModel(
+            name='RetentionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Count')),
+                ('role', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Admin'), (1, 'Model'), (2, 'Director'), (3, 'Other')], null=True, verbose_name='Role')),
+                ('week', models.PositiveSmallIntegerField(verbose_name='Week')),
+            ],
+            options={
+                'verbose_name': 'Retention Daily Rollup',
+                'verbose_name_plural': 'Retention Daily Rollups',
+                'ordering': ('-date',),
+                'abstract': False,
+                'unique_together': {('date', 'role', 'week')},
+            },
+        ),
+        migrations.RunPython(fill_activities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,126 @@
+from django.db import models
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+from accounts.enums import RoleChoices
+from reports.enums import ReportTypeChoices
+from contracts.enums import StatusChoices
+from agencies.enums import IndustryChoices
+
+
+class DailyRollup(models.Model):
+    """
+    Number of the objects created per day & per dimensions, the stats are summed from these rows rather than
+    aggregated over the whole objects tables, see `stats.rollups`.
+    """
+    date = models.DateField(db_index=True, verbose_name=_('Date'))
+    total_count = models.PositiveIntegerField(default=0, verbose_name=_('Total Count'))
+
+    class Meta:
+        abstract = True
+        ordering = ('-date', )
+
+
+class UserDailyRollup(DailyRollup):
+    role = models.PositiveSmallIntegerField(null=True, blank=True, choices=RoleChoices.choices,
+                                            verbose_name=_('Role'))
+    is_active = models.BooleanField(default=True, verbose_name=_('Active'))
+
+    class Meta(DailyRollup.Meta):
+        verbose_name = _('User Daily Rollup')
+        verbose_name_plural = _('User Daily Rollups')
+        unique_together = ('date', 'role', 'is_active')
+
+
+class ReportDailyRollup(DailyRollup):
+    type = models.PositiveSmallIntegerField(null=True, blank=True, choices=ReportTypeChoices.choices,
+                                            verbose_name=_('Type'))
+    is_active = models.BooleanField(default=True, verbose_name=_('Active'))
+
+    class Meta(DailyRollup.Meta):
+        verbose_name = _('Report Daily Rollup')
+        verbose_name_plural = _('Report Daily Rollups')
+        unique_together = ('date', 'type', 'is_active')
+
+
+class RateDailyRollup(DailyRollup):
+    rate = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name=_('Rate'))
+    is_active = models.BooleanField(default=True, verbose_name=_('Active'))
+    total_sum = models.BigIntegerField(default=0, verbose_name=_('Total Sum'))
+
+    class Meta(DailyRollup.Meta):
+        verbose_name = _('Rate Daily Rollup')
+        verbose_name_plural = _('Rate Daily Rollups')
+        unique_together = ('date', 'rate', 'is_active')
+
+
+class BaseContractDailyRollup(DailyRollup):
+    industry = models.PositiveSmallIntegerField(null=True, blank=True, choices=IndustryChoices.choices,
+                                                verbose_name=_('Industry'))
+    money_offer_currency = models.CharField(max_length=3, choices=settings.CURRENCY_CHOICES,
+                                            verbose_name=_('Money Offer Currency'))
+    total_sum = models.DecimalField(max_digits=24, decimal_places=4, default=0, verbose_name=_('Total Sum'))
+
+    class Meta(DailyRollup.Meta):
+        abstract = True
+
+
+class ContractDailyRollup(BaseContractDailyRollup):
+    is_active = models.BooleanField(default=True, verbose_name=_('Active'))
+
+    class Meta(BaseContractDailyRollup.Meta):
+        verbose_name = _('Contract Daily Rollup')
+        verbose_name_plural = _('Contract Daily Rollups')
+        unique_together = ('date', 'industry', 'money_offer_currency', 'is_active')
+
+
+class SoloContractDailyRollup(BaseContractDailyRollup):
+    status = models.PositiveSmallIntegerField(null=True, blank=True, choices=StatusChoices.choices,
+                                              verbose_name=_('Status'))
+
+    class Meta(BaseContractDailyRollup.Meta):
+        verbose_name = _('Solo Contract Daily Rollup')
+        verbose_name_plural = _('Solo Contract Daily Rollups')
+        unique_together = ('date', 'industry', 'money_offer_currency', 'status')
+
+
+class UniqueDailyRollup(models.Model):
+    """
+    HyperLogLog sketch of the distinct values of a field of the objects created per day, the distinct counts of any
+    range are estimated by merging its daily sketches, see `stats.sketches`.
+    """
+    name = models.CharField(max_length=100, verbose_name=_('Name'))
+    date = models.DateField(db_index=True, verbose_name=_('Date'))
+    registers = models.BinaryField(default=b'', verbose_name=_('Registers'))
+
+    class Meta:
+        ordering = ('-date', )
+        verbose_name = _('Unique Daily Rollup')
+        verbose_name_plural = _('Unique Daily Rollups')
+        unique_together = ('name', 'date')
+
+
+class RetentionDailyRollup(DailyRollup):
+    """
+    Number of the users who joined per day & per role, and were active in the week following their joining week by
+    `week` weeks, the cohorts retention is summed from these rows, see `stats.retention`.
+    """
+    role = models.PositiveSmallIntegerField(null=True, blank=True, choices=RoleChoices.choices,
+                                            verbose_name=_('Role'))
+    week = models.PositiveSmallIntegerField(verbose_name=_('Week'))
+
+    class Meta(DailyRollup.Meta):
+        verbose_name = _('Retention Daily Rollup')
+        verbose_name_plural = _('Retention Daily Rollups')
+        unique_together = ('date', 'role', 'week')
+
+
+class UserActivity(models.Model):
+    """Bitmap of the weeks each user was active in, the bit of each week following their joining week being set."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='activity', verbose_name=_('User'))
+    weeks = models.BinaryField(default=b'', verbose_name=_('Weeks'))
+
+    class Meta:
+        verbose_name = _('User Activity')
+        verbose_name_plural = _('User Activities')
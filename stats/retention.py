@@ -0,0 +1,114 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_save, pre_delete
+from django.contrib.auth import get_user_model
+from django.utils.timezone import localdate
+
+from .cache import invalidate_stats
+from .models import RetentionDailyRollup, UserActivity
+
+
+User = get_user_model()
+
+
+def get_week_start(value: date) -> date:
+    return value - timedelta(days=value.weekday())
+
+
+def get_week_offset(joined_at, active_at) -> Optional[int]:
+    """Get the number of weeks from the joining week to the active one, in the current timezone."""
+    offset = (get_week_start(localdate(active_at)) - get_week_start(localdate(joined_at))).days // 7
+    return offset if offset >= 0 else None
+
+
+def has_bit(bitmap: bytes, index: int) -> bool:
+    byte, bit = divmod(index, 8)
+    return byte < len(bitmap) and bool(bitmap[byte] & (1 << bit))
+
+
+def set_bit(bitmap: bytes, index: int) -> bytes:
+    byte, bit = divmod(index, 8)
+    bitmap = bytearray(bitmap)
+    bitmap.extend(bytes(max(byte + 1 - len(bitmap), 0)))
+    bitmap[byte] |= 1 << bit
+    return bytes(bitmap)
+
+
+def iter_bits(bitmap: bytes) -> Iterator[int]:
+    for byte, value in enumerate(bitmap):
+        for bit in range(8):
+            if value & (1 << bit):
+                yield byte * 8 + bit
+
+
+class Retention:
+    """
+    Keep the weekly retention of the users in sync, by setting the bit of the week of their last login, counted from
+    their joining week, in their activity bitmap. Users are counted in the retention rollup of their joining day &
+    role the first time their bit of a week is set, so that the retention is summed out of the rollup rather than
+    rescanned out of the users.
+    """
+
+    def register(self):
+        post_save.connect(self.handle_save, sender=User, weak=False, dispatch_uid='retention_save_user')
+        pre_delete.connect(self.handle_delete, sender=User, weak=False, dispatch_uid='retention_delete_user')
+
+    def handle_save(self, sender, instance, created, raw=False, update_fields=None, *args, **kwargs):
+        if raw or instance.last_login is None or (update_fields is not None and 'last_login' not in update_fields):
+            return
+        week = get_week_offset(instance.date_joined, instance.last_login)
+        if week is None:
+            return
+        with transaction.atomic():
+            # Locked, so that the concurrent logins of the same week are counted once
+            activity, _ = UserActivity.objects.select_for_update().get_or_create(user=instance)
+            if has_bit(activity.weeks, week):
+                return
+            activity.weeks = set_bit(activity.weeks, week)
+            activity.save(update_fields=['weeks'])
+            self.increment(localdate(instance.date_joined), instance.role, week)
+        # Logins are ignored by the cached stats of the users, but the ones of new weeks change their retention
+        invalidate_stats(User)
+
+    def handle_delete(self, sender, instance, *args, **kwargs):
+        # Read before the activity is deleted along with the user
+        activity = UserActivity.objects.filter(user=instance).first()
+        if activity is None:
+            return
+        for week in iter_bits(activity.weeks):
+            self.increment(localdate(instance.date_joined), instance.role, week, count=-1)
+
+    def increment(self, joined_on: date, role, week: int, count: int = 1):
+        lookups = {'date': joined_on, 'role': role, 'week': week}
+        queryset = RetentionDailyRollup.objects.filter(**lookups)
+        if queryset.update(total_count=models.F('total_count') + count) or count < 0:
+            return
+        try:
+            with transaction.atomic():
+                RetentionDailyRollup.objects.create(**lookups, total_count=count)
+        except IntegrityError:
+            # Created by a concurrent save in the meantime
+            queryset.update(total_count=models.F('total_count') + count)
+
+    def get_rows(self) -> Iterator[RetentionDailyRollup]:
+        """Count the rollup rows out of the activity bitmaps of the users."""
+        counts = Counter()
+        activities = UserActivity.objects.values_list('weeks', 'user__date_joined', 'user__role')
+        for weeks, joined_at, role in activities.iterator():
+            for week in iter_bits(weeks):
+                counts[(localdate(joined_at), role, week)] += 1
+        for (joined_on, role, week), count in counts.items():
+            yield RetentionDailyRollup(date=joined_on, role=role, week=week, total_count=count)
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Rebuild the whole rollup rows out of the activity bitmaps, return the number of rows."""
+        with transaction.atomic():
+            RetentionDailyRollup.objects.all().delete()
+            return len(RetentionDailyRollup.objects.bulk_create(self.get_rows(), batch_size=batch_size))
+
+
+retention = Retention()
+retention.register()
@@ -0,0 +1,156 @@
+from decimal import Decimal
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import TruncDate
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.contrib.auth import get_user_model
+from django.utils.timezone import is_aware, localdate
+
+from reviews.models import Rate
+from reports.models import Report
+from contracts.models import Contract, SoloContract
+from .models import (UserDailyRollup, ReportDailyRollup, RateDailyRollup, ContractDailyRollup,
+                     SoloContractDailyRollup)
+
+
+User = get_user_model()
+
+
+class Rollup:
+    """
+    Keep the daily rollup of a model in sync, incrementing the row of the objects day & dimensions as they are
+    created, and moving them between rows as their dimensions change.
+
+    Attributes:
+        - model (Model): The rolled up model.
+        - rollup_model (Model): The daily rollup model, having a field for each of the dimensions.
+        - date_field (str): The datetime field whose date the objects are counted by.
+        - dimensions (Tuple[str, ...]): Fields the objects are counted by, named the same at both models.
+        - sum_field (Optional[str]): Field summed into the rollup `total_sum`, if any.
+    """
+
+    def __init__(self, model, rollup_model, date_field: str, dimensions: Tuple[str, ...],
+                 sum_field: Optional[str] = None):
+        self.model = model
+        self.rollup_model = rollup_model
+        self.date_field = date_field
+        self.dimensions = dimensions
+        self.sum_field = sum_field
+        self.previous_attribute = f'_{rollup_model._meta.model_name}_previous'
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return (self.date_field, *self.dimensions, *((self.sum_field, ) if self.sum_field else ()))
+
+    def register(self):
+        label = self.model._meta.label_lower
+        pre_save.connect(self.handle_pre_save, sender=self.model, weak=False, dispatch_uid=f'rollup_pre_save_{label}')
+        post_save.connect(self.handle_save, sender=self.model, weak=False, dispatch_uid=f'rollup_save_{label}')
+        post_delete.connect(self.handle_delete, sender=self.model, weak=False, dispatch_uid=f'rollup_delete_{label}')
+
+    def get_entry(self, values: Dict) -> Tuple[Dict, Decimal]:
+        """Get the rollup row lookups of the object values, along with its summed value."""
+        lookups = {dimension: values[dimension] for dimension in self.dimensions}
+        date = values[self.date_field]
+        # Dates are the ones of the current timezone, like the ones truncated by the database
+        lookups['date'] = localdate(date) if is_aware(date) else date.date()
+        value = values[self.sum_field] if self.sum_field else 0
+        # Money fields are summed by their amounts
+        return lookups, getattr(value, 'amount', value) or 0
+
+    def get_instance_entry(self, instance) -> Tuple[Dict, Decimal]:
+        return self.get_entry({field: getattr(instance, field) for field in self.fields})
+
+    def is_counted(self, update_fields=None) -> bool:
+        return update_fields is None or bool(set(self.fields) & set(update_fields))
+
+    def handle_pre_save(self, sender, instance, raw=False, update_fields=None, *args, **kwargs):
+        # The stored values are the ones counted, the instance ones may have been changed since loaded
+        if raw or instance._state.adding or instance.pk is None or not self.is_counted(update_fields):
+            return
+        previous = self.model._default_manager.filter(pk=instance.pk).values(*self.fields).first()
+        setattr(instance, self.previous_attribute, previous and self.get_entry(previous))
+
+    def handle_save(self, sender, instance, created, raw=False, update_fields=None, *args, **kwargs):
+        if raw or not self.is_counted(update_fields):
+            return
+        entry = self.get_instance_entry(instance)
+        previous = instance.__dict__.pop(self.previous_attribute, None)
+        if not created and previous is None:
+            return
+        if previous == entry:
+            return
+        if previous is not None:
+            self.increment(*previous, count=-1)
+        self.increment(*entry)
+
+    def handle_delete(self, sender, instance, *args, **kwargs):
+        self.increment(*self.get_instance_entry(instance), count=-1)
+
+    def increment(self, lookups: Dict, value, count: int = 1):
+        updates = {'total_count': models.F('total_count') + count}
+        if self.sum_field:
+            updates['total_sum'] = models.F('total_sum') + value * count
+        queryset = self.rollup_model.objects.filter(**lookups)
+        # Objects missing from the rollup are left to be counted by its rebuild
+        if queryset.update(**updates) or count < 0:
+            return
+        defaults = {'total_count': count}
+        if self.sum_field:
+            defaults['total_sum'] = value * count
+        try:
+            with transaction.atomic():
+                self.rollup_model.objects.create(**lookups, **defaults)
+        except IntegrityError:
+            # Created by a concurrent save in the meantime
+            queryset.update(**updates)
+
+    def get_rows(self) -> Iterator:
+        """Aggregate the rollup rows out of the whole model objects."""
+        aggregates = {'total_count': models.Count('pk')}
+        if self.sum_field:
+            aggregates['total_sum'] = models.Sum(self.sum_field)
+        rows = self.model._default_manager.annotate(
+            date=TruncDate(self.date_field)
+        ).values('date', *self.dimensions).annotate(**aggregates).order_by()
+        for row in rows.iterator():
+            if self.sum_field and row['total_sum'] is None:
+                row['total_sum'] = 0
+            yield self.rollup_model(**row)
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Rebuild the whole rollup rows, return the number of rows."""
+        with transaction.atomic():
+            self.rollup_model.objects.all().delete()
+            return len(self.rollup_model.objects.bulk_create(self.get_rows(), batch_size=batch_size))
+
+
+class RollupRegistry:
+    """Registry of the rollups, looked up by their rolled up models."""
+
+    def __init__(self):
+        self._registry: Dict = {}
+
+    def __contains__(self, model):
+        return model in self._registry
+
+    def __iter__(self):
+        return iter(self._registry.values())
+
+    def __getitem__(self, model) -> Rollup:
+        return self._registry[model]
+
+    def register(self, rollup: Rollup):
+        self._registry[rollup.model] = rollup
+        rollup.register()
+
+
+rollups = RollupRegistry()
+rollups.register(Rollup(User, UserDailyRollup, 'date_joined', ('role', 'is_active')))
+rollups.register(Rollup(Report, ReportDailyRollup, 'create_at', ('type', 'is_active')))
+rollups.register(Rollup(Rate, RateDailyRollup, 'create_at', ('rate', 'is_active'), sum_field='rate'))
+rollups.register(Rollup(Contract, ContractDailyRollup, 'create_at', ('industry', 'money_offer_currency', 'is_active'),
+                        sum_field='money_offer'))
+rollups.register(Rollup(SoloContract, SoloContractDailyRollup, 'create_at',
+                        ('industry', 'money_offer_currency', 'status'), sum_field='money_offer'))
@@ -0,0 +1,171 @@
+import math
+from datetime import datetime, time
+from hashlib import blake2b
+from typing import Dict, Iterator, List
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save
+from django.utils.timezone import is_aware, localdate
+
+from reviews.models import Rate
+from reports.models import Report
+from contracts.models import ContractRequest
+from .models import UniqueDailyRollup
+from .utils import truncate_value
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch of the distinct values added to it, whose count is estimated within a standard error of
+    `1.04 / sqrt(2 ** precision)`, EG.: 1.6% out of the 4 KiB of registers of the default precision.
+
+    Sketches are merged by keeping the maximum of each register, so that the union of the values of any days is
+    estimated out of their daily sketches.
+    """
+    default_precision = 12
+
+    def __init__(self, registers: bytes = b'', precision: int = default_precision):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        if registers:
+            self.registers[:] = np.frombuffer(registers, dtype=np.uint8)
+
+    @classmethod
+    def get_standard_error(cls, precision: int = default_precision) -> float:
+        return 1.04 / math.sqrt(1 << precision)
+
+    def __bytes__(self) -> bytes:
+        return self.registers.tobytes()
+
+    def add(self, value) -> None:
+        # Hashed to 64 bits, the first ones pick the register & the rest is ranked by its leading zeros
+        digest = int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index, rest = digest >> bits, digest & ((1 << bits) - 1)
+        self.registers[index] = max(self.registers[index], bits - rest.bit_length() + 1)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # Small cardinalities are estimated by linear counting of the empty registers
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+
+class Sketch:
+    """
+    Keep the daily HyperLogLog sketches of the distinct values of a model field in sync, adding the value of each
+    created object to the sketch of its day.
+
+    Values can't be removed from the sketches, so the ones of deleted or updated objects are kept until rebuilt.
+
+    Attributes:
+        - model (Model): The sketched model.
+        - date_field (str): The datetime field whose date the objects are sketched by.
+        - value_field (str): The field whose distinct values are counted.
+    """
+
+    def __init__(self, model, date_field: str, value_field: str):
+        self.model = model
+        self.date_field = date_field
+        self.value_field = value_field
+
+    @property
+    def name(self) -> str:
+        return f'{self.model._meta.label_lower}.{self.value_field}'
+
+    @property
+    def fields(self):
+        return self.date_field, self.value_field
+
+    def get_queryset(self):
+        return UniqueDailyRollup.objects.filter(name=self.name)
+
+    def register(self):
+        post_save.connect(self.handle_save, sender=self.model, weak=False, dispatch_uid=f'sketch_save_{self.name}')
+
+    def handle_save(self, sender, instance, created, raw=False, *args, **kwargs):
+        value = getattr(instance, self.model._meta.get_field(self.value_field).attname)
+        if raw or not created or value is None:
+            return
+        date = getattr(instance, self.date_field)
+        # Dates are the ones of the current timezone, like the ones truncated by the database
+        self.add(localdate(date) if is_aware(date) else date.date(), value)
+
+    def add(self, date, value) -> None:
+        with transaction.atomic():
+            # Locked, so that the values added concurrently to the same day aren't lost
+            rollup, _ = self.get_queryset().select_for_update().get_or_create(name=self.name, date=date)
+            sketch = HyperLogLog(rollup.registers)
+            sketch.add(value)
+            rollup.registers = bytes(sketch)
+            rollup.save(update_fields=['registers'])
+
+    def get_rows(self) -> Iterator[UniqueDailyRollup]:
+        """Sketch the daily rows out of the whole model objects."""
+        values = self.model._default_manager.annotate(
+            date=TruncDate(self.date_field)
+        ).filter(**{f'{self.value_field}__isnull': False}).values_list('date', self.value_field).order_by('date')
+        date, sketch = None, None
+        for value_date, value in values.iterator():
+            if value_date != date:
+                if sketch is not None:
+                    yield UniqueDailyRollup(name=self.name, date=date, registers=bytes(sketch))
+                date, sketch = value_date, HyperLogLog()
+            sketch.add(value)
+        if sketch is not None:
+            yield UniqueDailyRollup(name=self.name, date=date, registers=bytes(sketch))
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Rebuild the whole sketches, return the number of rows."""
+        with transaction.atomic():
+            self.get_queryset().delete()
+            return len(UniqueDailyRollup.objects.bulk_create(self.get_rows(), batch_size=batch_size))
+
+    def count(self, queryset, bucket: str, aggregate: str = 'unique') -> List[Dict]:
+        """Estimate the distinct counts of the buckets, by merging the sketches of their days."""
+        rows, current, sketch = [], None, None
+        for date, registers in queryset.order_by('date').values_list('date', 'registers').iterator():
+            date_bucket = truncate_value(datetime.combine(date, time.min), bucket)
+            if date_bucket != current:
+                if sketch is not None:
+                    rows.append({'bucket': current, aggregate: sketch.count()})
+                current, sketch = date_bucket, HyperLogLog()
+            sketch.merge(HyperLogLog(registers))
+        if sketch is not None:
+            rows.append({'bucket': current, aggregate: sketch.count()})
+        return rows
+
+
+class SketchRegistry:
+    """Registry of the sketches, looked up by their names."""
+
+    def __init__(self):
+        self._registry: Dict[str, Sketch] = {}
+
+    def __iter__(self):
+        return iter(self._registry.values())
+
+    def __getitem__(self, name: str) -> Sketch:
+        return self._registry[name]
+
+    def get_model_sketches(self, model) -> List[Sketch]:
+        return [sketch for sketch in self if sketch.model is model]
+
+    def register(self, sketch: Sketch):
+        self._registry[sketch.name] = sketch
+        sketch.register()
+
+
+sketches = SketchRegistry()
+sketches.register(Sketch(Report, 'create_at', 'user'))
+sketches.register(Sketch(Rate, 'create_at', 'agency'))
+sketches.register(Sketch(ContractRequest, 'create_at', 'profile'))
@@ -1,3 +1,167 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from reviews.models import Rate
+from reports.models import Report
+from accounts.models import User
+from accounts.enums import RoleChoices
+from contracts.models import Contract, SoloContract
+from .sketches import HyperLogLog
+from .retention import get_week_offset, has_bit, set_bit, iter_bits
+from .api.mixins import CachedStatsMixin
+from .api.views import DashboardStatsViewSet
+from .api.filters import (UserStatsFilter, ReportStatsFilter, RateStatsFilter, ContractStatsFilter,
+                          SoloContractStatsFilter)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class DateRangeStatsFilterQueryPlanTests(TestCase):
+    params = {'from': '2023-01-01T00:00:00Z', 'to': '2023-01-31T00:00:00Z'}
+
+    def assertSearchesIndex(self, filterset_class, queryset, column):
+        plan = filterset_class(self.params, queryset=queryset).qs.explain()
+        self.assertRegex(
+            plan, rf'SEARCH \S+ USING (COVERING )?INDEX \S*{column}\S* \({column}>\? AND {column}<\?\)'
+        )
+
+    def test_users_date_range(self):
+        self.assertSearchesIndex(UserStatsFilter, User.objects.exclude_admin(), 'date_joined')
+
+    def test_reports_date_range(self):
+        self.assertSearchesIndex(ReportStatsFilter, Report.objects.all(), 'create_at')
+
+    def test_rates_date_range(self):
+        self.assertSearchesIndex(RateStatsFilter, Rate.objects.all(), 'create_at')
+
+    def test_contracts_date_range(self):
+        self.assertSearchesIndex(ContractStatsFilter, Contract.objects.all(), 'create_at')
+
+    def test_solo_contracts_date_range(self):
+        self.assertSearchesIndex(SoloContractStatsFilter, SoloContract.objects.all(), 'create_at')
+
+
+class HyperLogLogTests(SimpleTestCase):
+
+    def assertEstimates(self, sketch, count):
+        # Within 3 standard errors
+        self.assertAlmostEqual(sketch.count(), count, delta=3 * HyperLogLog.get_standard_error() * count)
+
+    def test_count(self):
+        for count in (100, 10000, 100000):
+            sketch = HyperLogLog()
+            for value in range(count):
+                sketch.add(value)
+            self.assertEstimates(sketch, count)
+
+    def test_merge(self):
+        sketch, other = HyperLogLog(), HyperLogLog()
+        for value in range(30000):
+            sketch.add(value)
+            other.add(value + 20000)
+        sketch.merge(HyperLogLog(bytes(other)))
+        self.assertEstimates(sketch, 50000)
+
+
+class RetentionBitmapTests(SimpleTestCase):
+
+    def test_week_offset(self):
+        # Mondays start the weeks
+        joined_at = datetime(2024, 1, 7, tzinfo=timezone.utc)
+        self.assertEqual(get_week_offset(joined_at, datetime(2024, 1, 7, 23, tzinfo=timezone.utc)), 0)
+        self.assertEqual(get_week_offset(joined_at, datetime(2024, 1, 8, tzinfo=timezone.utc)), 1)
+        self.assertEqual(get_week_offset(joined_at, datetime(2024, 3, 4, tzinfo=timezone.utc)), 9)
+        self.assertIsNone(get_week_offset(joined_at, datetime(2023, 12, 31, tzinfo=timezone.utc)))
+
+    def test_bits(self):
+        bitmap = b''
+        for index in (0, 9, 30, 9):
+            bitmap = set_bit(bitmap, index)
+        self.assertEqual(len(bitmap), 4)
+        self.assertTrue(has_bit(bitmap, 9))
+        self.assertFalse(has_bit(bitmap, 10))
+        self.assertFalse(has_bit(bitmap, 100))
+        self.assertEqual(list(iter_bits(bitmap)), [0, 9, 30])
+
+
+class AggregatedStats:
+    stream_stats = False
+
+    def __init__(self):
+        self.count = 0
+
+    def get_stats(self):
+        self.count += 1
+        time.sleep(0.2)
+        return [{'count': self.count}]
+
+
+class CachedStats(CachedStatsMixin, AggregatedStats):
+    queryset = User.objects.all()
+
+    def get_stats_cache_key(self) -> str:
+        return 'stats:test'
+
+
+@override_settings(STATS_CACHE_TIMEOUT=60, STATS_CACHE_STALE_WHILE_REVALIDATE=True)
+class CachedStatsTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def get_concurrent_stats(self, view, count=8):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(view.get_stats())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_missing_stats_aggregated_once(self):
+        view = CachedStats()
+        results = self.get_concurrent_stats(view)
+        self.assertEqual(view.count, 1)
+        self.assertEqual(results, [[{'count': 1}]] * 8)
+
+    def test_stale_stats_served_while_refreshed(self):
+        view = CachedStats()
+        view.get_stats()
+        cache.set('stats:test:lock', True)
+        with override_settings(STATS_CACHE_TIMEOUT=-1):
+            self.assertEqual(view.get_stats(), [{'count': 1}])
+        # The lock of the refreshing request is left to it
+        self.assertTrue(cache.get('stats:test:lock'))
+        self.assertEqual(view.count, 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class DashboardStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        User.objects.create_user('model', 'model@example.com', 'password', role=RoleChoices.MODEL)
+        User.objects.create_user('director', 'director@example.com', 'password', role=RoleChoices.DIRECTOR)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_series(self):
+        # Every series of the dashboard is the one of its own stats endpoint
+        params = {'bucket': 'day'}
+        dashboard = self.client.get(reverse('stats:dashboard-list'), params).json()
+        for name, viewset_class, actions in DashboardStatsViewSet.series:
+            for action_name in actions:
+                url = reverse(f'stats:{name}-{action_name.replace("_", "-")}')
+                self.assertEqual(dashboard[name][action_name], self.client.get(url, params).json()['results'],
+                                 f'{name} {action_name}')
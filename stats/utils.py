@@ -0,0 +1,125 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from django.db import models
+from django.db.models.functions import Trunc
+from django.utils.timezone import is_aware, localtime
+
+
+# Granularities the dated stats are bucketed by, from the finest to the coarsest
+BUCKETS = ('hour', 'day', 'week', 'month', 'year')
+# Percentiles the durations stats are summarized by
+PERCENTILES = (50, 90, 95)
+
+
+def truncate(field_name: str, bucket: str) -> Trunc:
+    """Truncate the field to the start of its bucket, a datetime for hourly buckets or else a date."""
+    output_field = models.DateTimeField() if bucket == 'hour' else models.DateField()
+    return Trunc(field_name, bucket, output_field=output_field)
+
+
+def get_next_bucket(value: Union[date, datetime], bucket: str) -> Union[date, datetime]:
+    """Get the start of the bucket following the one starting at the value."""
+    if bucket == 'hour' and value.tzinfo is not None:
+        # Stepped in UTC, so that the hours repeated or skipped by daylight saving time transitions are kept
+        return (value.astimezone(timezone.utc) + timedelta(hours=1)).astimezone(value.tzinfo)
+    if bucket == 'hour':
+        return value + timedelta(hours=1)
+    if bucket == 'day':
+        return value + timedelta(days=1)
+    if bucket == 'week':
+        return value + timedelta(weeks=1)
+    if bucket == 'month':
+        return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+    return value.replace(year=value.year + 1)
+
+
+def get_previous_bucket(value: Union[date, datetime], bucket: str) -> Union[date, datetime]:
+    """Get the start of the bucket preceding the one starting at the value."""
+    if bucket == 'hour' and value.tzinfo is not None:
+        return (value.astimezone(timezone.utc) - timedelta(hours=1)).astimezone(value.tzinfo)
+    if bucket == 'hour':
+        return value - timedelta(hours=1)
+    if bucket == 'day':
+        return value - timedelta(days=1)
+    if bucket == 'week':
+        return value - timedelta(weeks=1)
+    if bucket == 'month':
+        return value.replace(year=value.year - (value.month == 1), month=(value.month - 2) % 12 + 1)
+    return value.replace(year=value.year - 1)
+
+
+def truncate_value(value: datetime, bucket: str) -> Union[date, datetime]:
+    """Truncate the datetime to the start of its bucket in the current timezone, like `truncate` does."""
+    if is_aware(value):
+        value = localtime(value)
+    if bucket == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.date()
+    if bucket == 'week':
+        return value - timedelta(days=value.weekday())
+    if bucket == 'month':
+        return value.replace(day=1)
+    if bucket == 'year':
+        return value.replace(month=1, day=1)
+    return value
+
+
+def get_groups(rows: Iterable[Dict], dimensions: Tuple[str, ...]) -> List[Tuple]:
+    """Get the sorted combinations of dimensions of the rows, a single empty one along with no dimensions."""
+    if not dimensions:
+        return [()]
+    return sorted({tuple(row[dimension] for dimension in dimensions) for row in rows}, key=str)
+
+
+def iter_gaps(rows: Iterable[Dict], bucket: str, aggregate: str, first: Optional[Union[date, datetime]] = None,
+              last: Optional[Union[date, datetime]] = None, dimensions: Tuple[str, ...] = (),
+              groups: Iterable[Tuple] = ((), )) -> Iterator[Dict]:
+    """
+    Fill the buckets missing from the rows, like `fill_gaps`, out of rows ordered from the latest bucket to the
+    earliest, for each of the groups of dimensions. Rows are consumed as the buckets are, so that they are streamed.
+    """
+    rows, groups = iter(rows), list(groups)
+    row = next(rows, None)
+    if last is None:
+        if row is None:
+            return
+        last = row['bucket']
+    # Rows past the last bucket are skipped
+    while row is not None and row['bucket'] > last:
+        row = next(rows, None)
+    current = last
+    # Buckets are filled down to the first one, defaulting to the one of the earliest row
+    while (current >= first) if first is not None else row is not None:
+        values = {}
+        while row is not None and row['bucket'] >= current:
+            if row['bucket'] == current:
+                values[tuple(row[dimension] for dimension in dimensions)] = row[aggregate]
+            row = next(rows, None)
+        for group in groups:
+            yield {'date': current, **dict(zip(dimensions, group)), aggregate: values.get(group) or 0}
+        current = get_previous_bucket(current, bucket)
+
+
+def fill_gaps(rows: Iterable[Dict], bucket: str, aggregate: str, first: Optional[Union[date, datetime]] = None,
+              last: Optional[Union[date, datetime]] = None, dimensions: Tuple[str, ...] = ()) -> List[Dict]:
+    """
+    Fill the buckets missing from the rows, made of their `bucket`, dimensions & aggregate, with zero aggregates.
+    Buckets are filled from the first to the last ones, defaulting to the ones of the rows, for each of the
+    combinations of dimensions of the rows.
+
+    Returns the rows keyed by `date`, from the latest bucket to the earliest.
+    """
+    rows = sorted(rows, key=lambda row: row['bucket'], reverse=True)
+    if first is None and rows:
+        first = rows[-1]['bucket']
+    return list(iter_gaps(rows, bucket, aggregate, first, last, dimensions, get_groups(rows, dimensions)))
+
+
+def get_percentiles(durations: Iterable[Optional[timedelta]]) -> Dict[str, Optional[float]]:
+    """Get the `PERCENTILES` of the durations in seconds, skipping the missing ones, keyed by `p<percentile>`."""
+    seconds = np.array([duration.total_seconds() for duration in durations if duration is not None])
+    if not len(seconds):
+        return {f'p{percentile}': None for percentile in PERCENTILES}
+    return dict(zip((f'p{percentile}' for percentile in PERCENTILES), np.percentile(seconds, PERCENTILES).tolist()))